@@ -0,0 +1,104 @@
+"""Add materialized project/milestone roll-up tables and backfill them
+
+Revision ID: 202610170001
+Revises: 202510060001
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "202610170001"
+down_revision = "202510060001"
+branch_labels = None
+depends_on = None
+
+
+# Same risk buffers as app.project_services.RISK_BUFFERS
+REMAINING_SQL = """
+    GREATEST(COALESCE(t.effort_estimate, 0) - COALESCE(t.effort_spent, 0), 0)
+    * CASE t.risk_level WHEN 'medium' THEN 1.1 WHEN 'high' THEN 1.25 ELSE 1 END
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "project_rollups",
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("total_estimate", sa.Numeric(14, 4), nullable=False, server_default="0"),
+        sa.Column("remaining_effort", sa.Numeric(14, 4), nullable=False, server_default="0"),
+        sa.Column("status_counts", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default="{}"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+    op.create_table(
+        "milestone_rollups",
+        sa.Column("milestone_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("total_estimate", sa.Numeric(14, 4), nullable=False, server_default="0"),
+        sa.Column("remaining_effort", sa.Numeric(14, 4), nullable=False, server_default="0"),
+        sa.Column("status_counts", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default="{}"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["milestone_id"], ["milestones.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("milestone_id"),
+    )
+    op.create_index(op.f("ix_milestone_rollups_project_id"), "milestone_rollups", ["project_id"], unique=False)
+
+    # Backfill from existing tasks; app.scripts.rebuild_rollups repeats this on demand.
+    op.execute(
+        f"""
+        INSERT INTO milestone_rollups (milestone_id, project_id, total_estimate, remaining_effort, status_counts)
+        SELECT m.id,
+               m.project_id,
+               COALESCE(SUM(s.estimate), 0),
+               COALESCE(SUM(s.remaining), 0),
+               COALESCE(jsonb_object_agg(s.status, s.task_count) FILTER (WHERE s.status IS NOT NULL), '{{}}'::jsonb)
+        FROM milestones m
+        LEFT JOIN (
+            SELECT t.milestone_id,
+                   t.status::text AS status,
+                   COUNT(*) AS task_count,
+                   SUM(COALESCE(t.effort_estimate, 0)) AS estimate,
+                   SUM({REMAINING_SQL}) AS remaining
+            FROM tasks t
+            GROUP BY t.milestone_id, t.status
+        ) s ON s.milestone_id = m.id
+        GROUP BY m.id, m.project_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO project_rollups (project_id, total_estimate, remaining_effort)
+        SELECT p.id, COALESCE(SUM(mr.total_estimate), 0), COALESCE(SUM(mr.remaining_effort), 0)
+        FROM projects p
+        LEFT JOIN milestone_rollups mr ON mr.project_id = p.id
+        GROUP BY p.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE project_rollups pr
+        SET status_counts = c.counts
+        FROM (
+            SELECT project_id, jsonb_object_agg(status, task_count) AS counts
+            FROM (
+                SELECT mr.project_id, counts.key AS status, SUM(counts.value::int) AS task_count
+                FROM milestone_rollups mr, jsonb_each_text(mr.status_counts) AS counts
+                GROUP BY mr.project_id, counts.key
+            ) per_status
+            GROUP BY project_id
+        ) c
+        WHERE c.project_id = pr.project_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_milestone_rollups_project_id"), table_name="milestone_rollups")
+    op.drop_table("milestone_rollups")
+    op.drop_table("project_rollups")
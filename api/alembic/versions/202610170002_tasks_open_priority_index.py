@@ -0,0 +1,37 @@
+"""Add partial index serving the next-action top-k scan
+
+Revision ID: 202610170002
+Revises: 202610170001
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610170002"
+down_revision = "202610170001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_indexes = {idx["name"] for idx in insp.get_indexes("tasks")}
+    if "ix_tasks_project_open_priority" not in existing_indexes:
+        op.create_index(
+            "ix_tasks_project_open_priority",
+            "tasks",
+            ["project_id", sa.text("priority_score DESC NULLS LAST"), "created_at"],
+            unique=False,
+            postgresql_where=sa.text("status <> 'done'"),
+        )
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index("ix_tasks_project_open_priority", table_name="tasks")
+    except Exception:
+        pass
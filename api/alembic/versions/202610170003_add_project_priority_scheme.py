@@ -0,0 +1,25 @@
+"""Add priority_scheme to projects for per-project scoring weights
+
+Revision ID: 202610170003
+Revises: 202610170002
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "202610170003"
+down_revision = "202610170002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("projects", sa.Column("priority_scheme", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("projects", "priority_scheme")
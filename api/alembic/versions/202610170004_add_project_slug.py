@@ -0,0 +1,102 @@
+"""Add unique projects.slug and a lower(slug) index on milestones
+
+Revision ID: 202610170004
+Revises: 202610170003
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610170004"
+down_revision = "202610170003"
+branch_labels = None
+depends_on = None
+
+
+def _slugify(text: str) -> str:
+    # frozen copy of app.project_services.slugify
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    project_cols = {c["name"] for c in insp.get_columns("projects")}
+    if "slug" not in project_cols:
+        op.add_column("projects", sa.Column("slug", sa.String(length=255), nullable=True))
+
+    # Backfill in creation order so the oldest project keeps the bare slug
+    taken = {
+        row.slug for row in bind.execute(sa.text("SELECT slug FROM projects WHERE slug IS NOT NULL"))
+    }
+    rows = bind.execute(
+        sa.text("SELECT id, name FROM projects WHERE slug IS NULL ORDER BY created_at, id")
+    ).all()
+    for row in rows:
+        base = _slugify(row.name or "") or "project"
+        slug, suffix = base, 2
+        while slug in taken:
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        taken.add(slug)
+        bind.execute(sa.text("UPDATE projects SET slug = :slug WHERE id = :id"), {"slug": slug, "id": row.id})
+
+    op.alter_column("projects", "slug", existing_type=sa.String(length=255), nullable=False)
+    existing_project_indexes = {idx["name"] for idx in insp.get_indexes("projects")}
+    if "ux_projects_slug" not in existing_project_indexes:
+        op.create_index("ux_projects_slug", "projects", ["slug"], unique=True)
+
+    # Give legacy milestones a slug so lookups no longer fall back to scanning names;
+    # skip any that would collide with an existing (project_id, slug).
+    op.execute(
+        """
+        UPDATE milestones AS m
+        SET slug = c.slug
+        FROM (
+            SELECT id, project_id, slug,
+                   row_number() OVER (PARTITION BY project_id, slug ORDER BY created_at, id) AS rn
+            FROM (
+                SELECT id, project_id, created_at,
+                       trim(both '-' from regexp_replace(lower(name), '[^a-z0-9]+', '-', 'g')) AS slug
+                FROM milestones
+                WHERE slug IS NULL
+            ) AS derived
+        ) AS c
+        WHERE m.id = c.id
+          AND c.rn = 1
+          AND c.slug <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM milestones AS other
+              WHERE other.project_id = c.project_id AND other.slug = c.slug
+          )
+        """
+    )
+
+    existing_milestone_indexes = {idx["name"] for idx in insp.get_indexes("milestones")}
+    if "ix_milestones_project_lower_slug" not in existing_milestone_indexes:
+        op.create_index(
+            "ix_milestones_project_lower_slug",
+            "milestones",
+            [sa.text("project_id"), sa.text("lower(slug)")],
+        )
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index("ix_milestones_project_lower_slug", table_name="milestones")
+    except Exception:
+        pass
+    try:
+        op.drop_index("ux_projects_slug", table_name="projects")
+    except Exception:
+        pass
+    try:
+        op.drop_column("projects", "slug")
+    except Exception:
+        pass
@@ -0,0 +1,39 @@
+"""Add (project_id, created_at, id) indexes for keyset pagination
+
+Revision ID: 202610170005
+Revises: 202610170004
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610170005"
+down_revision = "202610170004"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_tasks_project_created_id", "tasks"),
+    ("ix_event_logs_project_created_id", "event_logs"),
+    ("ix_bugs_project_created_id", "bugs"),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    for name, table in INDEXES:
+        existing_indexes = {idx["name"] for idx in insp.get_indexes(table)}
+        if name not in existing_indexes:
+            op.create_index(name, table, ["project_id", "created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    for name, table in INDEXES:
+        try:
+            op.drop_index(name, table_name=table)
+        except Exception:
+            pass
@@ -0,0 +1,114 @@
+"""Partition event_logs by month on created_at
+
+Revision ID: 202610170006
+Revises: 202610170005
+Create Date: 2026-10-17
+
+Rebuilds event_logs as a range-partitioned table: one partition per month from
+the oldest event through three months ahead, plus a default partition. The
+rows are copied in the migration's transaction, which holds an exclusive lock
+on the table until it commits, so run it in a maintenance window on large
+installations. Later months are created by app.event_partitions.
+
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610170006"
+down_revision = "202610170005"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, project_id, milestone_id, task_id, category, summary, details, created_at"
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def _relkind(bind) -> str | None:
+    return bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass('event_logs')")).scalar()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or _relkind(bind) != "r":
+        return
+
+    op.execute("ALTER TABLE event_logs RENAME TO event_logs_unpartitioned")
+    op.execute("ALTER INDEX event_logs_pkey RENAME TO event_logs_unpartitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_event_logs_project_created_id")
+    op.execute(
+        """
+        CREATE TABLE event_logs (
+            id uuid NOT NULL,
+            project_id uuid NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+            milestone_id uuid REFERENCES milestones (id) ON DELETE SET NULL,
+            task_id uuid REFERENCES tasks (id) ON DELETE SET NULL,
+            category varchar(64) NOT NULL,
+            summary varchar(255) NOT NULL,
+            details text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT event_logs_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE TABLE event_logs_default PARTITION OF event_logs DEFAULT")
+
+    today = datetime.now(timezone.utc).date()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM event_logs_unpartitioned")).scalar()
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE event_logs_y{month.year:04d}m{month.month:02d} PARTITION OF event_logs "
+            f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(_add_months(month, 1))})"
+        )
+        month = _add_months(month, 1)
+
+    op.execute(f"INSERT INTO event_logs ({COLUMNS}) SELECT {COLUMNS} FROM event_logs_unpartitioned")
+    op.execute("DROP TABLE event_logs_unpartitioned")
+    # on the parent, so each partition (including ones attached later) gets its own copy
+    op.create_index("ix_event_logs_project_created_id", "event_logs", ["project_id", "created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or _relkind(bind) != "p":
+        return
+
+    op.execute("ALTER TABLE event_logs RENAME TO event_logs_partitioned")
+    op.execute("ALTER INDEX event_logs_pkey RENAME TO event_logs_partitioned_pkey")
+    try:
+        op.drop_index("ix_event_logs_project_created_id", table_name="event_logs_partitioned")
+    except Exception:
+        pass
+    op.execute(
+        """
+        CREATE TABLE event_logs (
+            id uuid NOT NULL,
+            project_id uuid NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+            milestone_id uuid REFERENCES milestones (id) ON DELETE SET NULL,
+            task_id uuid REFERENCES tasks (id) ON DELETE SET NULL,
+            category varchar(64) NOT NULL,
+            summary varchar(255) NOT NULL,
+            details text,
+            created_at timestamptz NOT NULL,
+            CONSTRAINT event_logs_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    # detached (archived) partitions are left alone
+    op.execute(f"INSERT INTO event_logs ({COLUMNS}) SELECT {COLUMNS} FROM event_logs_partitioned")
+    op.execute("DROP TABLE event_logs_partitioned")
+    op.create_index("ix_event_logs_project_created_id", "event_logs", ["project_id", "created_at", "id"], unique=False)
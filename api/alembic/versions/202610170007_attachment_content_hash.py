@@ -0,0 +1,46 @@
+"""Add sha256, size_bytes and content_type to attachments
+
+Revision ID: 202610170007
+Revises: 202610170006
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610170007"
+down_revision = "202610170006"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ("sha256", sa.String(length=64)),
+    ("size_bytes", sa.BigInteger()),
+    ("content_type", sa.String(length=255)),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_columns = {col["name"] for col in insp.get_columns("attachments")}
+    for name, type_ in COLUMNS:
+        if name not in existing_columns:
+            op.add_column("attachments", sa.Column(name, type_, nullable=True))
+    existing_indexes = {idx["name"] for idx in insp.get_indexes("attachments")}
+    if "ix_attachments_sha256" not in existing_indexes:
+        op.create_index("ix_attachments_sha256", "attachments", ["sha256"], unique=False)
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index("ix_attachments_sha256", table_name="attachments")
+    except Exception:
+        pass
+    for name, _type in reversed(COLUMNS):
+        try:
+            op.drop_column("attachments", name)
+        except Exception:
+            pass
@@ -0,0 +1,82 @@
+"""Key context_index by (repo_id, branch); add newest-first snapshot indexes
+
+Revision ID: 202610170008
+Revises: 202610170007
+Create Date: 2026-10-17
+
+context_index gets a branch column ("" is the latest snapshot on any branch)
+and is rebuilt from context_snapshot. The old index could miss snapshots
+recorded while its second commit failed. ix_context_snapshot_repo_id is
+replaced by (repo_id, created_at DESC) and (repo_id, branch, created_at DESC).
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610170008"
+down_revision = "202610170007"
+branch_labels = None
+depends_on = None
+
+SNAPSHOT_INDEXES = {
+    "ix_context_snapshot_repo_created": ["repo_id", sa.text("created_at DESC")],
+    "ix_context_snapshot_repo_branch_created": ["repo_id", "branch", sa.text("created_at DESC")],
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_indexes = {idx["name"] for idx in insp.get_indexes("context_snapshot")}
+    for name, columns in SNAPSHOT_INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "context_snapshot", columns, unique=False)
+    if "ix_context_snapshot_repo_id" in existing_indexes:
+        op.drop_index("ix_context_snapshot_repo_id", table_name="context_snapshot")
+
+    if "branch" in {col["name"] for col in insp.get_columns("context_index")}:
+        return
+    op.add_column(
+        "context_index", sa.Column("branch", sa.String(length=255), nullable=False, server_default="")
+    )
+    op.drop_constraint("context_index_pkey", "context_index", type_="primary")
+    op.create_primary_key("context_index_pkey", "context_index", ["repo_id", "branch"])
+    op.execute("DELETE FROM context_index")
+    op.execute(
+        """
+        INSERT INTO context_index (repo_id, branch, latest_snapshot_id, updated_at)
+        SELECT DISTINCT ON (repo_id) repo_id, '', id, now()
+        FROM context_snapshot
+        ORDER BY repo_id, created_at DESC, id DESC
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO context_index (repo_id, branch, latest_snapshot_id, updated_at)
+        SELECT DISTINCT ON (repo_id, branch) repo_id, branch, id, now()
+        FROM context_snapshot
+        WHERE branch IS NOT NULL AND branch <> ''
+        ORDER BY repo_id, branch, created_at DESC, id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if "branch" in {col["name"] for col in insp.get_columns("context_index")}:
+        op.execute("DELETE FROM context_index WHERE branch <> ''")
+        op.drop_constraint("context_index_pkey", "context_index", type_="primary")
+        op.drop_column("context_index", "branch")
+        op.create_primary_key("context_index_pkey", "context_index", ["repo_id"])
+
+    existing_indexes = {idx["name"] for idx in insp.get_indexes("context_snapshot")}
+    if "ix_context_snapshot_repo_id" not in existing_indexes:
+        op.create_index("ix_context_snapshot_repo_id", "context_snapshot", ["repo_id"], unique=False)
+    for name in SNAPSHOT_INDEXES:
+        try:
+            op.drop_index(name, table_name="context_snapshot")
+        except Exception:
+            pass
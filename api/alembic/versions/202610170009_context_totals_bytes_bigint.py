@@ -0,0 +1,26 @@
+"""Widen context_snapshot.totals_bytes to bigint
+
+Revision ID: 202610170009
+Revises: 202610170008
+Create Date: 2026-10-17
+
+Scanned monorepos pass 2 GiB, which overflows integer.
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "202610170009"
+down_revision = "202610170008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column("context_snapshot", "totals_bytes", type_=sa.BigInteger(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column("context_snapshot", "totals_bytes", type_=sa.Integer(), existing_nullable=False)
@@ -0,0 +1,192 @@
+"""Content-addressed storage for task attachments.
+
+Blobs live at ``ATTACHMENTS_DIR/sha256/<first two hex digits>/<sha256>``, so
+identical uploads (the same log attached to several tasks, an agent retrying an
+upload) are stored once. A blob is written to a temporary file under
+``ATTACHMENTS_DIR/tmp`` while it is hashed, then renamed into place, so readers
+never see a partial blob. Blobs can be shared by several attachments and are
+not removed when an attachment or its task is deleted.
+
+``receive_files`` feeds a ``multipart/form-data`` request body straight from
+the socket into blob writers, one per file part. Memory use per upload stays at
+about two write buffers however large the files are. The body is collected on
+the event loop a buffer at a time; parsing, hashing and writing each buffer run
+in the threadpool so a large upload does not stall other requests.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from .db import settings
+
+ATTACHMENTS_DIR = Path(settings.attachments_dir)
+BLOB_DIR = ATTACHMENTS_DIR / "sha256"
+TMP_DIR = ATTACHMENTS_DIR / "tmp"
+for _directory in (ATTACHMENTS_DIR, BLOB_DIR, TMP_DIR):
+    _directory.mkdir(parents=True, exist_ok=True)
+
+WRITE_BUFFER = 1024 * 1024
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class Blob:
+    path: Path
+    sha256: str
+    size: int
+
+
+@dataclass
+class UploadedFile:
+    name: str
+    content_type: str
+    blob: Blob
+
+
+def blob_path(sha256: str) -> Path:
+    return BLOB_DIR / sha256[:2] / sha256
+
+
+class BlobWriter:
+    """Hash and spool one blob to disk; ``commit`` moves it to its content address."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        descriptor, name = tempfile.mkstemp(dir=TMP_DIR)
+        self._tmp_path = Path(name)
+        self._file = os.fdopen(descriptor, "wb", buffering=WRITE_BUFFER)
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadRejected(413, f"Attachment larger than {self.max_bytes} bytes")
+        self._hash.update(data)
+        self._file.write(data)
+
+    def commit(self) -> Blob:
+        self._file.close()
+        sha256 = self._hash.hexdigest()
+        path = blob_path(sha256)
+        if path.exists():
+            self._tmp_path.unlink()
+        else:
+            path.parent.mkdir(exist_ok=True)
+            # atomic; a concurrent upload of the same content renames identical bytes
+            os.replace(self._tmp_path, path)
+        return Blob(path, sha256, self.size)
+
+    def discard(self) -> None:
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def store_bytes(data: bytes) -> Blob:
+    """Store an in-memory blob (the base64 attachments of ``POST /v1/tasks``)."""
+    writer = BlobWriter(max_bytes=len(data))
+    try:
+        writer.write(data)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.commit()
+
+
+def _file_name(raw: bytes) -> str:
+    # browsers and curl send the bare name, but never trust a client-supplied path
+    name = Path(raw.decode("utf-8", "replace").replace("\\", "/")).name.strip()
+    return name[:255] or "attachment"
+
+
+async def receive_files(request: Request, max_bytes: int) -> list[UploadedFile]:
+    """Store every file part of a multipart request body; other form fields are ignored."""
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise UploadRejected(415, "Expected a multipart/form-data body")
+
+    uploads: list[UploadedFile] = []
+    headers: dict[bytes, bytes] = {}
+    field, value = bytearray(), bytearray()
+    part: dict[str, Any] = {"writer": None}
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        headers[bytes(field).lower()] = bytes(value)
+        field.clear()
+        value.clear()
+
+    def on_headers_finished() -> None:
+        _disposition, params = parse_options_header(headers.get(b"content-disposition", b""))
+        if b"filename" in params:
+            part["name"] = _file_name(params[b"filename"])
+            part["content_type"] = headers.get(b"content-type", b"").decode("latin-1") or DEFAULT_CONTENT_TYPE
+            part["writer"] = BlobWriter(max_bytes)
+        headers.clear()
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        writer: Optional[BlobWriter] = part["writer"]
+        if writer is not None:
+            writer.write(data[start:end])
+
+    def on_part_end() -> None:
+        writer: Optional[BlobWriter] = part["writer"]
+        if writer is not None:
+            part["writer"] = None
+            uploads.append(UploadedFile(part["name"], part["content_type"], writer.commit()))
+
+    parser = MultipartParser(
+        options[b"boundary"],
+        {
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    def discard() -> None:
+        if part["writer"] is not None:
+            part["writer"].discard()
+
+    pending = bytearray()
+    try:
+        async for chunk in request.stream():
+            pending.extend(chunk)
+            if len(pending) >= WRITE_BUFFER:
+                await run_in_threadpool(parser.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await run_in_threadpool(parser.write, bytes(pending))
+        await run_in_threadpool(parser.finalize)
+    except MultipartParseError as exc:
+        raise UploadRejected(400, f"Malformed multipart body: {exc}") from exc
+    finally:
+        await run_in_threadpool(discard)
+    if not uploads:
+        raise UploadRejected(400, "No file parts in the upload")
+    return uploads
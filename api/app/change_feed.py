@@ -0,0 +1,224 @@
+"""Project change feed: write routes publish, ``GET /v1/projects/{id}/stream`` listens.
+
+Producing. A ``Session`` ``after_flush`` hook notes every task, milestone, bug
+and event row the ORM inserts, updates or deletes; bulk Core writes (which the
+ORM never sees) call ``record_change`` themselves. The notes are kept on the
+session and sent once it commits (see ``app.redis_outbox``), as one message per
+project to the Redis channel ``madb:changes:<project>``. Rolled-back work is
+discarded, and a slow or unavailable Redis never holds up (or fails) the write
+that produced the change.
+
+Consuming. Every worker process holds one pattern subscription
+(``madb:changes:*``) while it has stream clients, and fans messages out to the
+per-client queues of the project they name, so changes made on any worker reach
+clients connected to any other.
+
+Redis pub/sub keeps no history: a client that reconnects, falls behind, or was
+connected while the subscription dropped gets a ``resync`` notice and should
+refetch what it shows (conditional GETs make that cheap). With ``REDIS_URL``
+unset the feed is off: nothing is published and the stream route returns 503.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+import orjson
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import redis_outbox
+from .db import settings
+from .models import Bug, EventLog, Milestone, Task
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "madb:changes:"
+# a commit touching more rows than this is announced as a single resync
+MAX_CHANGES_PER_MESSAGE = 500
+# messages waiting for one stream client
+CLIENT_QUEUE_SIZE = 256
+SSE_MEDIA_TYPE = "text/event-stream"
+# comment line sent on idle streams so proxies keep the connection open
+KEEPALIVE_SECONDS = 15.0
+RESYNC = {"type": "resync"}
+
+_KINDS = {Task: "task", Milestone: "milestone", Bug: "bug", EventLog: "event"}
+
+enabled = redis_outbox.enabled
+
+
+def _channel(project_id: Any) -> str:
+    return f"{CHANNEL_PREFIX}{project_id}"
+
+
+# --- producing -------------------------------------------------------------
+
+
+def record_change(session: Session, kind: str, action: str, project_id: Any, row_id: Any, **fields: Any) -> None:
+    """Note a change made with a Core statement; it is published if the transaction commits."""
+    if project_id is None or not enabled():
+        return
+    change = {"type": kind, "action": action, "id": str(row_id), **fields}
+    redis_outbox.bucket(session, "changes", lambda: defaultdict(list))[str(project_id)].append(change)
+
+
+def _describe(obj: Any) -> dict[str, Any]:
+    if isinstance(obj, Task):
+        return {"status": obj.status, "lock_version": obj.lock_version, "milestone_id": str(obj.milestone_id)}
+    if isinstance(obj, (Milestone, Bug)):
+        return {"status": obj.status}
+    return {}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, _flush_context: Any) -> None:
+    if not enabled():
+        return
+    # new/dirty/deleted still hold their pre-flush contents here
+    for action, objects in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objects:
+            kind = _KINDS.get(type(obj))
+            if kind is None:
+                continue
+            if action == "updated" and not session.is_modified(obj, include_collections=False):
+                continue
+            fields = _describe(obj) if action != "deleted" else {}
+            record_change(session, kind, action, obj.project_id, obj.id, **fields)
+
+
+def _publish(pipe: Any, pending: dict[str, list[dict[str, Any]]]) -> None:
+    for project_id, changes in pending.items():
+        if len(changes) > MAX_CHANGES_PER_MESSAGE:
+            changes = [RESYNC]
+        pipe.publish(_channel(project_id), orjson.dumps(changes))
+
+
+redis_outbox.register("changes", _publish)
+
+
+# --- consuming -------------------------------------------------------------
+
+
+class _Hub:
+    """Per-process fan-out from one Redis pattern subscription to stream clients."""
+
+    def __init__(self) -> None:
+        self._clients: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def client_count(self) -> int:
+        return sum(len(clients) for clients in self._clients.values())
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, project_id: UUID) -> AsyncIterator[asyncio.Queue]:
+        key = str(project_id)
+        client: asyncio.Queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self._clients[key].add(client)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        try:
+            yield client
+        finally:
+            self._clients[key].discard(client)
+            if not self._clients[key]:
+                del self._clients[key]
+            if not self._clients and self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+
+    def _deliver(self, client: asyncio.Queue, changes: list[dict[str, Any]]) -> None:
+        try:
+            client.put_nowait(changes)
+        except asyncio.QueueFull:
+            # the client is behind; drop what it has not read and tell it to refetch
+            while not client.empty():
+                client.get_nowait()
+            client.put_nowait([RESYNC])
+
+    def _broadcast_resync(self) -> None:
+        for clients in self._clients.values():
+            for client in clients:
+                self._deliver(client, [RESYNC])
+
+    def _dispatch(self, message: dict[str, Any]) -> None:
+        key = message["channel"].decode()[len(CHANNEL_PREFIX):]
+        clients = self._clients.get(key)
+        if not clients:
+            return
+        changes = orjson.loads(message["data"])
+        if not isinstance(changes, list) or not all(
+            isinstance(change, dict) and isinstance(change.get("type"), str) for change in changes
+        ):
+            raise ValueError("expected a list of changes")
+        for queue_ in list(clients):
+            self._deliver(queue_, changes)
+
+    async def _listen(self) -> None:
+        backoff = 1.0
+        connected_before = False
+        while True:
+            client = aioredis.Redis.from_url(settings.redis_url)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                if connected_before:
+                    # anything published while we were away is lost
+                    self._broadcast_resync()
+                connected_before, backoff = True, 1.0
+                async for message in pubsub.listen():
+                    try:
+                        self._dispatch(message)
+                    except Exception:
+                        # one malformed message must not end delivery for every client
+                        logger.warning("change feed: skipping bad message on %r", message.get("channel"), exc_info=True)
+            except redis.RedisError as exc:
+                logger.warning("change feed subscription lost: %s", exc)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            except Exception:
+                # anything else would end the task silently and stop the feed on this worker
+                logger.exception("change feed listener failed; resubscribing")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                with contextlib.suppress(Exception):
+                    await pubsub.aclose()
+                    await client.aclose()
+
+
+hub = _Hub()
+
+
+def _sse(change: dict[str, Any]) -> bytes:
+    return b"event: " + change["type"].encode() + b"\ndata: " + orjson.dumps(change) + b"\n\n"
+
+
+async def event_stream(project_id: UUID) -> AsyncIterator[bytes]:
+    """Server-sent events for one project: ``ready`` first, then one event per change."""
+    async with hub.subscribe(project_id) as client:
+        yield b"retry: 3000\nevent: ready\ndata: {}\n\n"
+        while True:
+            try:
+                changes = await asyncio.wait_for(client.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield b"".join(_sse(change) for change in changes)
+
+
+def feed_stats() -> dict[str, int]:
+    sent = redis_outbox.outbox_stats("changes")
+    return {
+        "published": sent["sent"],
+        "dropped": sent["dropped"],
+        "publish_failures": sent["failures"],
+        "stream_clients": hub.client_count,
+    }
@@ -0,0 +1,94 @@
+"""Work-queue claims: give each agent the best ready task without a conflict storm.
+
+Ranking is the ``/next-action`` scoring (``app.scoring_services``) restricted
+to ``not_started`` tasks the persona may take. The winner is then locked with
+``SELECT ... FOR UPDATE SKIP LOCKED`` in rank order, so agents claiming at the
+same time each lock a different task instead of all racing for the top one and
+retrying on 409s.
+
+Persona limits are checked in the same transaction:
+
+- ``Persona.maximum_active_tasks`` caps the project's ``in_progress`` tasks
+  assigned to the persona.
+- ``ProjectPersona.limit_per_agent`` caps the ``in_progress`` tasks the
+  claiming agent owns in the project.
+
+When either limit is set, claims for that persona in that project take a
+transaction-scoped advisory lock first, so two concurrent claims cannot both
+see room for one more task.
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Session
+
+from .models import Persona, Project, ProjectPersona, Task
+from .offload import offload
+from .scoring_services import ScoringWeights, TaskColumns, load_task_columns, score_tasks
+
+# ranked candidates offered to each SKIP LOCKED probe
+CLAIM_WINDOW = 50
+
+
+def persona_limit_reached(session: Session, project_id: object, persona: Optional[str], agent: str) -> Optional[str]:
+    """Why ``agent`` may not claim another task as ``persona`` right now, or None."""
+    if not persona:
+        return None
+    limits = session.execute(
+        sa.select(Persona.maximum_active_tasks, ProjectPersona.limit_per_agent)
+        .select_from(Persona)
+        .outerjoin(
+            ProjectPersona, (ProjectPersona.persona_key == Persona.key) & (ProjectPersona.project_id == project_id)
+        )
+        .where(Persona.key == persona)
+    ).first()
+    if limits is None or (limits.maximum_active_tasks is None and limits.limit_per_agent is None):
+        return None
+
+    # held until commit/rollback; serializes claims for this persona in this project
+    lock_key = sa.func.hashtextextended(f"tasks:claim:{project_id}:{persona}", 0)
+    session.execute(sa.select(sa.func.pg_advisory_xact_lock(lock_key)))
+    persona_active, agent_active = session.execute(
+        sa.select(
+            sa.func.count().filter(Task.assignee_persona == persona),
+            sa.func.count().filter(Task.owner == agent),
+        ).where(Task.project_id == project_id, Task.status == "in_progress")
+    ).one()
+    if limits.maximum_active_tasks is not None and persona_active >= limits.maximum_active_tasks:
+        return f"Persona {persona} already has {persona_active} active tasks (maximum {limits.maximum_active_tasks})"
+    if limits.limit_per_agent is not None and agent_active >= limits.limit_per_agent:
+        return f"Agent {agent} already has {agent_active} active tasks (limit {limits.limit_per_agent} per agent)"
+    return None
+
+
+def _claim_order(columns: TaskColumns, weights: ScoringWeights, persona: Optional[str]) -> list[Any]:
+    """Ids of the claimable tasks, best first."""
+    scores = score_tasks(columns, weights, persona=persona)
+    claimable = columns.status == "not_started"
+    if not persona:
+        # agents without a persona only take work nobody has been earmarked for
+        claimable &= (columns.persona_required == "") & (columns.assignee_persona == "")
+    return [columns.ids[index] for index in scores.ranked(columns) if claimable[index]]
+
+
+def claim_next_task(session: Session, project: Project, persona: Optional[str]) -> Optional[Task]:
+    """Lock and return the best-ranked claimable task, or None if every one is taken."""
+    columns = load_task_columns(session, project.id)
+    ranked = offload(_claim_order, columns, ScoringWeights.from_scheme(project.priority_scheme), persona)
+
+    for start in range(0, len(ranked), CLAIM_WINDOW):
+        window = sa.bindparam("window", ranked[start : start + CLAIM_WINDOW], type_=ARRAY(UUID(as_uuid=True)))
+        # status is re-checked on the locked row, so tasks claimed since the ranking read drop out
+        task = session.scalars(
+            sa.select(Task)
+            .where(Task.id == sa.any_(window), Task.status == "not_started")
+            .order_by(sa.func.array_position(window, Task.id))
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if task is not None:
+            return task
+    return None
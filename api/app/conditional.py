@@ -0,0 +1,66 @@
+"""Conditional GET support: weak ETags and ``If-None-Match`` → 304.
+
+ETags are built from values the route already has or can read cheaply
+(``lock_version``, ``updated_at`` of the rows on a page, roll-up timestamps),
+never by hashing the response body, so a matching request returns 304 before
+anything is serialized. They are weak validators (RFC 9110 §8.8.1): equal tags
+mean an equivalent representation, not byte-identical output.
+
+``Cache-Control: no-cache`` lets browsers keep the body but makes them
+revalidate on every fetch, which is what turns dashboard polling into 304s.
+"""
+from __future__ import annotations
+
+import hashlib
+import itertools
+from typing import Any, Iterable, Mapping, Optional
+
+from fastapi import Request, Response, status
+
+CACHE_CONTROL = "no-cache"
+# headers a 304 repeats from the 200 it stands in for
+_REPEATED_HEADERS = ("Link", "X-Next-Cursor", "Location")
+
+
+def make_etag(parts: Iterable[Any]) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\x1f")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def page_etag(rows: Iterable[Any], response: Response, versions: tuple[str, ...] = ("updated_at",)) -> str:
+    """ETag for a list page: each row's id and ``versions`` columns, plus the next cursor."""
+    keys = (tuple(getattr(row, name) for name in ("id", *versions)) for row in rows)
+    return make_etag(itertools.chain([response.headers.get("X-Next-Cursor")], keys))
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of ``etag`` against the request's ``If-None-Match`` list."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(
+    etag: str, headers: Optional[Mapping[str, str]] = None, cache_control: str = CACHE_CONTROL
+) -> Response:
+    repeated = {name: headers[name] for name in _REPEATED_HEADERS if headers and name in headers}
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={**repeated, "ETag": etag, "Cache-Control": cache_control},
+    )
@@ -0,0 +1,382 @@
+"""Bulk event log ingestion for ``POST /v1/events:batch``.
+
+Validation. A batch is checked with at most three IN queries (projects,
+milestones, tasks), fewer once the referenced ids sit in
+``app.resolution_cache``. Every item gets its own result, so one bad reference
+does not fail the rest of the batch.
+
+Writing. By default the valid events are inserted with multi-row INSERTs in the
+request's transaction and reported as 201. The checks trust the cache, so a
+reference deleted since it was cached fails the INSERT; the batch's entries are
+then evicted and its events checked and inserted one by one. With
+``EVENT_WRITE_BEHIND=true`` the valid events are handed to an in-process buffer
+instead and reported as 202. A background thread writes the buffer with COPY
+whenever it holds ``EVENT_FLUSH_ROWS`` events or its oldest event has waited
+``EVENT_FLUSH_INTERVAL_MS``. A buffer holding ``EVENT_BUFFER_MAX`` events
+rejects further batches (the route answers 429) rather than growing without
+bound.
+
+Buffered events are durable enough for activity logs, not for anything that
+must survive a crash: the buffer is flushed on a clean shutdown, but events
+still waiting when the process dies are lost. A reference that disappears
+between validation and the flush (a task deleted meanwhile) costs only that
+event: a failed COPY is retried row by row, and the rows that still fail are
+counted, logged and evicted from the cache.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from . import resolution_cache
+from .change_feed import record_change
+from .db import SessionLocal, settings
+from .models import EventLog, Milestone, Project, Task
+from .offload import offload
+from .schemas import EventBatchResult, EventLogCreate
+
+logger = logging.getLogger(__name__)
+
+# largest accepted batch
+MAX_BATCH_SIZE = 5000
+STALE_REFERENCE = "A referenced project, milestone or task was deleted while the event was written"
+
+_table = EventLog.__table__
+COLUMNS = ("id", "project_id", "milestone_id", "task_id", "category", "summary", "details", "created_at")
+_LENGTHS = {"category": _table.c.category.type.length, "summary": _table.c.summary.type.length}
+
+
+def _load_missing(session: Session, payloads: list[EventLogCreate]) -> None:
+    """Fill the ownership caches for every id the batch references."""
+    project_ids = {p.project_id for p in payloads if resolution_cache.project_ids.get(p.project_id) is None}
+    if project_ids:
+        for project_id in session.scalars(sa.select(Project.id).where(Project.id.in_(project_ids))):
+            resolution_cache.project_ids.set(project_id, True)
+
+    milestone_ids = {
+        p.milestone_id
+        for p in payloads
+        if p.milestone_id and resolution_cache.milestone_projects.get(p.milestone_id) is None
+    }
+    if milestone_ids:
+        rows = session.execute(sa.select(Milestone.id, Milestone.project_id).where(Milestone.id.in_(milestone_ids)))
+        for milestone_id, project_id in rows:
+            resolution_cache.milestone_projects.set(milestone_id, project_id)
+
+    task_ids = {p.task_id for p in payloads if p.task_id and resolution_cache.task_parents.get(p.task_id) is None}
+    if task_ids:
+        rows = session.execute(sa.select(Task.id, Task.project_id, Task.milestone_id).where(Task.id.in_(task_ids)))
+        for task_id, project_id, milestone_id in rows:
+            resolution_cache.task_parents.set(task_id, (project_id, milestone_id))
+
+
+class EventRejected(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _check(payload: EventLogCreate) -> dict[str, Any]:
+    """The row to insert for ``payload``. Needs ``_load_missing`` first."""
+    for column, length in _LENGTHS.items():
+        if len(getattr(payload, column)) > length:
+            raise EventRejected(422, f"{column} is longer than {length} characters")
+    if resolution_cache.project_ids.get(payload.project_id) is None:
+        raise EventRejected(400, "Project not found")
+
+    milestone_id = payload.milestone_id
+    if milestone_id is not None and resolution_cache.milestone_projects.get(milestone_id) != payload.project_id:
+        raise EventRejected(400, "Milestone not found for project")
+    if payload.task_id is not None:
+        parents = resolution_cache.task_parents.get(payload.task_id)
+        if parents is None:
+            raise EventRejected(400, "Task not found")
+        task_project_id, task_milestone_id = parents
+        if task_project_id != payload.project_id:
+            raise EventRejected(400, "Task does not belong to project")
+        if milestone_id is None:
+            milestone_id = task_milestone_id
+        elif milestone_id != task_milestone_id:
+            raise EventRejected(400, "Task does not belong to milestone")
+
+    row = payload.model_dump()
+    row.update(id=uuid.uuid4(), milestone_id=milestone_id, created_at=datetime.utcnow())
+    return row
+
+
+def validate_event(session: Session, payload: EventLogCreate) -> dict[str, Any]:
+    """The row to insert for one event; raises ``EventRejected``."""
+    _load_missing(session, [payload])
+    return _check(payload)
+
+
+def validate_events(
+    session: Session, payloads: list[EventLogCreate]
+) -> tuple[list[dict[str, Any]], list[EventBatchResult]]:
+    """Rows ready to insert, and one result per payload (``status`` 0 until the rows are written)."""
+    _load_missing(session, payloads)
+    return offload(_check_all, payloads)
+
+
+def _check_all(payloads: list[EventLogCreate]) -> tuple[list[dict[str, Any]], list[EventBatchResult]]:
+    rows: list[dict[str, Any]] = []
+    results: list[EventBatchResult] = []
+    for payload in payloads:
+        try:
+            row = _check(payload)
+        except EventRejected as exc:
+            results.append(EventBatchResult(ok=False, status=exc.status_code, error=exc.detail))
+            continue
+        rows.append(row)
+        results.append(EventBatchResult(ok=True, id=row["id"], status=0))
+    return rows, results
+
+
+def _forget(rows: list[dict[str, Any]]) -> None:
+    """Drop the cached ownership of everything ``rows`` reference, so the next check reads the database."""
+    for project_id in {row["project_id"] for row in rows}:
+        resolution_cache.forget_project(project_id)
+    for milestone_id in {row["milestone_id"] for row in rows if row["milestone_id"] is not None}:
+        resolution_cache.forget_milestone(milestone_id)
+    resolution_cache.forget_tasks([row["task_id"] for row in rows if row["task_id"] is not None])
+
+
+def _announce(session: Session, rows: list[dict[str, Any]]) -> None:
+    for row in rows:
+        record_change(session, "event", "created", row["project_id"], row["id"])
+
+
+def insert_events(session: Session, rows: list[dict[str, Any]]) -> None:
+    """Insert ``rows`` in the session's transaction with multi-row INSERTs."""
+    if rows:
+        # executemany form: SQLAlchemy batches it into multi-row VALUES from one cached statement
+        session.execute(sa.insert(_table), rows)
+    _announce(session, rows)
+
+
+def write_event(session: Session, payload: EventLogCreate, row: dict[str, Any]) -> EventLog:
+    """Insert and commit one event checked by ``validate_event``; raises ``EventRejected``.
+
+    A reference deleted since it was cached fails the INSERT with a foreign
+    key violation; the event is then checked again against the database.
+    """
+    for attempt in range(2):
+        event = EventLog(**row)
+        session.add(event)
+        try:
+            session.commit()
+            return event
+        except sa.exc.IntegrityError:
+            session.rollback()
+            _forget([row])
+        if attempt == 0:
+            row = validate_event(session, payload)
+    raise EventRejected(409, STALE_REFERENCE)
+
+
+def write_events(
+    session: Session, payloads: list[EventLogCreate], rows: list[dict[str, Any]], results: list[EventBatchResult]
+) -> None:
+    """Insert and commit the rows ``validate_events`` accepted, updating ``results`` for any that fail.
+
+    A project, milestone or task deleted (by another worker, or with bulk SQL)
+    after it was cached fails the multi-row INSERT with a foreign key
+    violation. The batch's cache entries are then dropped and each event is
+    checked again and inserted under its own savepoint, so only the events
+    whose references are gone fail, with the usual per-item error.
+    """
+    try:
+        insert_events(session, rows)
+        session.commit()
+        return
+    except sa.exc.IntegrityError:
+        session.rollback()
+    _forget(rows)
+    _load_missing(session, payloads)
+    written: list[dict[str, Any]] = []
+    for index, (payload, result) in enumerate(zip(payloads, results)):
+        if not result.ok:
+            continue
+        try:
+            row = _check(payload)
+        except EventRejected as exc:
+            results[index] = EventBatchResult(ok=False, status=exc.status_code, error=exc.detail)
+            continue
+        row["id"] = result.id
+        try:
+            with session.begin_nested():
+                session.execute(sa.insert(_table).values(row))
+        except sa.exc.IntegrityError:
+            results[index] = EventBatchResult(ok=False, status=409, error=STALE_REFERENCE)
+            continue
+        written.append(row)
+    # announced last: a savepoint rollback discards the changes queued so far
+    _announce(session, written)
+    session.commit()
+
+
+# --- write-behind buffer ---------------------------------------------------
+
+
+def _copy_rows(session: Session, rows: list[dict[str, Any]]) -> None:
+    cursor = session.connection().connection.driver_connection.cursor()
+    with cursor, cursor.copy(f"COPY {_table.name} ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row([row[column] for column in COLUMNS])
+
+
+class WriteBehindBuffer:
+    """Bounded in-process event buffer drained by one background thread."""
+
+    def __init__(self, max_rows: int, flush_rows: int, flush_interval: float) -> None:
+        self.max_rows = max_rows
+        self.flush_rows = max(flush_rows, 1)
+        self.flush_interval = flush_interval
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self._rows: list[dict[str, Any]] = []
+        self._oldest = 0.0
+        self._ready = threading.Condition()
+        # held while a batch is being written, so flush() can wait for it
+        self._writing = threading.Lock()
+        threading.Thread(target=self._run, name="event-write-behind", daemon=True).start()
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def offer(self, rows: list[dict[str, Any]]) -> bool:
+        """Queue all of ``rows``, or none of them if the buffer has no room."""
+        with self._ready:
+            if len(self._rows) + len(rows) > self.max_rows:
+                self.rejected += len(rows)
+                return False
+            was_empty = not self._rows
+            if was_empty:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            self.accepted += len(rows)
+            # wake the writer to start the interval timer, or to flush a full batch
+            if was_empty or len(self._rows) >= self.flush_rows:
+                self._ready.notify()
+        return True
+
+    def _take(self) -> list[dict[str, Any]]:
+        rows, self._rows = self._rows, []
+        return rows
+
+    def _run(self) -> None:
+        while True:
+            with self._ready:
+                while True:
+                    if len(self._rows) >= self.flush_rows:
+                        break
+                    if self._rows:
+                        remaining = self._oldest + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._ready.wait(remaining)
+                    else:
+                        self._ready.wait()
+                # take the lock before releasing the condition so flush() cannot miss this batch
+                self._writing.acquire()
+                rows = self._take()
+            try:
+                self._write(rows)
+            finally:
+                self._writing.release()
+
+    def flush(self) -> None:
+        """Write everything buffered now, after any batch already being written."""
+        with self._ready:
+            # same lock order as _run
+            self._writing.acquire()
+            rows = self._take()
+        try:
+            if rows:
+                self._write(rows)
+        finally:
+            self._writing.release()
+
+    def _write(self, rows: list[dict[str, Any]]) -> None:
+        session = SessionLocal()
+        try:
+            try:
+                _copy_rows(session, rows)
+                _announce(session, rows)
+                session.commit()
+                self.written += len(rows)
+                return
+            except Exception as exc:
+                session.rollback()
+                logger.warning("event write-behind: COPY of %d rows failed, retrying row by row: %s", len(rows), exc)
+            written = []
+            for row in rows:
+                try:
+                    with session.begin_nested():
+                        session.execute(sa.insert(_table).values(row))
+                    written.append(row)
+                except sa.exc.DBAPIError as exc:
+                    self.failed += 1
+                    _forget([row])
+                    logger.warning("event write-behind: dropped event %s: %s", row["id"], exc.orig)
+            # announced last: a savepoint rollback discards the changes queued so far
+            _announce(session, written)
+            session.commit()
+            self.written += len(written)
+        except Exception:
+            self.failed += len(rows)
+            logger.exception("event write-behind: lost %d events", len(rows))
+        finally:
+            session.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": self.pending,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+_buffer: Optional[WriteBehindBuffer] = None
+_lock = threading.Lock()
+
+
+def write_behind_buffer() -> Optional[WriteBehindBuffer]:
+    """The process's buffer when ``EVENT_WRITE_BEHIND`` is on, else None."""
+    global _buffer
+    if not settings.event_write_behind:
+        return None
+    if _buffer is None:
+        with _lock:
+            if _buffer is None:
+                _buffer = WriteBehindBuffer(
+                    settings.event_buffer_max, settings.event_flush_rows, settings.event_flush_interval_ms / 1000
+                )
+                atexit.register(flush_buffer)
+    return _buffer
+
+
+def flush_buffer() -> None:
+    """Write out the buffer, if there is one; called on shutdown."""
+    if _buffer is not None:
+        _buffer.flush()
+
+
+def buffer_stats() -> dict[str, int]:
+    if _buffer is None:
+        return {"pending": 0, "accepted": 0, "rejected": 0, "written": 0, "failed": 0}
+    return _buffer.stats()
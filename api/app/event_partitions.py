@@ -0,0 +1,158 @@
+"""Monthly range partitions for ``event_logs``.
+
+The table is partitioned on ``created_at`` (migration 202610170006). Each
+calendar month (UTC) lives in ``event_logs_yYYYYmMM``, and
+``event_logs_default`` catches rows for months that have no partition yet, so
+an insert never fails because maintenance fell behind. Indexes are declared on
+the parent, so every partition gets its own ``(project_id, created_at, id)``
+index, and reads that filter on ``created_at`` (cursor pages, the retention
+cut-off) only touch the months they need.
+
+Maintenance (``ensure_partitions``, ``expire_partitions``) runs at API startup
+and from ``python -m app.scripts.maintain_event_partitions``:
+
+- partitions are created for the current month, the next
+  ``EVENT_PARTITIONS_AHEAD`` months, and any month with rows in the default
+  partition; those rows are moved into their new partition;
+- with ``EVENT_RETENTION_MONTHS`` set, months that ended before the retention
+  window are detached. A detached partition is an ordinary table that keeps
+  its rows for archiving (``pg_dump -t``) until it is dropped; the script drops
+  it right away with ``--drop``.
+
+Both take a transaction-scoped advisory lock, so concurrent runs (several
+workers starting at once) do not race each other.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+from .db import engine, settings
+
+logger = logging.getLogger(__name__)
+
+PARENT = "event_logs"
+DEFAULT_PARTITION = "event_logs_default"
+_NAME = re.compile(r"^event_logs_y(\d{4})m(\d{2})$")
+_LOCK_KEY = sa.func.hashtextextended("event_logs:partitions", 0)
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def _bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    relkind = connection.execute(
+        sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": PARENT}
+    ).scalar()
+    return relkind == "p"
+
+
+def partitions(connection: Connection) -> dict[date, str]:
+    """Attached monthly partitions by the first day of their month."""
+    names = connection.execute(
+        sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ),
+        {"name": PARENT},
+    ).scalars()
+    months: dict[date, str] = {}
+    for name in names:
+        match = _NAME.match(name)
+        if match:
+            months[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return months
+
+
+def _lock(connection: Connection) -> None:
+    connection.execute(sa.select(sa.func.pg_advisory_xact_lock(_LOCK_KEY)))
+
+
+def create_partition(connection: Connection, month: date) -> str:
+    """Attach the partition for ``month``, moving its rows out of the default partition."""
+    name = partition_name(month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    # built detached so rows caught by the default partition can be moved in before attaching
+    connection.execute(sa.text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(
+        sa.text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= {lower} AND created_at < {upper} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+    )
+    connection.execute(sa.text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})"))
+    return name
+
+
+def ensure_partitions(connection: Connection, months_ahead: int, today: Optional[date] = None) -> list[str]:
+    """Create the missing partitions from this month through ``months_ahead`` months from now.
+
+    Months that have rows in the default partition (inserted before their
+    partition existed) get a partition too.
+    """
+    if not is_partitioned(connection):
+        return []
+    _lock(connection)
+    current = month_start(today or datetime.now(timezone.utc).date())
+    wanted = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    stranded = connection.execute(
+        sa.text(f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date FROM {DEFAULT_PARTITION}")
+    ).scalars()
+    wanted.update(stranded)
+    existing = partitions(connection)
+    return [create_partition(connection, month) for month in sorted(wanted) if month not in existing]
+
+
+def expire_partitions(
+    connection: Connection, retention_months: int, drop: bool = False, today: Optional[date] = None
+) -> list[str]:
+    """Detach (or drop) partitions whose month ended before the last ``retention_months`` months."""
+    if retention_months <= 0 or not is_partitioned(connection):
+        return []
+    _lock(connection)
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc).date()), -retention_months)
+    expired = [name for month, name in sorted(partitions(connection).items()) if add_months(month, 1) <= cutoff]
+    for name in expired:
+        connection.execute(sa.text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        if drop:
+            connection.execute(sa.text(f"DROP TABLE {name}"))
+    return expired
+
+
+def maintain(drop: bool = False) -> tuple[list[str], list[str]]:
+    """Apply the configured look-ahead and retention; returns (created, expired) partition names."""
+    with engine.begin() as connection:
+        created = ensure_partitions(connection, settings.event_partitions_ahead)
+        expired = expire_partitions(connection, settings.event_retention_months, drop=drop)
+    return created, expired
+
+
+def maintain_on_startup() -> None:
+    """``maintain`` for the API's startup hook: failures are logged, never raised."""
+    try:
+        created, expired = maintain()
+    except Exception as exc:
+        logger.warning("event_logs partition maintenance failed: %s", exc)
+        return
+    if created or expired:
+        logger.info("event_logs partitions created %s, detached %s", created, expired)
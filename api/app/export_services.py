@@ -0,0 +1,107 @@
+"""Streaming NDJSON export of a project's rows.
+
+Rows are read through a server-side cursor (``yield_per``) and written out one
+batch at a time, so an export holds at most ``EXPORT_BATCH_SIZE`` rows in
+memory however large the project is. Each entity is read with a column
+projection (no ORM identity map, no lazy relationship loads) and encoded with
+the same ``*Read`` schema the list routes use.
+
+The generators open their own session: the request's ``get_session`` session
+is closed before a ``StreamingResponse`` body starts being sent. That session's
+transaction is exempt from the pool's statement and idle-in-transaction
+timeouts, which would otherwise truncate long or slowly read exports.
+"""
+from __future__ import annotations
+
+from typing import Callable, Iterable, Iterator
+from uuid import UUID
+
+import sqlalchemy as sa
+from pydantic import BaseModel
+
+from .db import SessionLocal
+from .models import Bug, EventLog, Milestone, Project, Task
+from .schemas import BugRead, EventLogRead, MilestoneRead, ProjectRead, TaskRead
+
+EXPORT_BATCH_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _milestones(project_id: UUID) -> sa.Select:
+    return sa.select(*Milestone.__table__.c).where(Milestone.project_id == project_id).order_by(
+        Milestone.created_at, Milestone.id
+    )
+
+
+def _tasks(project_id: UUID) -> sa.Select:
+    # milestone_slug is denormalized onto TaskRead, as in routes.tasks._as_task_read
+    return (
+        sa.select(*Task.__table__.c, Milestone.slug.label("milestone_slug"))
+        .join(Milestone, Milestone.id == Task.milestone_id)
+        .where(Task.project_id == project_id)
+        .order_by(Task.created_at, Task.id)
+    )
+
+
+def _bugs(project_id: UUID) -> sa.Select:
+    return sa.select(*Bug.__table__.c).where(Bug.project_id == project_id).order_by(Bug.created_at, Bug.id)
+
+
+def _events(project_id: UUID) -> sa.Select:
+    return sa.select(*EventLog.__table__.c).where(EventLog.project_id == project_id).order_by(
+        EventLog.created_at, EventLog.id
+    )
+
+
+# entity name -> (record type in the combined export, query, schema)
+ENTITIES: dict[str, tuple[str, Callable[[UUID], sa.Select], type[BaseModel]]] = {
+    "milestones": ("milestone", _milestones, MilestoneRead),
+    "tasks": ("task", _tasks, TaskRead),
+    "bugs": ("bug", _bugs, BugRead),
+    "events": ("event", _events, EventLogRead),
+}
+
+
+def _envelope(kind: str, body: str) -> str:
+    return f'{{"type":"{kind}","data":{body}}}\n'
+
+
+def stream_project_export(project_id: UUID, entities: Iterable[str], envelope: bool = True) -> Iterator[bytes]:
+    """Yield NDJSON chunks for ``entities`` of a project, one chunk per fetched batch.
+
+    With ``envelope`` each line is ``{"type": ..., "data": {...}}`` and the
+    first line is the project itself; without it lines are bare rows, which is
+    what the per-entity exports return.
+    """
+    session = SessionLocal()
+    try:
+        # One snapshot for the whole export so tasks, bugs and events agree with each other
+        connection = session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        if connection.dialect.name == "postgresql":
+            # The pool's statement and idle-in-transaction timeouts (app.db) would cut
+            # a large export, or one read slowly by its client, off mid-stream: the
+            # cursor's query runs for as long as the export does, and the transaction
+            # sits idle while a batch waits to be sent. Lift both for this
+            # transaction only (set_config(..., true) is SET LOCAL, in one statement).
+            session.execute(
+                sa.text(
+                    "SELECT set_config('statement_timeout', '0', true),"
+                    " set_config('idle_in_transaction_session_timeout', '0', true)"
+                )
+            )
+        if envelope:
+            project = session.get(Project, project_id)
+            if project is None:
+                return
+            yield _envelope("project", ProjectRead.model_validate(project).model_dump_json()).encode()
+        for entity in entities:
+            kind, build_query, schema = ENTITIES[entity]
+            result = session.execute(build_query(project_id), execution_options={"yield_per": EXPORT_BATCH_SIZE})
+            for rows in result.mappings().partitions():
+                lines = (schema.model_validate(row).model_dump_json() for row in rows)
+                if envelope:
+                    yield "".join(_envelope(kind, line) for line in lines).encode()
+                else:
+                    yield "".join(f"{line}\n" for line in lines).encode()
+    finally:
+        session.close()
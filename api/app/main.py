@@ -5,10 +5,19 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 
-from .routes import bugs, events, milestones, personas, projects, tasks, well_known
+from . import event_ingest, event_partitions
+from .db import settings
+from .routes import attachments, bugs, events, metrics, milestones, personas, projects, tasks, well_known
+from app.routes.async_mirror import mirror_async
 from app.routes.context import router as context_router
 
-app = FastAPI(title="MADB API", version="0.1.0")
+# uvicorn re-raises SIGTERM after its shutdown, so atexit handlers never run there
+app = FastAPI(
+    title="MADB API",
+    version="0.1.0",
+    on_startup=[event_partitions.maintain_on_startup],
+    on_shutdown=[event_ingest.flush_buffer],
+)
 
 OPENAPI_FILE = Path(__file__).resolve().parent / "openapi.yml"
 
@@ -24,12 +33,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "X-Next-Cursor"],
 )
 
+# Hot agent-facing routes; with DB_ASYNC they are served from an AsyncSession.
+# Included first so they shadow the sync versions registered below.
+ASYNC_ROUTES = [
+    (tasks.router, [
+        "create_task",
+        "list_tasks",
+        "get_task",
+        "update_task",
+        "update_task_status",
+        "update_task_status_by_external_id",
+        "start_task",
+        "batch_update_status",
+        "batch_upsert_tasks",
+        "upsert_task",
+        "resolve_task",
+    ]),
+    (tasks.project_router, ["claim_task"]),
+    (events.router, ["list_events", "create_event", "create_events_batch"]),
+    (projects.router, ["get_project_status", "get_project_next_actions"]),
+]
+if settings.db_async:
+    for sync_router, names in ASYNC_ROUTES:
+        app.include_router(mirror_async(sync_router, names))
+
 app.include_router(well_known.router)
+app.include_router(metrics.router)
 app.include_router(projects.router)
 app.include_router(milestones.router)
 app.include_router(tasks.router)
+app.include_router(tasks.project_router)
+app.include_router(attachments.router)
 app.include_router(events.router)
 app.include_router(bugs.router)
 app.include_router(personas.router)
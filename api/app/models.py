@@ -2,10 +2,10 @@ import uuid
 from datetime import date, datetime
 from typing import Any
 
-from sqlalchemy import CheckConstraint, Enum, ForeignKey
+from sqlalchemy import CheckConstraint, Enum, ForeignKey, Index, func, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.types import Date, DateTime, Integer, Numeric, String, Text
+from sqlalchemy.types import BigInteger, Date, DateTime, Integer, Numeric, String, Text
 
 from .db import Base
 
@@ -16,9 +16,13 @@ class Project(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     parent_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id"), nullable=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # URL-safe handle derived from the name (see project_services.unique_project_slug)
+    slug: Mapped[str] = mapped_column(String(255), nullable=False)
     goal: Mapped[str | None] = mapped_column(Text, nullable=True)
     direction: Mapped[str | None] = mapped_column(Text, nullable=True)
     repository: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    # Per-project overrides for app.scoring_services.ScoringWeights
+    priority_scheme: Mapped[dict[str, float] | None] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -30,6 +34,8 @@ class Project(Base):
     events = relationship("EventLog", back_populates="project", cascade="all, delete-orphan")
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ux_projects_slug", "slug", unique=True),)
+
 
 class Milestone(Base):
     __tablename__ = "milestones"
@@ -56,6 +62,11 @@ class Milestone(Base):
     tasks = relationship("Task", back_populates="milestone", cascade="all, delete-orphan")
     events = relationship("EventLog", back_populates="milestone")
 
+    __table_args__ = (
+        # Case-insensitive slug lookups (routes/tasks._resolve_milestone_by_slug)
+        Index("ix_milestones_project_lower_slug", "project_id", func.lower(slug)),
+    )
+
 
 class Phase(Base):
     __tablename__ = "phases"
@@ -128,19 +139,54 @@ class Task(Base):
     phase = relationship("Phase", back_populates="tasks")
     project = relationship("Project", back_populates="tasks")
     parent = relationship("Task", remote_side=[id], back_populates="children")
-    children = relationship("Task", back_populates="parent", cascade="all, delete-orphan")
-    bugs = relationship("Bug", back_populates="task")
-    events = relationship("EventLog", back_populates="task")
-    attachments = relationship("Attachment", back_populates="task", cascade="all, delete-orphan")
+    # passive_deletes: the foreign keys cascade / SET NULL in the database, so deleting a
+    # task does not load its subtasks, bugs, events and attachments one task at a time
+    children = relationship("Task", back_populates="parent", cascade="all, delete-orphan", passive_deletes=True)
+    bugs = relationship("Bug", back_populates="task", passive_deletes=True)
+    events = relationship("EventLog", back_populates="task", passive_deletes=True)
+    attachments = relationship("Attachment", back_populates="task", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = (
         CheckConstraint("effort_estimate >= 0", name="task_effort_estimate_non_negative"),
         CheckConstraint("effort_spent >= 0", name="task_effort_spent_non_negative"),
-        # Unique external_id across all tasks when provided
-        # Note: enforced via migration with conditional unique index if needed
+        # Serves the next-action top-k scan over open tasks (see project_services.select_next_actions)
+        Index(
+            "ix_tasks_project_open_priority",
+            "project_id",
+            priority_score.desc().nulls_last(),
+            "created_at",
+            postgresql_where=text("status <> 'done'"),
+        ),
+        # Natural keys (created in migrations); also the ON CONFLICT targets of tasks:batchUpsert
+        Index("ux_tasks_external_project", "external_id", "project_id", unique=True),
+        Index("ix_tasks_milestone_slug", "milestone_id", "slug", unique=True, postgresql_where=text("slug IS NOT NULL")),
+        # Keyset pagination (app.pagination)
+        Index("ix_tasks_project_created_id", "project_id", "created_at", "id"),
     )
 
 
+class ProjectRollup(Base):
+    __tablename__ = "project_rollups"
+
+    # Materialized roll-up maintained incrementally by app.rollup_services on task writes
+    project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    total_estimate: Mapped[float] = mapped_column(Numeric(14, 4), default=0, nullable=False)
+    remaining_effort: Mapped[float] = mapped_column(Numeric(14, 4), default=0, nullable=False)
+    status_counts: Mapped[dict[str, int]] = mapped_column(JSONB, default=dict, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class MilestoneRollup(Base):
+    __tablename__ = "milestone_rollups"
+
+    milestone_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("milestones.id", ondelete="CASCADE"), primary_key=True)
+    project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    total_estimate: Mapped[float] = mapped_column(Numeric(14, 4), default=0, nullable=False)
+    remaining_effort: Mapped[float] = mapped_column(Numeric(14, 4), default=0, nullable=False)
+    status_counts: Mapped[dict[str, int]] = mapped_column(JSONB, default=dict, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Persona(Base):
     __tablename__ = "personas"
 
@@ -183,7 +229,11 @@ class Bug(Base):
     project = relationship("Project", back_populates="bugs")
     task = relationship("Task", back_populates="bugs")
 
+    __table_args__ = (Index("ix_bugs_project_created_id", "project_id", "created_at", "id"),)
+
 
+# Range-partitioned by month on created_at (see app.event_partitions), so the
+# partition key is part of the primary key.
 class EventLog(Base):
     __tablename__ = "event_logs"
 
@@ -194,12 +244,20 @@ class EventLog(Base):
     category: Mapped[str] = mapped_column(String(64), nullable=False, default="note")
     summary: Mapped[str] = mapped_column(String(255), nullable=False)
     details: Mapped[str | None] = mapped_column(Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=datetime.utcnow, server_default=func.now()
+    )
 
     project = relationship("Project", back_populates="events")
     milestone = relationship("Milestone", back_populates="events")
     task = relationship("Task", back_populates="events")
 
+    __table_args__ = (
+        # created on the parent, so every partition gets its own copy
+        Index("ix_event_logs_project_created_id", "project_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
 
 class Attachment(Base):
     __tablename__ = "attachments"
@@ -207,7 +265,12 @@ class Attachment(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     task_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # blob under app.attachment_store.BLOB_DIR, named by sha256
     path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    # null for attachments stored before content addressing
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    content_type: Mapped[str | None] = mapped_column(String(255), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     task = relationship("Task", back_populates="attachments")
@@ -217,7 +280,7 @@ class ContextSnapshot(Base):
     __tablename__ = "context_snapshot"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    repo_id: Mapped[str] = mapped_column(String(255), index=True, nullable=False)
+    repo_id: Mapped[str] = mapped_column(String(255), nullable=False)
     branch: Mapped[str | None] = mapped_column(String(255), nullable=True)
     workflow_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
@@ -225,15 +288,23 @@ class ContextSnapshot(Base):
     summary_path: Mapped[str] = mapped_column(String(1024), nullable=False)
     files_ndjson_path: Mapped[str | None] = mapped_column(String(1024), nullable=True)
     totals_files: Mapped[int] = mapped_column(Integer, nullable=False)
-    totals_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    totals_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
     totals_lines: Mapped[int] = mapped_column(Integer, nullable=False)
     components_json: Mapped[Any] = mapped_column(JSONB, nullable=True)
     hotspots_json: Mapped[Any] = mapped_column(JSONB, nullable=True)
 
+    __table_args__ = (
+        # /context/list, newest first, for a repo or one of its branches
+        Index("ix_context_snapshot_repo_created", "repo_id", created_at.desc()),
+        Index("ix_context_snapshot_repo_branch_created", "repo_id", "branch", created_at.desc()),
+    )
+
 
 class ContextIndex(Base):
     __tablename__ = "context_index"
 
     repo_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # "" holds the repo's latest snapshot on any branch (app.services.context_repo.ALL_BRANCHES)
+    branch: Mapped[str] = mapped_column(String(255), primary_key=True, default="", server_default="")
     latest_snapshot_id: Mapped[int] = mapped_column(Integer, ForeignKey("context_snapshot.id"), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
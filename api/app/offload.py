@@ -0,0 +1,49 @@
+"""Keep CPU-bound and file work off the event loop in async-mirrored routes.
+
+Handlers mirrored by ``app.routes.async_mirror`` run inside
+``AsyncSession.run_sync``. Their statements are awaited, but the rest of the
+handler runs on the event loop thread, where a slow step stalls every other
+connection the worker is serving. ``offload`` runs such a step (scoring, batch
+planning, building response bodies, writing files) in the threadpool and
+suspends the handler until it is done. From a sync route, which already runs
+in the threadpool, it just calls the function.
+
+Offloaded functions must not touch the session or lazy-load ORM attributes:
+the session is not thread-safe, and SQL issued outside the handler's greenlet
+fails.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, TypeVar
+
+from sqlalchemy.util import await_only
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+_on_event_loop: ContextVar[bool] = ContextVar("on_event_loop", default=False)
+
+
+@contextmanager
+def on_event_loop() -> Iterator[None]:
+    """Mark sync code run from here (through ``AsyncSession.run_sync``) as running on the loop."""
+    token = _on_event_loop.set(True)
+    try:
+        yield
+    finally:
+        _on_event_loop.reset(token)
+
+
+def _off_loop(fn: Callable[..., T], args: tuple[Any, ...], kwargs: dict[str, Any]) -> T:
+    # the worker thread runs in a copy of the caller's context
+    _on_event_loop.set(False)
+    return fn(*args, **kwargs)
+
+
+def offload(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """``fn(*args, **kwargs)``, run in the threadpool when called on the event loop."""
+    if not _on_event_loop.get():
+        return fn(*args, **kwargs)
+    return await_only(run_in_threadpool(_off_loop, fn, args, kwargs))
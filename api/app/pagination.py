@@ -0,0 +1,77 @@
+"""Keyset (cursor) pagination over ``(created_at, id)``.
+
+List routes fetch one row past ``limit`` to learn whether another page exists
+and hand the client an opaque cursor naming the last row returned. The next
+page then starts with a row-value comparison against that key, which Postgres
+serves from the ``(project_id, created_at, id)`` indexes no matter how deep
+the page is, unlike ``OFFSET`` which reads and discards every earlier row.
+
+The cursor travels in the ``X-Next-Cursor`` header (and a ``Link: rel="next"``
+header) so list bodies stay plain JSON arrays; the header is absent on the
+last page.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, TypeVar
+from uuid import UUID
+
+import sqlalchemy as sa
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.orm import InstrumentedAttribute, Query
+
+# keyset_page works on legacy Query objects and 2.0-style selects alike
+Pageable = TypeVar("Pageable", Query, sa.Select)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+def keyset_page(
+    query: Pageable,
+    created_at: InstrumentedAttribute,
+    row_id: InstrumentedAttribute,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+) -> Pageable:
+    """Order ``query`` by (created_at, id), start after ``cursor`` and fetch ``limit + 1`` rows."""
+    key = sa.tuple_(created_at, row_id)
+    if cursor:
+        after = sa.tuple_(*decode_cursor(cursor))
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        query = query.order_by(created_at.desc(), row_id.desc())
+    else:
+        query = query.order_by(created_at.asc(), row_id.asc())
+    return query.limit(limit + 1)
+
+
+def finish_page(rows: Sequence[Any], limit: int, request: Request, response: Response) -> Sequence[Any]:
+    """Trim the look-ahead row and, if there was one, advertise the next cursor."""
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    last = rows[-1]
+    cursor = encode_cursor(last.created_at, last.id)
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    next_url = request.url.remove_query_params(["cursor", "offset"]).include_query_params(cursor=cursor)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return rows
@@ -0,0 +1,111 @@
+"""Connection pool instrumentation for the /metrics endpoint.
+
+``InstrumentedQueuePool`` / ``InstrumentedAsyncQueuePool`` time every pool
+checkout (the wait for a free or new connection) and count timeouts;
+``instrument_engine`` adds pre-ping failure and invalidation counters and
+registers the engine for reporting.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.pre_ping_failures = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class _TimedCheckoutMixin:
+    stats: PoolStats
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()  # type: ignore[misc]
+        except PoolTimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started, timed_out=False)
+        return record
+
+    def recreate(self) -> Any:
+        # engine.dispose() swaps in a fresh pool; keep the counters running
+        pool = super().recreate()  # type: ignore[misc]
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+ENGINES: dict[str, Engine] = {}
+
+
+def instrument_engine(name: str, engine: Engine) -> None:
+    """Attach counters to ``engine`` (the sync engine behind an AsyncEngine for async mode)."""
+    stats = PoolStats()
+    engine.pool.stats = stats  # type: ignore[attr-defined]
+
+    @event.listens_for(engine, "handle_error")
+    def _count_pre_ping_failure(context: Any) -> None:
+        if context.is_pre_ping:
+            engine.pool.stats.increment("pre_ping_failures")  # type: ignore[attr-defined]
+
+    @event.listens_for(engine.pool, "invalidate")
+    def _count_invalidation(dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+        engine.pool.stats.increment("invalidations")  # type: ignore[attr-defined]
+
+    ENGINES[name] = engine
+
+
+def pool_snapshot() -> dict[str, dict[str, float]]:
+    snapshot: dict[str, dict[str, float]] = {}
+    for name, engine in ENGINES.items():
+        pool = engine.pool
+        stats: PoolStats = pool.stats  # type: ignore[attr-defined]
+        snapshot[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # QueuePool counts overflow from -pool_size; only connections beyond the pool matter here
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "checkouts_total": stats.checkouts,
+            "timeouts_total": stats.timeouts,
+            "wait_seconds_total": round(stats.wait_seconds_total, 6),
+            "wait_seconds_max": round(stats.wait_seconds_max, 6),
+            "pre_ping_failures_total": stats.pre_ping_failures,
+            "invalidations_total": stats.invalidations,
+        }
+    return snapshot
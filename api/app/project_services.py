@@ -1,14 +1,36 @@
 from __future__ import annotations
 
+import re
 from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable, List
+from typing import List, Optional
 from uuid import UUID
 
+import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
-from .models import Milestone, Project, Task
+from .models import Milestone, MilestoneRollup, Project, ProjectRollup, Task
+
+
+def slugify(text: str) -> str:
+    """Lower-case ``text`` and collapse runs of non-alphanumerics into single dashes."""
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def unique_project_slug(session: Session, name: str, exclude_id: Optional[UUID] = None) -> str:
+    """Slug for a project name, suffixed (``-2``, ``-3``...) when another project already holds it."""
+    base = slugify(name) or "project"
+    query = session.query(Project.slug).filter(sa.or_(Project.slug == base, Project.slug.like(f"{base}-%")))
+    if exclude_id is not None:
+        query = query.filter(Project.id != exclude_id)
+    taken = {slug for (slug,) in query}
+    if base not in taken:
+        return base
+    suffix = 2
+    while f"{base}-{suffix}" in taken:
+        suffix += 1
+    return f"{base}-{suffix}"
 
 
 @dataclass
@@ -48,29 +70,32 @@ class NextActionSuggestion:
     persona_required: str | None
     priority_score: float
     reason: str
+    final_score: float | None = None
+    wsjf: float | None = None
+
+
+RISK_BUFFERS = {"medium": 1.1, "high": 1.25}
 
 
 def _task_remaining(task: Task) -> float:
     estimate = float(task.effort_estimate or 0)
     spent = float(task.effort_spent or 0)
     remaining = max(estimate - spent, 0.0)
+    return remaining * RISK_BUFFERS.get(task.risk_level, 1.0)
 
-    if task.risk_level == "medium":
-        remaining *= 1.1
-    elif task.risk_level == "high":
-        remaining *= 1.25
 
-    return remaining
-
-
-def _calculate_summary(tasks: Iterable[Task]) -> TaskSummary:
-    total_estimate = 0.0
-    remaining_effort = 0.0
+def _remaining_expression():
+    """SQL equivalent of ``_task_remaining`` so roll-ups can be summed in the database."""
+    estimate = sa.func.coalesce(Task.effort_estimate, 0)
+    spent = sa.func.coalesce(Task.effort_spent, 0)
+    buffer = sa.case(
+        *[(Task.risk_level == level, multiplier) for level, multiplier in RISK_BUFFERS.items()],
+        else_=1.0,
+    )
+    return sa.func.greatest(estimate - spent, 0) * buffer
 
-    for task in tasks:
-        total_estimate += float(task.effort_estimate or 0)
-        remaining_effort += _task_remaining(task)
 
+def _summarize(total_estimate: float, remaining_effort: float) -> TaskSummary:
     percent_complete = 0.0
     if total_estimate > 0:
         percent_complete = max(0.0, min(100.0, 100.0 * (1 - (remaining_effort / total_estimate))))
@@ -79,63 +104,143 @@ def _calculate_summary(tasks: Iterable[Task]) -> TaskSummary:
 
 
 def compute_project_status(session: Session, project: Project) -> ProjectStatus:
-    milestones = session.query(Milestone).filter(Milestone.project_id == project.id).all()
-    milestone_map = {milestone.id: milestone for milestone in milestones}
+    # One grouped pass over (milestone, status); milestones without tasks still
+    # come back through the outer join with a NULL status and zero counts.
+    rows = session.execute(
+        sa.select(
+            Milestone.id,
+            Milestone.name,
+            Task.status,
+            sa.func.count(Task.id),
+            sa.func.coalesce(sa.func.sum(sa.func.coalesce(Task.effort_estimate, 0)), 0),
+            sa.func.coalesce(sa.func.sum(_remaining_expression()), 0),
+        )
+        .select_from(Milestone)
+        .outerjoin(Task, Task.milestone_id == Milestone.id)
+        .where(Milestone.project_id == project.id)
+        .group_by(Milestone.id, Milestone.name, Milestone.created_at, Task.status)
+        .order_by(Milestone.created_at.asc(), Milestone.id.asc())
+    ).all()
+
+    milestone_totals: dict[UUID, list] = {}
+    status_breakdown: Counter[str] = Counter()
+    for milestone_id, milestone_name, task_status, count, estimate, remaining in rows:
+        totals = milestone_totals.setdefault(milestone_id, [milestone_name, 0.0, 0.0])
+        totals[1] += float(estimate)
+        totals[2] += float(remaining)
+        if task_status is not None:
+            status_breakdown[task_status] += count
 
-    tasks = (
-        session.query(Task)
-        .filter(Task.milestone_id.in_(list(milestone_map.keys())))
-        .all()
-        if milestone_map
-        else []
+    milestone_summaries: list[MilestoneSummary] = []
+    for milestone_id, (milestone_name, estimate, remaining) in milestone_totals.items():
+        milestone_summary = _summarize(estimate, remaining)
+        milestone_summaries.append(
+            MilestoneSummary(
+                milestone_id=milestone_id,
+                milestone_name=milestone_name,
+                total_estimate=milestone_summary.total_estimate,
+                remaining_effort=milestone_summary.remaining_effort,
+                percent_complete=milestone_summary.percent_complete,
+            )
+        )
+
+    summary = _summarize(
+        sum(m.total_estimate for m in milestone_summaries),
+        sum(m.remaining_effort for m in milestone_summaries),
     )
 
-    summary = _calculate_summary(tasks)
-    status_breakdown = Counter(task.status for task in tasks)
+    return ProjectStatus(
+        project_id=project.id,
+        total_estimate=summary.total_estimate,
+        remaining_effort=summary.remaining_effort,
+        percent_complete=summary.percent_complete,
+        status_breakdown=dict(status_breakdown),
+        milestone_summaries=milestone_summaries,
+    )
+
+
+def load_project_status(session: Session, project: Project) -> ProjectStatus:
+    """Read status from the materialized roll-ups, falling back to a live aggregate."""
+    rollup = session.get(ProjectRollup, project.id)
+    if rollup is None:
+        return compute_project_status(session, project)
+
+    rows = session.execute(
+        sa.select(Milestone.id, Milestone.name, MilestoneRollup.total_estimate, MilestoneRollup.remaining_effort)
+        .select_from(Milestone)
+        .outerjoin(MilestoneRollup, MilestoneRollup.milestone_id == Milestone.id)
+        .where(Milestone.project_id == project.id)
+        .order_by(Milestone.created_at.asc(), Milestone.id.asc())
+    ).all()
 
     milestone_summaries: list[MilestoneSummary] = []
-    for milestone in milestones:
-        milestone_tasks = [task for task in tasks if task.milestone_id == milestone.id]
-        milestone_summary = _calculate_summary(milestone_tasks)
+    for milestone_id, milestone_name, estimate, remaining in rows:
+        milestone_summary = _summarize(float(estimate or 0), float(remaining or 0))
         milestone_summaries.append(
             MilestoneSummary(
-                milestone_id=milestone.id,
-                milestone_name=milestone.name,
+                milestone_id=milestone_id,
+                milestone_name=milestone_name,
                 total_estimate=milestone_summary.total_estimate,
                 remaining_effort=milestone_summary.remaining_effort,
                 percent_complete=milestone_summary.percent_complete,
             )
         )
 
+    summary = _summarize(float(rollup.total_estimate or 0), float(rollup.remaining_effort or 0))
     return ProjectStatus(
         project_id=project.id,
         total_estimate=summary.total_estimate,
         remaining_effort=summary.remaining_effort,
         percent_complete=summary.percent_complete,
-        status_breakdown=dict(status_breakdown),
+        status_breakdown={state: count for state, count in (rollup.status_counts or {}).items() if count},
         milestone_summaries=milestone_summaries,
     )
 
 
+def project_status_version(session: Session, project_id: UUID) -> Optional[tuple]:
+    """Values that change whenever ``load_project_status`` output would, read in one statement.
+
+    Roll-up rows are stamped on every non-empty delta and milestones on every
+    edit; the milestone count catches additions and deletions. Returns None
+    when the project has no roll-up yet (status is then a live aggregate).
+    """
+    milestone_count = (
+        sa.select(sa.func.count(Milestone.id)).where(Milestone.project_id == project_id).scalar_subquery()
+    )
+    milestone_edited = (
+        sa.select(sa.func.max(Milestone.updated_at)).where(Milestone.project_id == project_id).scalar_subquery()
+    )
+    rollup_edited = (
+        sa.select(sa.func.max(MilestoneRollup.updated_at))
+        .where(MilestoneRollup.project_id == project_id)
+        .scalar_subquery()
+    )
+    row = session.execute(
+        sa.select(ProjectRollup.updated_at, milestone_count, milestone_edited, rollup_edited).where(
+            ProjectRollup.project_id == project_id
+        )
+    ).first()
+    return tuple(row) if row is not None else None
+
+
 def select_next_actions(session: Session, project: Project, limit: int = 3) -> list[NextActionSuggestion]:
+    # Ranked and cut in the database; ix_tasks_project_open_priority serves the
+    # (project_id, priority_score DESC) prefix so only the top rows are visited.
     tasks = (
         session.query(Task)
-        .join(Milestone, Task.milestone_id == Milestone.id)
-        .filter(Milestone.project_id == project.id)
+        .filter(Task.project_id == project.id)
         .filter(Task.status != "done")
-        .all()
-    )
-
-    tasks.sort(
-        key=lambda task: (
-            -float(task.priority_score or 0),
-            task.status != "blocked",
-            (datetime.max.replace(tzinfo=timezone.utc) if task.created_at is None else task.created_at),
+        .order_by(
+            Task.priority_score.desc().nulls_last(),
+            (Task.status == "blocked").desc(),
+            Task.created_at.asc().nulls_last(),
         )
+        .limit(limit)
+        .all()
     )
 
     suggestions: list[NextActionSuggestion] = []
-    for task in tasks[:limit]:
+    for task in tasks:
         reason_parts = []
         priority_score = float(task.priority_score or 0)
         if priority_score > 0:
@@ -163,7 +268,7 @@ def select_next_actions(session: Session, project: Project, limit: int = 3) -> l
 
 
 def generate_project_summary(session: Session, project: Project, limit: int = 3) -> ProjectStatusSummary:
-    status = compute_project_status(session, project)
+    status = load_project_status(session, project)
     suggestions = select_next_actions(session, project, limit=limit)
 
     parts: list[str] = []
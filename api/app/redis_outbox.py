@@ -0,0 +1,121 @@
+"""Redis writes that belong to a database transaction.
+
+Modules that tell Redis about database changes (``app.change_feed``,
+``app.work_bus``) stage what they want to send in a per-session bucket while
+the transaction runs, and register a sender for that bucket. When the session
+commits, each non-empty bucket is handed to one background thread that runs
+its sender against a pipeline; when it rolls back, the buckets are dropped.
+The thread sends buckets in commit order, and a slow or unavailable Redis never
+holds up (or fails) the request that made the change.
+
+``REDIS_URL`` unset disables everything here: nothing is staged or sent.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .db import settings
+
+logger = logging.getLogger(__name__)
+
+# buckets waiting for the sender thread
+QUEUE_SIZE = 10000
+
+Sender = Callable[[Any, Any], None]
+_senders: dict[str, Sender] = {}
+_stats: dict[str, dict[str, int]] = defaultdict(lambda: {"sent": 0, "dropped": 0, "failures": 0})
+
+
+def enabled() -> bool:
+    return bool(settings.redis_url)
+
+
+_client: Optional[redis.Redis] = None
+_lock = threading.Lock()
+
+
+def client() -> redis.Redis:
+    """Process-wide sync client (short timeouts) for ``REDIS_URL``."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.Redis.from_url(settings.redis_url, socket_connect_timeout=1, socket_timeout=1)
+    return _client
+
+
+def register(name: str, sender: Sender) -> None:
+    """Send bucket ``name`` with ``sender(pipeline, bucket)`` after each commit that filled it."""
+    _senders[name] = sender
+
+
+def bucket(session: Session, name: str, factory: Callable[[], Any]) -> Any:
+    """The session's pending bucket ``name``, created with ``factory`` on first use."""
+    key = f"redis_outbox.{name}"
+    if key not in session.info:
+        session.info[key] = factory()
+    return session.info[key]
+
+
+def submit(name: str, payload: Any) -> None:
+    """Queue ``payload`` for ``name``'s sender without waiting for a transaction."""
+    try:
+        _sender_thread().queue.put_nowait((name, payload))
+    except queue.Full:
+        _stats[name]["dropped"] += 1
+
+
+@event.listens_for(Session, "after_commit")
+def _send_committed(session: Session) -> None:
+    for name in _senders:
+        payload = session.info.pop(f"redis_outbox.{name}", None)
+        if payload:
+            submit(name, payload)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard(session: Session, _previous_transaction: Any) -> None:
+    for name in _senders:
+        session.info.pop(f"redis_outbox.{name}", None)
+
+
+class _SenderThread:
+    def __init__(self) -> None:
+        self.queue: queue.Queue[tuple[str, Any]] = queue.Queue(QUEUE_SIZE)
+        threading.Thread(target=self._run, name="redis-outbox", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            name, payload = self.queue.get()
+            try:
+                pipe = client().pipeline(transaction=False)
+                _senders[name](pipe, payload)
+                pipe.execute()
+                _stats[name]["sent"] += 1
+            except redis.RedisError as exc:
+                _stats[name]["failures"] += 1
+                logger.warning("redis outbox %s: send failed: %s", name, exc)
+
+
+_thread: Optional[_SenderThread] = None
+
+
+def _sender_thread() -> _SenderThread:
+    global _thread
+    if _thread is None:
+        with _lock:
+            if _thread is None:
+                _thread = _SenderThread()
+    return _thread
+
+
+def outbox_stats(name: str) -> dict[str, int]:
+    return dict(_stats[name])
@@ -0,0 +1,121 @@
+"""Process-local caches for the identifier lookups agents repeat on every write.
+
+Entries map a natural key (project slug, milestone slug, task external_id) to a
+primary key, or a primary key to the ids of the rows that own it (used to
+validate event log writes). Write routes in this process invalidate affected
+entries directly; the TTL bounds staleness caused by writers in other
+processes. Only positive results are cached, and callers that load the row by
+id afterwards should re-check the natural key so a stale entry costs one extra
+lookup, never a wrong answer.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from uuid import UUID
+
+from .db import settings
+
+
+class LRUCache:
+    """Bounded LRU map with a per-entry TTL and hit/miss counters. Thread-safe."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Hashable, Any], bool]) -> None:
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def discard_value(self, value: Any) -> None:
+        self.discard_where(lambda _key, cached: cached == value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# project slug (lower-cased) -> project id
+project_slugs = LRUCache("project_slugs", settings.id_cache_size, settings.id_cache_ttl)
+# (project id, milestone slug) -> milestone id
+milestone_slugs = LRUCache("milestone_slugs", settings.id_cache_size, settings.id_cache_ttl)
+# (project id or None for unscoped lookups, external_id) -> task id
+task_external_ids = LRUCache("task_external_ids", settings.id_cache_size, settings.id_cache_ttl)
+
+# project id -> True (the project exists)
+project_ids = LRUCache("project_ids", settings.id_cache_size, settings.id_cache_ttl)
+# milestone id -> project id
+milestone_projects = LRUCache("milestone_projects", settings.id_cache_size, settings.id_cache_ttl)
+# task id -> (project id, milestone id)
+task_parents = LRUCache("task_parents", settings.id_cache_size, settings.id_cache_ttl)
+
+CACHES = (project_slugs, milestone_slugs, task_external_ids, project_ids, milestone_projects, task_parents)
+
+
+def forget_project(project_id: UUID) -> None:
+    project_slugs.discard_value(project_id)
+    project_ids.discard(project_id)
+
+
+def forget_milestone(milestone_id: UUID) -> None:
+    milestone_slugs.discard_value(milestone_id)
+    milestone_projects.discard(milestone_id)
+
+
+def forget_tasks(task_ids: list[UUID]) -> None:
+    removed = set(task_ids)
+    task_external_ids.discard_where(lambda _key, task_id: task_id in removed)
+    for task_id in removed:
+        task_parents.discard(task_id)
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    return {cache.name: cache.stats() for cache in CACHES}
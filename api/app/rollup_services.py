@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Optional
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .models import Milestone, MilestoneRollup, Project, ProjectRollup, Task
+from .offload import offload
+from .project_services import RISK_BUFFERS, _remaining_expression
+
+ROLLUP_PRECISION = Decimal("0.0001")
+
+
+@dataclass(frozen=True)
+class TaskContribution:
+    project_id: UUID
+    milestone_id: UUID
+    estimate: Decimal
+    remaining: Decimal
+    status: str
+
+
+@dataclass
+class _RollupDelta:
+    estimate: Decimal = Decimal(0)
+    remaining: Decimal = Decimal(0)
+    status_counts: Counter[str] = field(default_factory=Counter)
+
+    def add(self, contribution: TaskContribution, sign: int) -> None:
+        self.estimate += sign * contribution.estimate
+        self.remaining += sign * contribution.remaining
+        self.status_counts[contribution.status] += sign
+
+    def is_empty(self) -> bool:
+        return not self.estimate and not self.remaining and not any(self.status_counts.values())
+
+
+def _as_decimal(value: object) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def task_contribution(task: Task) -> TaskContribution:
+    """Snapshot the fields of a (flushed) task that feed the materialized roll-ups."""
+    estimate = _as_decimal(task.effort_estimate)
+    remaining = max(estimate - _as_decimal(task.effort_spent), Decimal(0))
+    remaining *= _as_decimal(RISK_BUFFERS.get(task.risk_level, 1))
+    return TaskContribution(
+        project_id=task.project_id,
+        milestone_id=task.milestone_id,
+        estimate=estimate,
+        remaining=remaining.quantize(ROLLUP_PRECISION),
+        status=task.status,
+    )
+
+
+def apply_rollup_delta(
+    session: Session, before: Optional[TaskContribution], after: Optional[TaskContribution]
+) -> None:
+    apply_rollup_deltas(session, [(before, after)])
+
+
+def _merge_deltas(
+    changes: list[tuple[Optional[TaskContribution], Optional[TaskContribution]]],
+) -> tuple[dict[UUID, tuple[UUID, _RollupDelta]], dict[UUID, _RollupDelta]]:
+    milestone_deltas: dict[UUID, tuple[UUID, _RollupDelta]] = {}
+    project_deltas: dict[UUID, _RollupDelta] = {}
+
+    for before, after in changes:
+        if before == after:
+            continue
+        for contribution, sign in ((before, -1), (after, 1)):
+            if contribution is None:
+                continue
+            _, milestone_delta = milestone_deltas.setdefault(
+                contribution.milestone_id, (contribution.project_id, _RollupDelta())
+            )
+            milestone_delta.add(contribution, sign)
+            project_deltas.setdefault(contribution.project_id, _RollupDelta()).add(contribution, sign)
+    return milestone_deltas, project_deltas
+
+
+def apply_rollup_deltas(
+    session: Session, changes: Iterable[tuple[Optional[TaskContribution], Optional[TaskContribution]]]
+) -> None:
+    """Fold (before, after) task snapshots into the roll-up tables within the caller's transaction.
+
+    ``before`` is None for inserts and ``after`` is None for deletes. Deltas are
+    merged per milestone/project first so a batch touches each roll-up row once.
+    """
+    # snapshots are taken here, where reading ORM attributes may still load them
+    milestone_deltas, project_deltas = offload(_merge_deltas, list(changes))
+
+    # Stable ordering keeps concurrent writers from deadlocking on roll-up rows.
+    for milestone_id in sorted(milestone_deltas, key=str):
+        project_id, delta = milestone_deltas[milestone_id]
+        if not delta.is_empty():
+            _increment(session, MilestoneRollup, {"milestone_id": milestone_id, "project_id": project_id}, delta)
+    for project_id in sorted(project_deltas, key=str):
+        delta = project_deltas[project_id]
+        if not delta.is_empty():
+            _increment(session, ProjectRollup, {"project_id": project_id}, delta)
+
+
+def _increment(session: Session, model: type, keys: dict[str, UUID], delta: _RollupDelta) -> None:
+    table = model.__table__
+    counts = {state: count for state, count in delta.status_counts.items() if count}
+
+    merged_counts = table.c.status_counts
+    for state, count in counts.items():
+        current = sa.func.coalesce(table.c.status_counts[state].astext.cast(sa.Integer), 0)
+        merged_counts = merged_counts.op("||")(
+            sa.func.jsonb_build_object(sa.cast(sa.literal(state), sa.Text), current + count)
+        )
+
+    now = datetime.utcnow()
+    stmt = pg_insert(table).values(
+        **keys,
+        total_estimate=delta.estimate,
+        remaining_effort=delta.remaining,
+        status_counts=counts,
+        updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={
+            "total_estimate": table.c.total_estimate + stmt.excluded.total_estimate,
+            "remaining_effort": table.c.remaining_effort + stmt.excluded.remaining_effort,
+            "status_counts": merged_counts,
+            "updated_at": now,
+        },
+    )
+    session.execute(stmt)
+
+
+def rebuild_rollups(session: Session, project_ids: Optional[list[UUID]] = None) -> int:
+    """Recompute roll-ups from the tasks table, replacing whatever drifted. Returns projects rebuilt."""
+    project_query = sa.select(Project.id)
+    if project_ids is not None:
+        project_query = project_query.where(Project.id.in_(project_ids))
+    scope = list(session.execute(project_query).scalars())
+    if not scope:
+        return 0
+
+    rows = session.execute(
+        sa.select(
+            Milestone.id,
+            Milestone.project_id,
+            Task.status,
+            sa.func.count(Task.id),
+            sa.func.coalesce(sa.func.sum(sa.func.coalesce(Task.effort_estimate, 0)), 0),
+            sa.func.coalesce(sa.func.sum(sa.cast(_remaining_expression(), sa.Numeric(14, 4))), 0),
+        )
+        .select_from(Milestone)
+        .outerjoin(Task, Task.milestone_id == Milestone.id)
+        .where(Milestone.project_id.in_(scope))
+        .group_by(Milestone.id, Milestone.project_id, Task.status)
+    ).all()
+
+    milestone_totals: dict[UUID, tuple[UUID, _RollupDelta]] = {}
+    project_totals: dict[UUID, _RollupDelta] = {project_id: _RollupDelta() for project_id in scope}
+    for milestone_id, project_id, task_status, count, estimate, remaining in rows:
+        for totals in (
+            milestone_totals.setdefault(milestone_id, (project_id, _RollupDelta()))[1],
+            project_totals[project_id],
+        ):
+            totals.estimate += _as_decimal(estimate)
+            totals.remaining += _as_decimal(remaining)
+            if task_status is not None:
+                totals.status_counts[task_status] += count
+
+    now = datetime.utcnow()
+    session.execute(sa.delete(MilestoneRollup).where(MilestoneRollup.project_id.in_(scope)))
+    session.execute(sa.delete(ProjectRollup).where(ProjectRollup.project_id.in_(scope)))
+    if milestone_totals:
+        session.execute(
+            sa.insert(MilestoneRollup),
+            [
+                {
+                    "milestone_id": milestone_id,
+                    "project_id": project_id,
+                    "total_estimate": totals.estimate,
+                    "remaining_effort": totals.remaining,
+                    "status_counts": dict(totals.status_counts),
+                    "updated_at": now,
+                }
+                for milestone_id, (project_id, totals) in milestone_totals.items()
+            ],
+        )
+    session.execute(
+        sa.insert(ProjectRollup),
+        [
+            {
+                "project_id": project_id,
+                "total_estimate": totals.estimate,
+                "remaining_effort": totals.remaining,
+                "status_counts": dict(totals.status_counts),
+                "updated_at": now,
+            }
+            for project_id, totals in project_totals.items()
+        ],
+    )
+    return len(scope)
@@ -0,0 +1,114 @@
+"""Async twins of selected sync routes, used when ``DB_ASYNC`` is enabled.
+
+Each mirrored endpoint keeps the path, parameters and response model of its
+sync handler but takes an ``AsyncSession`` and runs the handler body through
+``AsyncSession.run_sync``. Database I/O is then awaited on the event loop
+instead of holding one of FastAPI's threadpool workers for the whole request,
+while the business logic stays in one place.
+
+Only the database round-trips belong on the loop. Handlers pass their CPU and
+file work to ``app.offload.offload``, and the mirrored endpoint validates and
+renders the handler's return value in the threadpool (FastAPI would do that
+on the loop for an async endpoint).
+"""
+from __future__ import annotations
+
+import inspect
+from typing import Any, Callable, Iterable, get_type_hints
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.db import get_async_session
+from app.offload import on_event_loop
+
+# added to handlers that do not take the Response themselves
+_RESPONSE = "mirror_response"
+
+
+def _render(route: APIRoute, content: Any, response: Response) -> Response:
+    """What FastAPI does with a non-Response return value: validate, serialize, render."""
+    field = route.response_field
+    value, errors = field.validate(content, {}, loc=("response",))
+    if errors:
+        raise ResponseValidationError(errors=errors, body=content)
+    body = field.serialize(
+        value,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    status_code = response.status_code or route.status_code
+    rendered = response_class(body, **({"status_code": status_code} if status_code else {}))
+    if not is_body_allowed_for_status_code(rendered.status_code):
+        rendered.body = b""
+    rendered.headers.raw.extend(response.headers.raw)
+    return rendered
+
+
+def _async_endpoint(route: APIRoute) -> Callable[..., Any]:
+    handler = route.endpoint
+    hints = get_type_hints(handler)
+    signature = inspect.signature(handler)
+    parameters = []
+    for parameter in signature.parameters.values():
+        if parameter.name == "db":
+            parameter = parameter.replace(annotation=AsyncSession, default=Depends(get_async_session))
+        else:
+            parameter = parameter.replace(annotation=hints.get(parameter.name, parameter.annotation))
+        parameters.append(parameter)
+    response_name = next((p.name for p in parameters if p.annotation is Response), None)
+    if response_name is None:
+        parameters.append(inspect.Parameter(_RESPONSE, inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+
+    async def endpoint(**kwargs: Any) -> Any:
+        db: AsyncSession = kwargs.pop("db")
+        response: Response = kwargs[response_name] if response_name else kwargs.pop(_RESPONSE)
+        with on_event_loop():
+            result = await db.run_sync(lambda session: handler(**kwargs, db=session))
+        if isinstance(result, Response) or route.response_field is None:
+            return result
+        return await run_in_threadpool(_render, route, result, response)
+
+    endpoint.__name__ = f"{handler.__name__}_async"
+    endpoint.__doc__ = handler.__doc__
+    endpoint.__signature__ = signature.replace(parameters=parameters, return_annotation=hints.get("return"))
+    return endpoint
+
+
+def mirror_async(router: APIRouter, names: Iterable[str]) -> APIRouter:
+    """Build a router serving the named endpoints of ``router`` from an AsyncSession.
+
+    Include the result before ``router`` so its routes match first.
+    """
+    wanted = set(names)
+    mirrored = APIRouter()
+    for route in router.routes:
+        if not isinstance(route, APIRoute) or route.name not in wanted:
+            continue
+        wanted.discard(route.name)
+        mirrored.add_api_route(
+            route.path,
+            _async_endpoint(route),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            response_class=route.response_class,
+            tags=route.tags,
+            name=f"{route.name}_async",
+            include_in_schema=False,
+        )
+    if wanted:
+        raise ValueError(f"No such routes to mirror: {sorted(wanted)}")
+    return mirrored
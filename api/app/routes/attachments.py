@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session
+from starlette.types import Receive, Scope, Send
+
+from app.attachment_store import DEFAULT_CONTENT_TYPE
+from app.conditional import CACHE_CONTROL, etag_matches, not_modified
+from app.db import get_session
+from app.models import Attachment
+
+router = APIRouter(prefix="/v1/attachments", tags=["attachments"])
+
+# a blob's content never changes under its hash, so clients may keep it indefinitely
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+PATHSEND = "http.response.pathsend"
+
+
+class BlobResponse(FileResponse):
+    """``FileResponse`` that hands whole-file bodies to the server when it can.
+
+    Servers that implement the ASGI ``http.response.pathsend`` extension
+    (Granian, Hypercorn) send the file from the kernel with ``sendfile``, so
+    the bytes never pass through Python. Elsewhere (uvicorn), and for range
+    requests, Starlette reads the file in 64 KiB chunks off the event loop.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._pathsend = PATHSEND in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if send_header_only or not self._pathsend:
+            await super()._handle_simple(send, send_header_only)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": PATHSEND, "path": os.fspath(self.path)})
+
+    async def _handle_multiple_ranges(
+        self, send: Send, ranges: list[tuple[int, int]], file_size: int, send_header_only: bool
+    ) -> None:
+        # Starlette's multipart/byteranges body disagrees with its own Content-Length;
+        # a server may ignore Range (RFC 9110 14.2), so answer with the whole file
+        await self._handle_simple(send, send_header_only)
+
+
+@router.api_route("/{attachment_id}", methods=["GET", "HEAD"], response_class=BlobResponse)
+def download_attachment(attachment_id: UUID, request: Request, db: Session = Depends(get_session)) -> Response:
+    """Serve an attachment's file, with ``Range``/``If-Range`` and ``If-None-Match`` support.
+
+    Content-addressed attachments carry their SHA-256 as a strong ``ETag`` and
+    may be cached forever; older attachments get Starlette's modification-time
+    tag and ``Cache-Control: no-cache``.
+    """
+    attachment = db.get(Attachment, attachment_id)
+    if attachment is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found")
+    try:
+        stat_result = os.stat(attachment.path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment file is missing")
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL if attachment.sha256 else CACHE_CONTROL}
+    if attachment.sha256:
+        headers["ETag"] = f'"{attachment.sha256}"'
+    response = BlobResponse(
+        attachment.path,
+        headers=headers,
+        media_type=attachment.content_type or mimetypes.guess_type(attachment.name)[0] or DEFAULT_CONTENT_TYPE,
+        filename=attachment.name,
+        stat_result=stat_result,
+    )
+    etag = response.headers["etag"]
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control=headers["Cache-Control"])
+    return response
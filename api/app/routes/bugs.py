@@ -3,25 +3,44 @@ from __future__ import annotations
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+import sqlalchemy as sa
+from sqlalchemy.orm import Session, joinedload
 
 from app.db import get_session
 from app.models import Bug, Project, Task
+from app.conditional import etag_matches, not_modified, page_etag, set_etag
+from app.pagination import MAX_PAGE_SIZE, finish_page, keyset_page
+from app.serialization import ORJSONResponse, read_columns, rows_as_dicts
 from app.schemas import BugCreate, BugRead, BugUpdate
 
 router = APIRouter(prefix="/v1/bugs", tags=["bugs"])
 
+_READ_COLUMNS = read_columns(BugRead, Bug.__table__)
 
-@router.get("", response_model=List[BugRead])
-def list_bugs(project_id: Optional[UUID] = None, task_id: Optional[UUID] = None, db: Session = Depends(get_session)) -> list[BugRead]:
-    query = db.query(Bug)
+
+@router.get("", response_model=List[BugRead], response_class=ORJSONResponse)
+def list_bugs(
+    request: Request,
+    response: Response,
+    project_id: Optional[UUID] = None,
+    task_id: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_session),
+) -> ORJSONResponse:
+    query = sa.select(*_READ_COLUMNS)
     if project_id:
-        query = query.filter(Bug.project_id == project_id)
+        query = query.where(Bug.project_id == project_id)
     if task_id:
-        query = query.filter(Bug.task_id == task_id)
-    bugs = query.order_by(Bug.created_at.desc()).all()
-    return [BugRead.model_validate(bug) for bug in bugs]
+        query = query.where(Bug.task_id == task_id)
+    query = keyset_page(query, Bug.created_at, Bug.id, cursor, limit, descending=True)
+    bugs = finish_page(db.execute(query).all(), limit, request, response)
+    etag = page_etag(bugs, response)
+    if etag_matches(request, etag):
+        return not_modified(etag, response.headers)
+    set_etag(response, etag)
+    return ORJSONResponse(rows_as_dicts(bugs), headers=dict(response.headers))
 
 
 @router.post("", response_model=BugRead, status_code=status.HTTP_201_CREATED)
@@ -73,7 +92,7 @@ def _ensure_task_belongs_to_project(db: Session, task_id: Optional[UUID], projec
     if task_id is None:
         return
 
-    task = db.get(Task, task_id)
+    task = db.get(Task, task_id, options=[joinedload(Task.milestone)])
     if task is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task not found")
 
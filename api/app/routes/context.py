@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.db import get_session
-from app.services.context_repo import ContextRepoService
-from app.schemas import ContextSnapshotCreate, ContextSnapshotRead
+from app.services.context_diff import DiffRejected, diff_manifests
+from app.services.context_repo import ALL_BRANCHES, ContextRepoService
+from app.schemas import ContextDiffRead, ContextScanRequest, ContextSnapshotCreate, ContextSnapshotRead
 from app.models import ContextSnapshot, ContextIndex
 
 router = APIRouter(prefix="/context", tags=["context"])
@@ -17,6 +18,19 @@ def upsert_context(
     snapshot_id = ContextRepoService.record_snapshot(db, payload)
     return snapshot_id
 
+@router.post("/scan", response_model=ContextSnapshotRead)
+def scan_context(
+    payload: ContextScanRequest,
+    db: Session = Depends(get_session)
+) -> ContextSnapshotRead:
+    """Scan the repo under REPO_BASE_PATH, rehashing only files changed since its latest snapshot."""
+    try:
+        return ContextRepoService.scan_repo(db, payload.repo_id, payload.branch, payload.workflow_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Repository not found")
+
 @router.get("/latest", response_model=Optional[ContextSnapshotRead])
 def get_latest_context(
     repo_id: str = Query(...),
@@ -31,11 +45,39 @@ def get_latest_context(
 @router.get("/list", response_model=list[ContextSnapshotRead])
 def list_context_snapshots(
     repo_id: str = Query(...),
+    branch: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_session)
 ) -> list[ContextSnapshotRead]:
-    query = db.query(ContextSnapshot).filter_by(repo_id=repo_id).order_by(ContextSnapshot.created_at.desc()).limit(limit)
-    return query.all()
+    query = db.query(ContextSnapshot).filter_by(repo_id=repo_id)
+    if branch:
+        query = query.filter_by(branch=branch)
+    return query.order_by(ContextSnapshot.created_at.desc()).limit(limit).all()
+
+@router.get("/diff", response_model=ContextDiffRead)
+def diff_context_snapshots(
+    repo_id: str = Query(...),
+    from_id: int = Query(..., alias="from"),
+    to_id: int = Query(..., alias="to"),
+    limit: int = Query(1000, ge=0, le=10000),
+    db: Session = Depends(get_session)
+) -> ContextDiffRead:
+    """Files added, removed and modified (by sha1) between two snapshots of a repo."""
+    snapshots = {
+        snapshot.id: snapshot
+        for snapshot in db.query(ContextSnapshot).filter(
+            ContextSnapshot.repo_id == repo_id, ContextSnapshot.id.in_([from_id, to_id])
+        )
+    }
+    if from_id not in snapshots or to_id not in snapshots:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found for repo")
+    # the manifests can be large; don't hold a pooled connection while reading them
+    db.rollback()
+    try:
+        diff = diff_manifests(snapshots[from_id].files_ndjson_path, snapshots[to_id].files_ndjson_path, limit)
+    except DiffRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    return ContextDiffRead(repo_id=repo_id, from_snapshot_id=from_id, to_snapshot_id=to_id, **diff)
 
 @router.get("/by-workflow", response_model=list[ContextSnapshotRead])
 def get_context_by_workflow(
@@ -53,5 +95,5 @@ def get_context_by_workflow(
 
 @router.get("/repos", response_model=list[str])
 def list_repo_ids(db: Session = Depends(get_session)):
-    repo_ids = db.query(ContextIndex.repo_id).all()
+    repo_ids = db.query(ContextIndex.repo_id).filter_by(branch=ALL_BRANCHES).all()
     return [r[0] for r in repo_ids]
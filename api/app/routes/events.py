@@ -1,83 +1,100 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
+from app import event_ingest
 from app.db import get_session
-from app.models import EventLog, Milestone, Project, Task
-from app.schemas import EventLogCreate, EventLogRead
+from app.models import EventLog
+from app.conditional import etag_matches, not_modified, page_etag, set_etag
+from app.offload import offload
+from app.pagination import MAX_PAGE_SIZE, finish_page, keyset_page
+from app.serialization import ORJSONResponse, read_columns, rows_as_dicts
+from app.schemas import EventBatchResult, EventLogCreate, EventLogRead
 
 router = APIRouter(prefix="/v1/events", tags=["events"])
 
+_READ_COLUMNS = read_columns(EventLogRead, EventLog.__table__)
 
-@router.get("", response_model=list[EventLogRead])
+
+@router.get("", response_model=list[EventLogRead], response_class=ORJSONResponse)
 def list_events(
+    request: Request,
+    response: Response,
     project_id: UUID,
     milestone_id: Optional[UUID] = None,
     task_id: Optional[UUID] = None,
-    limit: int = 50,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_session),
-) -> list[EventLogRead]:
-    query = db.query(EventLog).filter(EventLog.project_id == project_id)
+) -> ORJSONResponse:
+    query = sa.select(*_READ_COLUMNS).where(EventLog.project_id == project_id)
     if milestone_id:
-        query = query.filter(EventLog.milestone_id == milestone_id)
+        query = query.where(EventLog.milestone_id == milestone_id)
     if task_id:
-        query = query.filter(EventLog.task_id == task_id)
-    events = query.order_by(EventLog.created_at.desc()).limit(max(limit, 1)).all()
-    return [EventLogRead.model_validate(event) for event in events]
-
+        query = query.where(EventLog.task_id == task_id)
+    query = keyset_page(query, EventLog.created_at, EventLog.id, cursor, limit, descending=True)
+    events = finish_page(db.execute(query).all(), limit, request, response)
+    # events are append-only, so ids alone identify the page contents
+    etag = page_etag(events, response, versions=())
+    if etag_matches(request, etag):
+        return not_modified(etag, response.headers)
+    set_etag(response, etag)
+    return offload(_render_events, events, dict(response.headers))
 
-@router.post("", response_model=EventLogRead, status_code=status.HTTP_201_CREATED)
-def create_event(payload: EventLogCreate, db: Session = Depends(get_session)) -> EventLogRead:
-    _ensure_project(db, payload.project_id)
 
-    data = payload.model_dump()
+def _render_events(events: list[Any], headers: dict[str, str]) -> ORJSONResponse:
+    return ORJSONResponse(rows_as_dicts(events), headers=headers)
 
-    milestone = _ensure_milestone(db, data.get("milestone_id"), data["project_id"])
-    task = _ensure_task(db, data.get("task_id"), data["project_id"])
 
-    if task is not None:
-        if milestone is None:
-            data["milestone_id"] = task.milestone_id
-        elif task.milestone_id != milestone.id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task does not belong to milestone")
+@router.post("", response_model=EventLogRead, status_code=status.HTTP_201_CREATED)
+def create_event(payload: EventLogCreate, db: Session = Depends(get_session)) -> EventLogRead:
+    try:
+        row = event_ingest.validate_event(db, payload)
+        event = event_ingest.write_event(db, payload, row)
+    except event_ingest.EventRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
 
-    event = EventLog(**data)
-    db.add(event)
-    db.commit()
     db.refresh(event)
     return EventLogRead.model_validate(event)
 
 
-def _ensure_project(db: Session, project_id: UUID) -> Project:
-    project = db.get(Project, project_id)
-    if project is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Project not found")
-    return project
-
-
-def _ensure_milestone(db: Session, milestone_id: Optional[UUID], project_id: UUID) -> Optional[Milestone]:
-    if milestone_id is None:
-        return None
-
-    milestone = db.get(Milestone, milestone_id)
-    if milestone is None or milestone.project_id != project_id:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Milestone not found for project")
-    return milestone
-
-
-def _ensure_task(db: Session, task_id: Optional[UUID], project_id: UUID) -> Optional[Task]:
-    if task_id is None:
-        return None
-
-    task = db.get(Task, task_id)
-    if task is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task not found")
-
-    milestone = task.milestone
-    if milestone is None or milestone.project_id != project_id:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task does not belong to project")
-    return task
+@router.post(":batch", response_model=list[EventBatchResult])
+def create_events_batch(
+    payloads: list[EventLogCreate], response: Response, db: Session = Depends(get_session)
+) -> list[EventBatchResult]:
+    """Record many events; results line up with the request items.
+
+    Valid items are written in one transaction and reported as 201, invalid
+    ones as 400/422 (409 if a reference is deleted while the item is
+    written). With EVENT_WRITE_BEHIND on, valid items are queued for a
+    background COPY instead: they are reported as 202, the response status
+    is 202, and a full buffer answers 429 with nothing queued (see
+    app.event_ingest).
+    """
+    if len(payloads) > event_ingest.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {event_ingest.MAX_BATCH_SIZE} events per batch",
+        )
+    rows, results = event_ingest.validate_events(db, payloads)
+    buffer = event_ingest.write_behind_buffer()
+    if buffer is None:
+        event_ingest.write_events(db, payloads, rows, results)
+        written = status.HTTP_201_CREATED
+    else:
+        if not buffer.offer(rows):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Event buffer is full; retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        response.status_code = written = status.HTTP_202_ACCEPTED
+    for result in results:
+        if result.ok:
+            result.status = written
+    return results
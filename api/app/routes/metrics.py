@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.change_feed import feed_stats
+from app.event_ingest import buffer_stats
+from app.pool_metrics import pool_snapshot
+from app.resolution_cache import cache_stats
+
+router = APIRouter(tags=["metrics"])
+
+POOL_METRICS = {
+    "size": ("gauge", "Configured pool size"),
+    "checked_out": ("gauge", "Connections currently checked out"),
+    "checked_in": ("gauge", "Idle connections held by the pool"),
+    "overflow": ("gauge", "Connections open beyond pool_size"),
+    "max_overflow": ("gauge", "Configured max_overflow"),
+    "checkouts_total": ("counter", "Successful pool checkouts"),
+    "timeouts_total": ("counter", "Checkouts that gave up after pool_timeout"),
+    "wait_seconds_total": ("counter", "Time spent waiting for a pool connection"),
+    "wait_seconds_max": ("gauge", "Longest single wait for a pool connection"),
+    "pre_ping_failures_total": ("counter", "Pre-ping checks that found a dead connection"),
+    "invalidations_total": ("counter", "Connections invalidated by the pool"),
+}
+CACHE_METRICS = {
+    "size": ("gauge", "Entries held by the identifier cache"),
+    "hits": ("counter", "Identifier cache hits"),
+    "misses": ("counter", "Identifier cache misses"),
+}
+FEED_METRICS = {
+    "published": ("counter", "Commits whose changes were published to Redis"),
+    "dropped": ("counter", "Commits whose changes were dropped because the Redis outbox was full"),
+    "publish_failures": ("counter", "Commits whose changes were lost to Redis errors"),
+    "stream_clients": ("gauge", "Open project change streams on this worker"),
+}
+EVENT_BUFFER_METRICS = {
+    "pending": ("gauge", "Events waiting in the write-behind buffer"),
+    "accepted": ("counter", "Events queued by POST /v1/events:batch"),
+    "rejected": ("counter", "Events refused because the write-behind buffer was full"),
+    "written": ("counter", "Buffered events written to the database"),
+    "failed": ("counter", "Buffered events that could not be written"),
+}
+
+
+def _render() -> str:
+    lines: list[str] = []
+    pools = pool_snapshot()
+    for key, (kind, help_text) in POOL_METRICS.items():
+        metric = f"madb_db_pool_{key}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{engine="{name}"}} {values[key]}' for name, values in pools.items()]
+    caches = cache_stats()
+    for key, (kind, help_text) in CACHE_METRICS.items():
+        metric = f"madb_id_cache_{key}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{cache="{name}"}} {values[key]}' for name, values in caches.items()]
+    feed = feed_stats()
+    for key, (kind, help_text) in FEED_METRICS.items():
+        metric = f"madb_change_feed_{key}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {feed[key]}"]
+    events = buffer_stats()
+    for key, (kind, help_text) in EVENT_BUFFER_METRICS.items():
+        metric = f"madb_event_buffer_{key}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {events[key]}"]
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Prometheus text exposition of connection pool, identifier cache, change feed and event buffer counters."""
+    return PlainTextResponse(_render(), media_type="text/plain; version=0.0.4")
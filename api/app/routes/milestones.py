@@ -6,6 +6,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app import resolution_cache
 from app.db import get_session
 from app.models import Milestone, Project
 from app.schemas import MilestoneCreate, MilestoneRead, MilestoneUpdate
@@ -73,4 +74,6 @@ def update_milestone(milestone_id: UUID, payload: MilestoneUpdate, db: Session =
 
     db.commit()
     db.refresh(milestone)
+    if "slug" in update_data:
+        resolution_cache.forget_milestone(milestone.id)
     return MilestoneRead.model_validate(milestone)
@@ -3,9 +3,13 @@ from __future__ import annotations
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exc as sa_exc
 from sqlalchemy.orm import Session
 
+from app import change_feed, resolution_cache
+from app.conditional import etag_matches, make_etag, not_modified, set_etag
 from app.db import get_session
 from app.models import Project
 from app.schemas import (
@@ -16,28 +20,27 @@ from app.schemas import (
     ProjectStatusSummary,
     ProjectUpdate,
 )
-from app.project_services import compute_project_status, select_next_actions, generate_project_summary
+from app.export_services import ENTITIES as EXPORT_ENTITIES, NDJSON_MEDIA_TYPE, stream_project_export
+from app.project_services import load_project_status, generate_project_summary, project_status_version, slugify, unique_project_slug
+from app.scoring_services import rank_next_actions
 from app.models import Milestone
 from typing import List
 
 
-def _slugify(text: str) -> str:
-    # simple slugify: lower, replace non-alphanum with '-', collapse dashes
-    import re
-
-    s = text.lower()
-    s = re.sub(r"[^a-z0-9]+", "-", s)
-    s = re.sub(r"-+", "-", s).strip("-")
-    return s
-
 router = APIRouter(prefix="/v1/projects", tags=["projects"])
 
 
 @router.post("", response_model=ProjectRead, status_code=status.HTTP_201_CREATED)
 def create_project(payload: ProjectCreate, db: Session = Depends(get_session)) -> ProjectRead:
-    project = Project(**payload.model_dump())
+    data = payload.model_dump()
+    data["slug"] = slugify(data["slug"]) if data.get("slug") else unique_project_slug(db, payload.name)
+    project = Project(**data)
     db.add(project)
-    db.commit()
+    try:
+        db.commit()
+    except sa_exc.IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Project slug already exists")
     db.refresh(project)
     return ProjectRead.model_validate(project)
 
@@ -66,21 +69,43 @@ def update_project(project_id: UUID, payload: ProjectUpdate, db: Session = Depen
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
     update_data = payload.model_dump(exclude_unset=True)
+    if update_data.get("slug"):
+        update_data["slug"] = slugify(update_data["slug"])
+    elif update_data.get("name") and update_data["name"] != project.name:
+        # Slugs track the name unless one is set explicitly
+        update_data["slug"] = unique_project_slug(db, update_data["name"], exclude_id=project.id)
+    else:
+        update_data.pop("slug", None)
     for field, value in update_data.items():
         setattr(project, field, value)
 
-    db.commit()
+    try:
+        db.commit()
+    except sa_exc.IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Project slug already exists")
     db.refresh(project)
+    if "slug" in update_data:
+        resolution_cache.forget_project(project.id)
     return ProjectRead.model_validate(project)
 
 
 @router.get("/{project_id}/status", response_model=ProjectStatusRead)
-def get_project_status(project_id: UUID, db: Session = Depends(get_session)) -> ProjectStatusRead:
+def get_project_status(
+    project_id: UUID, request: Request, response: Response, db: Session = Depends(get_session)
+) -> ProjectStatusRead:
+    version = project_status_version(db, project_id)
+    if version is not None:
+        etag = make_etag(version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
     project = db.get(Project, project_id)
     if project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
-    status_summary = compute_project_status(db, project)
+    status_summary = load_project_status(db, project)
     return ProjectStatusRead(
         project_id=status_summary.project_id,
         total_estimate=round(status_summary.total_estimate, 2),
@@ -101,14 +126,17 @@ def get_project_status(project_id: UUID, db: Session = Depends(get_session)) ->
 
 
 @router.get("/{project_id}/next-action", response_model=ProjectNextActions)
-def get_project_next_actions(project_id: UUID, db: Session = Depends(get_session)) -> ProjectNextActions:
+def get_project_next_actions(
+    project_id: UUID, persona: Optional[str] = None, db: Session = Depends(get_session)
+) -> ProjectNextActions:
     project = db.get(Project, project_id)
     if project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
-    suggestions = select_next_actions(db, project)
+    suggestions = rank_next_actions(db, project, persona=persona)
     return ProjectNextActions(
         project_id=project.id,
+        persona=persona,
         suggestions=[
             {
                 "task_id": suggestion.task_id,
@@ -117,6 +145,8 @@ def get_project_next_actions(project_id: UUID, db: Session = Depends(get_session
                 "persona_required": suggestion.persona_required,
                 "priority_score": suggestion.priority_score,
                 "reason": suggestion.reason,
+                "final_score": suggestion.final_score,
+                "wsjf": suggestion.wsjf,
             }
             for suggestion in suggestions
         ],
@@ -139,6 +169,58 @@ def get_project_status_summary(project_id: UUID, db: Session = Depends(get_sessi
 from app.schemas import MilestoneUpdate, MilestoneRead
 
 
+@router.get("/{project_id}/stream", response_class=StreamingResponse)
+def stream_project_changes(project_id: UUID, db: Session = Depends(get_session)) -> StreamingResponse:
+    """Server-sent events announcing task, milestone, bug and event changes in the project."""
+    if not change_feed.enabled():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Change feed is not configured")
+    if db.get(Project, project_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return StreamingResponse(
+        change_feed.event_stream(project_id),
+        media_type=change_feed.SSE_MEDIA_TYPE,
+        # no-transform/X-Accel-Buffering keep proxies from holding events back
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{project_id}/export", response_class=StreamingResponse)
+def export_project(
+    project_id: UUID,
+    export_format: str = Query("ndjson", alias="format", pattern="^ndjson$"),
+    db: Session = Depends(get_session),
+) -> StreamingResponse:
+    """Stream the project, its milestones, tasks, bugs and events as typed NDJSON records."""
+    project = db.get(Project, project_id)
+    if project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return StreamingResponse(
+        stream_project_export(project_id, EXPORT_ENTITIES),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{project.slug}.ndjson"'},
+    )
+
+
+@router.get("/{project_id}/export/{entity}", response_class=StreamingResponse)
+def export_project_entity(
+    project_id: UUID,
+    entity: str,
+    export_format: str = Query("ndjson", alias="format", pattern="^ndjson$"),
+    db: Session = Depends(get_session),
+) -> StreamingResponse:
+    """Stream one kind of row (milestones, tasks, bugs or events) as bare NDJSON objects."""
+    if entity not in EXPORT_ENTITIES:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown export entity {entity!r}")
+    project = db.get(Project, project_id)
+    if project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return StreamingResponse(
+        stream_project_export(project_id, [entity], envelope=False),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{project.slug}-{entity}.ndjson"'},
+    )
+
+
 @router.get("/{project_id}/milestones")
 def find_milestones_by_slug_or_name(
     project_id: UUID,
@@ -161,7 +243,7 @@ def find_milestones_by_slug_or_name(
     results: List[dict] = []
     for m in milestones:
         # Prefer stored slug, fallback to slugified name for legacy records
-        mslug = (m.slug or _slugify(m.name or ""))
+        mslug = (m.slug or slugify(m.name or ""))
         if slug:
             if mslug == slug.lower():
                 results.append({
@@ -1,62 +1,119 @@
 from __future__ import annotations
 
+from dataclasses import replace
 from typing import Optional, Any
 from datetime import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Response
 from fastapi.responses import JSONResponse
 import sqlalchemy as sa
-from sqlalchemy.orm import Session
-
-from app.db import get_session
-from app.models import Milestone, Phase, Task, Attachment, Project
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.db import get_session, settings
+from app.models import Milestone, Phase, Task, Attachment, Project, EventLog
+from app.change_feed import record_change
+from app.conditional import etag_matches, make_etag, not_modified, page_etag, set_etag
+from app.offload import offload
+from app.pagination import MAX_PAGE_SIZE, finish_page, keyset_page
+from app.project_services import slugify
+from app.serialization import ORJSONResponse, read_columns, rows_as_dicts
+from app import attachment_store, claim_services, resolution_cache, task_batch_services, work_bus
+from app.rollup_services import TaskContribution, apply_rollup_delta, apply_rollup_deltas, task_contribution
 from app.schemas import (
     TaskCreate,
     TaskPatch,
     TaskRead,
     TaskUpsertPayload,
     TaskStatusUpdate,
+    TaskStartRequest,
+    TaskClaimRequest,
     BatchStatusItem,
     BatchStatusResult,
+    BatchUpsertResult,
+    AttachmentRead,
 )
 from sqlalchemy import exc as sa_exc
+from starlette.concurrency import run_in_threadpool
 import base64
-import os
-from pathlib import Path
-
-
-ATTACHMENTS_DIR = Path(os.environ.get("ATTACHMENTS_DIR", "/data/attachments"))
-ATTACHMENTS_DIR.mkdir(parents=True, exist_ok=True)
-
-
-def _resolve_milestone_by_slug(db: Session, project_id: UUID, slug: str) -> Optional[Milestone]:
-    # simple slug match using the slug column if present, else fallback to name slug
-    m = db.query(Milestone).filter(Milestone.project_id == project_id)
-    if hasattr(Milestone, "slug"):
-        found = m.filter(sa.func.lower(Milestone.slug) == slug.lower()).first()
-        if found:
-            return found
-
-    # fallback: compute slug from name
-    for mm in m.all():
-        if mm.name and mm.name.lower().replace(" ", "-") == slug.lower():
-            return mm
-    return None
-
+import mimetypes
+
+
+def _slug_candidates(slug: str) -> set[str]:
+    # accept both the stored form and legacy name-derived slugs ("my-project:-v2")
+    return {slug.lower(), slugify(slug)}
+
+
+def _resolve_milestone_by_slug(db: Session, project_id: UUID, slug: str) -> Optional[UUID]:
+    milestone_id = resolution_cache.milestone_slugs.get((project_id, slug))
+    if milestone_id is not None:
+        # another worker may have renamed the milestone or reused its slug
+        milestone = db.get(Milestone, milestone_id)
+        if (
+            milestone is not None
+            and milestone.project_id == project_id
+            and (milestone.slug or "").lower() in _slug_candidates(slug)
+        ):
+            return milestone_id
+        resolution_cache.milestone_slugs.discard((project_id, slug))
+    # served by ix_milestones_project_lower_slug; an exact-case match wins
+    milestone_id = (
+        db.query(Milestone.id)
+        .filter(Milestone.project_id == project_id, sa.func.lower(Milestone.slug).in_(_slug_candidates(slug)))
+        .order_by((Milestone.slug == slug).desc(), Milestone.created_at.asc())
+        .limit(1)
+        .scalar()
+    )
+    if milestone_id is not None:
+        resolution_cache.milestone_slugs.set((project_id, slug), milestone_id)
+    return milestone_id
+
+
+def _resolve_project_by_slug(db: Session, slug: str) -> Optional[UUID]:
+    project_id = resolution_cache.project_slugs.get(slug.lower())
+    if project_id is not None:
+        project = db.get(Project, project_id)
+        if project is not None and (project.slug or "").lower() in _slug_candidates(slug):
+            return project_id
+        resolution_cache.project_slugs.discard(slug.lower())
+    # slugs are stored lower-case, so this is a probe on ux_projects_slug
+    project_id = db.query(Project.id).filter(Project.slug.in_(_slug_candidates(slug))).limit(1).scalar()
+    if project_id is not None:
+        resolution_cache.project_slugs.set(slug.lower(), project_id)
+    return project_id
+
+
+def _find_task_by_external_id(
+    db: Session, external_id: str, project_id: Optional[UUID] = None, for_update: bool = False
+) -> Optional[Task]:
+    """Load a task by external_id, optionally scoped to a project, via the id cache when possible."""
+    key = (project_id, external_id)
+    task_id = resolution_cache.task_external_ids.get(key)
+    if task_id is not None:
+        task = db.get(Task, task_id, with_for_update=for_update)
+        if task is not None and task.external_id == external_id and project_id in (None, task.project_id):
+            return task
+        resolution_cache.task_external_ids.discard(key)
+
+    query = db.query(Task).filter(Task.external_id == external_id)
+    if project_id is not None:
+        query = query.filter(Task.project_id == project_id)
+    if for_update:
+        query = query.with_for_update()
+    task = query.first()
+    if task is not None:
+        resolution_cache.task_external_ids.set(key, task.id)
+    return task
 
-def _resolve_project_by_slug(db: Session, slug: str) -> Optional[Project]:
-    # simple slug match against project.name
-    for p in db.query(Project).all():
-        if p.name and p.name.lower().replace(" ", "-") == slug.lower():
-            return p
-    return None
 
 router = APIRouter(prefix="/v1/tasks", tags=["tasks"])
+# task routes addressed through their project (work-queue claims)
+project_router = APIRouter(prefix="/v1/projects", tags=["tasks"])
 
 
 def _ensure_milestone(db: Session, milestone_id: UUID) -> None:
-    if db.get(Milestone, milestone_id) is None:
+    if milestone_id is None or db.get(Milestone, milestone_id) is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Milestone not found")
 
 
@@ -77,35 +134,48 @@ def create_task(payload: TaskCreate, response: Response, db: Session = Depends(g
     # Resolve project by slug if provided
     project_id = create_data.get("project_id")
     if not project_id and create_data.get("project_slug"):
-        proj = _resolve_project_by_slug(db, create_data["project_slug"])
-        if proj is None:
+        project_id = _resolve_project_by_slug(db, create_data["project_slug"])
+        if project_id is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found by slug")
-        project_id = proj.id
     create_data["project_id"] = project_id
 
     # Resolve milestone by slug (optionally create)
     milestone_id = create_data.get("milestone_id")
+    resolved_milestone = False
     if not milestone_id and create_data.get("milestone_slug"):
         if not project_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="project_id or project_slug required to resolve milestone_slug")
-        m = _resolve_milestone_by_slug(db, project_id, create_data["milestone_slug"])
+        milestone_id = _resolve_milestone_by_slug(db, project_id, create_data["milestone_slug"])
         options = create_data.get("options") or {}
-        if m is None and options.get("create_milestone_if_missing"):
+        if milestone_id is None and options.get("create_milestone_if_missing"):
             # create a minimal milestone
-            nm = Milestone(project_id=project_id, name=create_data["milestone_slug"].replace("-", " "))
+            nm = Milestone(
+                project_id=project_id,
+                slug=create_data["milestone_slug"].lower(),
+                name=create_data["milestone_slug"].replace("-", " "),
+            )
             db.add(nm)
             db.commit()
             db.refresh(nm)
             milestone_id = nm.id
-        elif m is None:
+        elif milestone_id is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Milestone not found by slug")
-        else:
-            milestone_id = m.id
+        # the resolver loaded the milestone, so it need not be checked again
+        resolved_milestone = True
+
+    if milestone_id:
+        # the roll-ups are keyed by both, so they must agree
+        milestone = db.get(Milestone, milestone_id)
+        if milestone is not None:
+            if project_id and milestone.project_id != project_id:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Milestone belongs to a different project")
+            project_id = milestone.project_id
+            create_data["project_id"] = project_id
 
     # Resolve parent task by external id if provided
     parent_task_id = create_data.get("parent_task_id")
     if not parent_task_id and create_data.get("parent_task_external_id"):
-        parent = db.query(Task).filter(Task.external_id == create_data["parent_task_external_id"]).first()
+        parent = _find_task_by_external_id(db, create_data["parent_task_external_id"])
         if parent is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parent task not found by external_id")
         parent_task_id = parent.id
@@ -116,21 +186,18 @@ def create_task(payload: TaskCreate, response: Response, db: Session = Depends(g
         if not project_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="project_id or project_slug required when external_id is provided")
         # SELECT FOR UPDATE to prevent races
-        existing = (
-            db.query(Task)
-            .with_for_update()
-            .filter(Task.external_id == create_data["external_id"], Task.project_id == project_id)
-            .first()
-        )
+        existing = _find_task_by_external_id(db, create_data["external_id"], project_id, for_update=True)
         if existing:
             response.status_code = status.HTTP_200_OK
             response.headers["Location"] = f"/v1/tasks/{existing.id}"
             return TaskRead.model_validate(existing)
 
     # validations
-    _ensure_milestone(db, milestone_id)
+    if not resolved_milestone:
+        _ensure_milestone(db, milestone_id)
     _ensure_phase(db, create_data.get("phase_id"))
-    _ensure_parent_task(db, parent_task_id)
+    # a parent resolved from parent_task_external_id was just loaded
+    _ensure_parent_task(db, create_data.get("parent_task_id"))
 
     # Prepare creation payload
     if milestone_id:
@@ -144,10 +211,14 @@ def create_task(payload: TaskCreate, response: Response, db: Session = Depends(g
     task = Task(**task_kwargs)
     db.add(task)
     try:
+        db.flush()
+        apply_rollup_delta(db, None, task_contribution(task))
         db.commit()
     except sa_exc.IntegrityError as e:
         # possible uniqueness violation across projects or concurrent insert
         db.rollback()
+        if milestone_id:
+            resolution_cache.forget_milestone(milestone_id)
         # if the conflict was external_id within same project, return 200 existing
         if create_data.get("external_id") and project_id:
             existing = (
@@ -162,28 +233,18 @@ def create_task(payload: TaskCreate, response: Response, db: Session = Depends(g
         # otherwise raise conflict
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Conflict creating task")
 
-    db.refresh(task)
+    task = _reload_for_read(db, task)
     created = True
+    if task.external_id:
+        resolution_cache.task_external_ids.set((task.project_id, task.external_id), task.id)
 
     # handle attachments (store files and create Attachment rows)
     attachments = create_data.get("attachments") or []
-    for att in attachments:
-        name = att.get("name")
-        content_b64 = att.get("content_base64")
-        if not name or not content_b64:
-            continue
-        try:
-            data = base64.b64decode(content_b64)
-        except Exception:
-            continue
-        fname = f"{task.id}-{name}"
-        fpath = ATTACHMENTS_DIR / fname
-        fpath.write_bytes(data)
-        a = Attachment(task_id=task.id, name=name, path=str(fpath))
-        db.add(a)
+    for name, blob in offload(_store_inline_attachments, attachments):
+        db.add(_attachment_for(task.id, name, mimetypes.guess_type(name)[0], blob))
     if attachments:
         db.commit()
-        db.refresh(task)
+        task = _reload_for_read(db, task)
     # set response code and Location header
     response.status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
     response.headers["Location"] = f"/v1/tasks/{task.id}"
@@ -191,40 +252,109 @@ def create_task(payload: TaskCreate, response: Response, db: Session = Depends(g
     return _as_task_read(task)
 
 
-@router.get("", response_model=list[TaskRead])
+# TaskRead fields as list_tasks selects them; project_id and milestone_slug come from the
+# milestone as in _as_task_read, attachments are loaded with one extra query per page
+_TASK_READ_COLUMNS = read_columns(
+    TaskRead, Task.__table__, project_id=Milestone.project_id, milestone_slug=Milestone.slug, attachments=None
+)
+_ATTACHMENT_READ_COLUMNS = read_columns(AttachmentRead, Attachment.__table__)
+
+
+@router.get("", response_model=list[TaskRead], response_class=ORJSONResponse)
 def list_tasks(
+    request: Request,
+    response: Response,
     external_id: Optional[str] = None,
     project_id: Optional[UUID] = None,
     project_slug: Optional[str] = None,
     milestone_id: Optional[UUID] = None,
     created_after: Optional[datetime] = None,
-    limit: int = 100,
-    offset: int = 0,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, description="Deprecated: use cursor"),
     db: Session = Depends(get_session),
-) -> list[TaskRead]:
-    query = db.query(Task)
+) -> ORJSONResponse:
+    query = sa.select(*_TASK_READ_COLUMNS).join(Milestone, Milestone.id == Task.milestone_id)
     if project_slug and not project_id:
-        proj = _resolve_project_by_slug(db, project_slug)
-        if proj is None:
+        project_id = _resolve_project_by_slug(db, project_slug)
+        if project_id is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found by slug")
-        project_id = proj.id
     if project_id:
-        query = query.filter(Task.project_id == project_id)
+        query = query.where(Task.project_id == project_id)
     if external_id:
-        query = query.filter(Task.external_id == external_id)
+        query = query.where(Task.external_id == external_id)
     if milestone_id:
-        query = query.filter(Task.milestone_id == milestone_id)
+        query = query.where(Task.milestone_id == milestone_id)
     if created_after:
-        query = query.filter(Task.created_at > created_after)
-    tasks = query.order_by(Task.created_at.asc()).limit(limit).offset(offset).all()
-    return [_as_task_read(task) for task in tasks]
+        query = query.where(Task.created_at > created_after)
+    query = keyset_page(query, Task.created_at, Task.id, cursor, limit)
+    if offset:
+        query = query.offset(offset)
+    rows = finish_page(db.execute(query).all(), limit, request, response)
+    # milestone_slug is joined in, so a milestone rename must change the tag too
+    etag = page_etag(rows, response, versions=("updated_at", "milestone_slug"))
+    if etag_matches(request, etag):
+        return not_modified(etag, response.headers)
+    set_etag(response, etag)
+    attachment_rows = []
+    if rows:
+        attachment_rows = db.execute(
+            sa.select(*_ATTACHMENT_READ_COLUMNS)
+            .where(Attachment.task_id.in_({row.id for row in rows}))
+            .order_by(Attachment.created_at, Attachment.id)
+        ).all()
+    return offload(_render_task_page, rows, attachment_rows, dict(response.headers))
+
+
+def _render_task_page(rows: list[Any], attachment_rows: list[Any], headers: dict[str, str]) -> ORJSONResponse:
+    tasks = rows_as_dicts(rows)
+    attachments: dict[UUID, list[dict[str, Any]]] = {task["id"]: [] for task in tasks}
+    for attachment in rows_as_dicts(attachment_rows):
+        attachments[attachment["task_id"]].append(attachment)
+    for task in tasks:
+        task["attachments"] = attachments[task["id"]]
+    return ORJSONResponse(tasks, headers=headers)
+
+
+@router.get("/resolve", response_model=TaskRead)
+def resolve_task(
+    external_id: Optional[str] = None,
+    project_id: Optional[UUID] = None,
+    milestone_slug: Optional[str] = None,
+    task_slug: Optional[str] = None,
+    db: Session = Depends(get_session),
+) -> TaskRead:
+    task: Task | None = None
+    if external_id:
+        task = _find_task_by_external_id(db, external_id)
+    elif project_id and milestone_slug and task_slug:
+        milestone_id = _resolve_milestone_by_slug(db, project_id, milestone_slug)
+        if milestone_id is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Milestone not found")
+        task = (
+            db.query(Task)
+            .filter(Task.milestone_id == milestone_id)
+            .filter(Task.slug == task_slug)
+            .first()
+        )
+    else:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Provide external_id or (project_id,milestone_slug,task_slug)")
+
+    if task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return TaskRead.model_validate(task)
 
 
 @router.get("/{task_id}", response_model=TaskRead)
-def get_task(task_id: UUID, db: Session = Depends(get_session)) -> TaskRead:
-    task = db.get(Task, task_id)
+def get_task(task_id: UUID, request: Request, response: Response, db: Session = Depends(get_session)) -> TaskRead:
+    # attachments are left to load lazily so a 304 costs a single query
+    task = db.get(Task, task_id, options=[joinedload(Task.milestone)])
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    etag = _weak_etag_for(task)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return _as_task_read(task)
 
 
@@ -246,17 +376,109 @@ def update_task(task_id: UUID, payload: TaskPatch, db: Session = Depends(get_ses
     if "parent_task_id" in update_data:
         _ensure_parent_task(db, update_data["parent_task_id"])
 
+    before = task_contribution(task)
     for field, value in update_data.items():
         setattr(task, field, value)
 
     task.lock_version += 1
+    apply_rollup_delta(db, before, task_contribution(task))
     db.commit()
-    db.refresh(task)
-    return _as_task_read(task)
+    return _as_task_read(_reload_for_read(db, task))
+
+
+@router.post("/{task_id}/attachments", response_model=list[AttachmentRead], status_code=status.HTTP_201_CREATED)
+async def upload_attachments(
+    task_id: UUID, request: Request, response: Response, db: Session = Depends(get_session)
+) -> list[AttachmentRead]:
+    """Attach the file parts of a multipart/form-data body to the task.
+
+    Parts are streamed to content-addressed storage while they are hashed (see
+    app.attachment_store), so the body is never held in memory. The task's
+    lock_version is bumped, changing its ETag, because TaskRead lists the
+    attachments.
+    """
+    if not await run_in_threadpool(_task_exists, db, task_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    try:
+        uploads = await attachment_store.receive_files(request, settings.attachment_max_bytes)
+    except attachment_store.UploadRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    etag, attachments = await run_in_threadpool(_add_uploads, db, task_id, uploads)
+    if etag is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    response.headers["ETag"] = etag
+    return [AttachmentRead.model_validate(attachment) for attachment in attachments]
+
+
+def _task_exists(db: Session, task_id: UUID) -> bool:
+    try:
+        return db.scalar(sa.select(Task.id).where(Task.id == task_id)) is not None
+    finally:
+        # don't hold a pooled connection (or an open transaction) while the body uploads
+        db.rollback()
+
+
+def _add_uploads(
+    db: Session, task_id: UUID, uploads: list[attachment_store.UploadedFile]
+) -> tuple[Optional[str], list[Attachment]]:
+    """Record the uploads on the task; returns its new ETag, or None if the task is gone."""
+    task = db.get(Task, task_id, with_for_update=True)
+    if task is None:
+        return None, []
+    attachments = [_attachment_for(task.id, upload.name, upload.content_type, upload.blob) for upload in uploads]
+    db.add_all(attachments)
+    task.lock_version += 1
+    db.commit()
+    # the milestone is read here, in the threadpool, rather than lazy-loaded on the loop
+    return _weak_etag_for(task), attachments
+
+
+def _store_inline_attachments(attachments: list[dict[str, Any]]) -> list[tuple[str, attachment_store.Blob]]:
+    """Decode and store base64 attachments, skipping ones without a name or valid content."""
+    stored = []
+    for att in attachments:
+        name = att.get("name")
+        content_b64 = att.get("content_base64")
+        if not name or not content_b64:
+            continue
+        try:
+            data = base64.b64decode(content_b64)
+        except Exception:
+            continue
+        stored.append((name, attachment_store.store_bytes(data)))
+    return stored
+
+
+def _attachment_for(
+    task_id: UUID, name: str, content_type: Optional[str], blob: attachment_store.Blob
+) -> Attachment:
+    return Attachment(
+        task_id=task_id,
+        name=name,
+        path=str(blob.path),
+        sha256=blob.sha256,
+        size_bytes=blob.size,
+        content_type=content_type,
+    )
 
 
 def _weak_etag_for(task: Task) -> str:
-    return f'W/"{task.lock_version}"'
+    # TaskRead carries the milestone's slug, which a rename changes without bumping
+    # the task's lock_version; list_tasks versions its rows the same way
+    milestone = task.milestone
+    return make_etag((task.lock_version, milestone.slug if milestone else None))
+
+
+# Everything _as_task_read reads: the milestone joined into the task SELECT and the
+# attachments in one more query, instead of a lazy load for each on first access.
+TASK_READ_OPTIONS = (joinedload(Task.milestone), selectinload(Task.attachments))
+
+
+def _reload_for_read(db: Session, task: Task) -> Task:
+    """Reload ``task`` (e.g. after commit) together with what ``_as_task_read`` needs."""
+    return db.get(Task, task.id, options=TASK_READ_OPTIONS, populate_existing=True)
+
+
 def _as_task_read(task: Task) -> TaskRead:
     # Ensure milestone relationship is available for denormalized fields
     milestone = task.milestone
@@ -271,27 +493,19 @@ def _as_task_read(task: Task) -> TaskRead:
 
 
 
-def _find_milestone_by_project_and_slug(db: Session, project_id: UUID, milestone_slug: str) -> Milestone | None:
-    return (
-        db.query(Milestone)
-        .filter(Milestone.project_id == project_id)
-        .filter(Milestone.slug == milestone_slug)
-        .first()
-    )
-
-
 @router.post(":upsert", response_model=TaskRead)
 def upsert_task(payload: TaskUpsertPayload, response: Response, db: Session = Depends(get_session)) -> TaskRead:
     # Resolve milestone
-    milestone: Milestone | None = None
     if payload.milestone_id:
         milestone = db.get(Milestone, payload.milestone_id)
         if milestone is None:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Unknown milestone_id")
+        milestone_id, project_id = milestone.id, milestone.project_id
     elif payload.project_id and payload.milestone_slug:
-        milestone = _find_milestone_by_project_and_slug(db, payload.project_id, payload.milestone_slug)
-        if milestone is None:
+        milestone_id = _resolve_milestone_by_slug(db, payload.project_id, payload.milestone_slug)
+        if milestone_id is None:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Unknown milestone_slug")
+        project_id = payload.project_id
     else:
         # project_slug not implemented yet
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Must provide milestone_id or (project_id and milestone_slug)")
@@ -300,15 +514,15 @@ def upsert_task(payload: TaskUpsertPayload, response: Response, db: Session = De
     task: Task | None = None
     created = False
     if payload.external_id:
-        task = db.query(Task).filter(Task.external_id == payload.external_id).first()
-        if task and task.milestone_id != milestone.id:
+        task = _find_task_by_external_id(db, payload.external_id)
+        if task and task.milestone_id != milestone_id:
             # conflicting reassignment
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Conflicting external_id assignment")
 
     if task is None and payload.slug:
         task = (
             db.query(Task)
-            .filter(Task.milestone_id == milestone.id)
+            .filter(Task.milestone_id == milestone_id)
             .filter(Task.slug == payload.slug)
             .first()
         )
@@ -317,7 +531,8 @@ def upsert_task(payload: TaskUpsertPayload, response: Response, db: Session = De
         # Create
         created = True
         task = Task(
-            milestone_id=milestone.id,
+            milestone_id=milestone_id,
+            project_id=project_id,
             title=payload.title,
             description=payload.description,
             assignee_persona=payload.assignee_persona,
@@ -331,8 +546,11 @@ def upsert_task(payload: TaskUpsertPayload, response: Response, db: Session = De
         if isinstance(payload.options, dict) and payload.options.get("initial_status"):
             task.status = payload.options["initial_status"]
         db.add(task)
+        db.flush()
+        apply_rollup_delta(db, None, task_contribution(task))
     else:
         # Update a few fields
+        before = task_contribution(task)
         if payload.title is not None:
             task.title = payload.title
         if payload.description is not None:
@@ -348,44 +566,18 @@ def upsert_task(payload: TaskUpsertPayload, response: Response, db: Session = De
         if payload.parent_task_id is not None:
             _ensure_parent_task(db, payload.parent_task_id)
             task.parent_task_id = payload.parent_task_id
+        # like every other task write, so ETags and lock_version checks see the change
+        task.lock_version += 1
+        apply_rollup_delta(db, before, task_contribution(task))
 
     db.commit()
-    db.refresh(task)
+    task = _reload_for_read(db, task)
 
     response.headers["Location"] = f"/v1/tasks/{task.id}"
     response.headers["ETag"] = _weak_etag_for(task)
     if created:
         response.status_code = status.HTTP_201_CREATED
-    return TaskRead.model_validate(task)
-
-
-@router.get("/resolve", response_model=TaskRead)
-def resolve_task(
-    external_id: Optional[str] = None,
-    project_id: Optional[UUID] = None,
-    milestone_slug: Optional[str] = None,
-    task_slug: Optional[str] = None,
-    db: Session = Depends(get_session),
-) -> TaskRead:
-    task: Task | None = None
-    if external_id:
-        task = db.query(Task).filter(Task.external_id == external_id).first()
-    elif project_id and milestone_slug and task_slug:
-        milestone = _find_milestone_by_project_and_slug(db, project_id, milestone_slug)
-        if milestone is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Milestone not found")
-        task = (
-            db.query(Task)
-            .filter(Task.milestone_id == milestone.id)
-            .filter(Task.slug == task_slug)
-            .first()
-        )
-    else:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Provide external_id or (project_id,milestone_slug,task_slug)")
-
-    if task is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    return TaskRead.model_validate(task)
+    return _as_task_read(task)
 
 
 @router.patch("/{task_id}/status", response_model=TaskRead)
@@ -398,13 +590,15 @@ def update_task_status(task_id: UUID, payload: TaskStatusUpdate, response: Respo
         current = _as_task_read(task)
         return JSONResponse(
             status_code=status.HTTP_409_CONFLICT,
-            content={"error": "conflict", "lock_version": task.lock_version, "task": current.model_dump()}
+            content={"error": "conflict", "lock_version": task.lock_version, "task": current.model_dump(mode="json")}
         )
 
+    before = task_contribution(task)
     task.status = payload.status
     task.lock_version += 1
+    apply_rollup_delta(db, before, task_contribution(task))
     db.commit()
-    db.refresh(task)
+    task = _reload_for_read(db, task)
     response.headers["ETag"] = _weak_etag_for(task)
     return _as_task_read(task)
 
@@ -413,79 +607,335 @@ def update_task_status(task_id: UUID, payload: TaskStatusUpdate, response: Respo
 def update_task_status_by_external_id(
     external_id: str, payload: TaskStatusUpdate, response: Response, db: Session = Depends(get_session)
 ) -> TaskRead:
-    task = db.query(Task).filter(Task.external_id == external_id).first()
+    task = _find_task_by_external_id(db, external_id)
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     if payload.lock_version is not None and task.lock_version != payload.lock_version:
         # For this endpoint the proposal returns TaskRead on 409
         current = _as_task_read(task)
-        return JSONResponse(status_code=status.HTTP_409_CONFLICT, content=current.model_dump())
+        return JSONResponse(status_code=status.HTTP_409_CONFLICT, content=current.model_dump(mode="json"))
+    before = task_contribution(task)
     task.status = payload.status
     task.lock_version += 1
+    apply_rollup_delta(db, before, task_contribution(task))
     db.commit()
-    db.refresh(task)
+    task = _reload_for_read(db, task)
     response.headers["ETag"] = _weak_etag_for(task)
     return _as_task_read(task)
 
 
-@router.post("/status:batch", response_model=list[BatchStatusResult])
-def batch_update_status(items: list[BatchStatusItem], db: Session = Depends(get_session)) -> list[BatchStatusResult]:
-    results: list[BatchStatusResult] = []
-    for item in items:
-        try:
-            task: Task | None = None
-            if item.id:
-                task = db.get(Task, item.id)
-            elif item.external_id:
-                task = db.query(Task).filter(Task.external_id == item.external_id).first()
-            else:
-                results.append(BatchStatusResult(ok=False, id=None, external_id=None, status=422, error="missing identifier"))
-                continue
+def _mark_started(db: Session, task: Task, agent: str, persona: Optional[str]) -> None:
+    """Move a locked not_started task to in_progress for ``agent`` and log it."""
+    before = task_contribution(task)
+    task.status = "in_progress"
+    task.owner = agent
+    if persona and not task.assignee_persona:
+        # persona limits count in-progress tasks by assignee_persona
+        task.assignee_persona = persona
+    task.lock_version += 1
+    apply_rollup_delta(db, before, task_contribution(task))
+    db.add(
+        EventLog(
+            project_id=task.project_id,
+            milestone_id=task.milestone_id,
+            task_id=task.id,
+            category="task_started",
+            summary=f"{agent} started {task.title}"[:255],
+        )
+    )
+    work_bus.record_started(db, task, agent, persona)
+
+
+def _start_conflict(task: Task) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"error": "conflict", "status": task.status, "owner": task.owner, "lock_version": task.lock_version},
+    )
 
-            if task is None:
-                results.append(
-                    BatchStatusResult(ok=False, id=item.id, external_id=item.external_id, status=404, error="not found")
-                )
-                continue
-            if item.lock_version is not None and task.lock_version != item.lock_version:
-                results.append(
-                    BatchStatusResult(
-                        ok=False,
-                        id=str(task.id),
-                        external_id=task.external_id,
-                        status=409,
-                        lock_version=task.lock_version,
-                        error="conflict",
-                    )
-                )
-                continue
 
-            task.status = item.status
-            task.lock_version += 1
-            db.add(task)
-            db.flush()
+@router.post("/{task_id}:start", response_model=TaskRead)
+def start_task(
+    task_id: UUID, payload: TaskStartRequest, response: Response, db: Session = Depends(get_session)
+) -> TaskRead:
+    """Claim a not-started task for an agent (spec §14 claim/ack, see app.work_bus).
+
+    The task row is locked while it is checked and moved to in_progress, so of
+    several agents starting the same task exactly one succeeds; the others get
+    409. A repeated call by the agent that holds the task returns it unchanged.
+    """
+    task = db.get(Task, task_id, with_for_update=True)
+    if task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    group = work_bus.group_for(payload.persona)
+
+    if task.status == "in_progress" and task.owner == payload.agent:
+        if payload.message_id:
+            work_bus.acknowledge(None, task.project_id, group, payload.message_id)
+        task = _reload_for_read(db, task)
+        response.headers["ETag"] = _weak_etag_for(task)
+        return _as_task_read(task)
+    if task.status != "not_started":
+        # someone else holds it (or it is finished); the offer is spent either way
+        if payload.message_id:
+            work_bus.acknowledge(None, task.project_id, group, payload.message_id)
+        return _start_conflict(task)
+    if payload.lock_version is not None and task.lock_version != payload.lock_version:
+        return _start_conflict(task)
 
+    _mark_started(db, task, payload.agent, payload.persona)
+    if payload.message_id:
+        work_bus.acknowledge(db, task.project_id, group, payload.message_id)
+    db.commit()
+    task = _reload_for_read(db, task)
+    response.headers["ETag"] = _weak_etag_for(task)
+    return _as_task_read(task)
+
+
+@project_router.post("/{project_id}/tasks:claim", response_model=TaskRead, responses={204: {"description": "Nothing to claim"}})
+def claim_task(
+    project_id: UUID,
+    payload: TaskClaimRequest,
+    response: Response,
+    persona: Optional[str] = None,
+    db: Session = Depends(get_session),
+) -> TaskRead:
+    """Atomically pick the best ready task for ``persona`` and start it for the agent.
+
+    Concurrent claims lock different tasks (FOR UPDATE SKIP LOCKED) rather than
+    colliding on the top-ranked one; see app.claim_services. 409 when a persona
+    limit is reached, 204 when no task is left to claim.
+    """
+    project = db.get(Project, project_id)
+    if project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    reason = claim_services.persona_limit_reached(db, project_id, persona, payload.agent)
+    if reason:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=reason)
+    task = claim_services.claim_next_task(db, project, persona)
+    if task is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    _mark_started(db, task, payload.agent, persona)
+    db.commit()
+    task = _reload_for_read(db, task)
+    response.headers["Location"] = f"/v1/tasks/{task.id}"
+    response.headers["ETag"] = _weak_etag_for(task)
+    return _as_task_read(task)
+
+
+BATCH_UPSERT_LIMIT = 10000
+
+
+@router.post(":batchUpsert", response_model=list[BatchUpsertResult])
+def batch_upsert_tasks(payloads: list[TaskUpsertPayload], db: Session = Depends(get_session)) -> list[BatchUpsertResult]:
+    """Create or update many tasks in one transaction; results line up with the request items."""
+    if len(payloads) > BATCH_UPSERT_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BATCH_UPSERT_LIMIT} tasks per batch",
+        )
+    try:
+        results = task_batch_services.batch_upsert_tasks(db, payloads)
+        db.commit()
+    except sa_exc.IntegrityError:
+        # e.g. a slug change colliding with another task, or a concurrent insert of the same key
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Conflict applying batch; nothing was written")
+    return results
+
+
+TASK_STATUSES = frozenset(Task.__table__.c.status.type.enums)
+
+
+def _fold_status_items(
+    items: list[BatchStatusItem], rows_by_id: dict[UUID, Any], rows_by_external_id: dict[str, Any]
+) -> tuple[list[Optional[BatchStatusResult]], list[dict[str, Any]]]:
+    """Fold the items into one pending write per task.
+
+    Returns a result slot per item (None where the UPDATE decides it) and the
+    writes that have items to apply.
+    """
+    results: list[Optional[BatchStatusResult]] = []
+    pending: dict[UUID, dict[str, Any]] = {}
+    for item in items:
+        if not item.id and not item.external_id:
+            results.append(BatchStatusResult(ok=False, id=None, external_id=None, status=422, error="missing identifier"))
+            continue
+        row = rows_by_id.get(item.id) if item.id else rows_by_external_id.get(item.external_id)
+        if row is None:
+            results.append(
+                BatchStatusResult(ok=False, id=item.id, external_id=item.external_id, status=404, error="not found")
+            )
+            continue
+        if item.status not in TASK_STATUSES:
             results.append(
                 BatchStatusResult(
-                    ok=True, id=str(task.id), external_id=task.external_id, status=200, lock_version=task.lock_version
+                    ok=False, id=row.id, external_id=row.external_id, status=422, error=f"invalid status {item.status!r}"
                 )
             )
-        except Exception as e:  # pragma: no cover - defensive catch
+            continue
+        write = pending.setdefault(row.id, {"row": row, "lock_version": row.lock_version, "status": row.status, "items": []})
+        if item.lock_version is not None and item.lock_version != write["lock_version"]:
             results.append(
                 BatchStatusResult(
-                    ok=False, id=item.id, external_id=item.external_id, status=500, error=str(e), lock_version=None
+                    ok=False,
+                    id=row.id,
+                    external_id=row.external_id,
+                    status=409,
+                    lock_version=write["lock_version"],
+                    error="conflict",
                 )
             )
+            continue
+        write["lock_version"] += 1
+        write["status"] = item.status
+        write["items"].append((len(results), write["lock_version"]))
+        results.append(None)  # filled in once the UPDATE confirms it
+    return results, [write for write in pending.values() if write["items"]]
+
+
+def _settle_status_writes(
+    writes: list[dict[str, Any]],
+    updated_ids: set[UUID],
+    current_versions: dict[UUID, int],
+    results: list[Optional[BatchStatusResult]],
+) -> list[tuple[TaskContribution, TaskContribution]]:
+    """Fill in the results the UPDATE decided; returns the roll-up changes of the writes it applied."""
+    rollup_changes = []
+    for write in writes:
+        row = write["row"]
+        if row.id in updated_ids:
+            before = task_contribution(row)
+            rollup_changes.append((before, replace(before, status=write["status"])))
+            for position, version in write["items"]:
+                results[position] = BatchStatusResult(
+                    ok=True, id=row.id, external_id=row.external_id, status=200, lock_version=version
+                )
+        else:
+            # changed (or deleted) between our read and the UPDATE
+            for position, _ in write["items"]:
+                results[position] = BatchStatusResult(
+                    ok=False,
+                    id=row.id,
+                    external_id=row.external_id,
+                    status=409 if row.id in current_versions else 404,
+                    lock_version=current_versions.get(row.id),
+                    error="conflict" if row.id in current_versions else "not found",
+                )
+    return rollup_changes
+
+
+@router.post("/status:batch", response_model=list[BatchStatusResult])
+def batch_update_status(items: list[BatchStatusItem], db: Session = Depends(get_session)) -> list[BatchStatusResult]:
+    """Apply status changes in bulk, reporting 200/404/409/422 per item.
+
+    Targets are resolved with one IN query and written with one
+    UPDATE ... FROM unnest(...) RETURNING that re-checks lock_version, so a
+    row changed concurrently comes back as a 409 instead of being overwritten.
+    Items are applied in order, so repeated items for a task see the
+    lock_version left by the previous one.
+    """
+    tasks_table = Task.__table__
+    ids = {item.id for item in items if item.id}
+    external_ids = {item.external_id for item in items if not item.id and item.external_id}
+
+    rows_by_id: dict[UUID, Any] = {}
+    rows_by_external_id: dict[str, Any] = {}
+    if ids or external_ids:
+        conditions = []
+        if ids:
+            conditions.append(tasks_table.c.id.in_(ids))
+        if external_ids:
+            conditions.append(tasks_table.c.external_id.in_(external_ids))
+        rows = db.execute(
+            sa.select(
+                tasks_table.c.id,
+                tasks_table.c.external_id,
+                tasks_table.c.lock_version,
+                tasks_table.c.project_id,
+                tasks_table.c.milestone_id,
+                tasks_table.c.effort_estimate,
+                tasks_table.c.effort_spent,
+                tasks_table.c.risk_level,
+                tasks_table.c.status,
+            )
+            .where(sa.or_(*conditions))
+            .order_by(tasks_table.c.created_at.asc())
+        ).all()
+        for row in rows:
+            rows_by_id[row.id] = row
+            if row.external_id in external_ids:
+                # external_id is only unique per project; keep the oldest like the single lookups do
+                rows_by_external_id.setdefault(row.external_id, row)
+
+    results, writes = offload(_fold_status_items, items, rows_by_id, rows_by_external_id)
+    if writes:
+        # unnest() of array parameters rather than an inline VALUES list, so the
+        # statement compiles once instead of once per batch size
+        values = sa.func.unnest(
+            sa.bindparam("ids", [w["row"].id for w in writes], type_=ARRAY(tasks_table.c.id.type)),
+            sa.bindparam("expected_versions", [w["row"].lock_version for w in writes], type_=ARRAY(sa.Integer)),
+            sa.bindparam("new_versions", [w["lock_version"] for w in writes], type_=ARRAY(sa.Integer)),
+            sa.bindparam("new_statuses", [w["status"] for w in writes], type_=ARRAY(sa.String)),
+        ).table_valued("id", "expected_version", "new_version", "new_status").render_derived(name="batch")
+        updated = db.execute(
+            sa.update(tasks_table)
+            .where(tasks_table.c.id == values.c.id, tasks_table.c.lock_version == values.c.expected_version)
+            .values(
+                status=sa.cast(values.c.new_status, tasks_table.c.status.type),
+                lock_version=values.c.new_version,
+                updated_at=datetime.utcnow(),
+            )
+            .returning(tasks_table.c.id)
+        ).scalars().all()
+        updated_ids = set(updated)
+
+        raced = [w["row"].id for w in writes if w["row"].id not in updated_ids]
+        current_versions = {}
+        if raced:
+            current_versions = dict(
+                db.execute(sa.select(tasks_table.c.id, tasks_table.c.lock_version).where(tasks_table.c.id.in_(raced))).all()
+            )
+
+        rollup_changes = offload(_settle_status_writes, writes, updated_ids, current_versions, results)
+        for write in writes:
+            row = write["row"]
+            if row.id not in updated_ids:
+                continue
+            record_change(
+                db,
+                "task",
+                "updated",
+                row.project_id,
+                row.id,
+                status=write["status"],
+                lock_version=write["lock_version"],
+                milestone_id=str(row.milestone_id),
+            )
+            if write["status"] != row.status:
+                work_bus.record_status_change(db, row.project_id, row.id, row.status, write["status"], write["lock_version"])
+        apply_rollup_deltas(db, rollup_changes)
 
     db.commit()
     return results
 
+
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
 def delete_task(task_id: UUID, db: Session = Depends(get_session)) -> Response:
     """Delete a task by id. Returns 204 on success or 404 if not found."""
     task = db.get(Task, task_id)
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    # subtasks are removed by the delete cascade, so they leave the roll-ups too
+    subtree = sa.select(Task.id).where(Task.id == task_id).cte("subtree", recursive=True)
+    subtree = subtree.union_all(sa.select(Task.id).where(Task.parent_task_id == subtree.c.id))
+    removed = db.scalars(sa.select(Task).where(Task.id.in_(sa.select(subtree.c.id)))).all()
+    apply_rollup_deltas(db, [(task_contribution(t), None) for t in removed])
+    for subtask in removed:
+        if subtask.id != task.id:
+            # the flush only sees the root; its subtasks go with the FK cascade
+            record_change(db, "task", "deleted", subtask.project_id, subtask.id)
     db.delete(task)
     db.commit()
+    resolution_cache.forget_tasks([t.id for t in removed])
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -4,6 +4,7 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 
 from app import schemas as app_schemas
+from app.resolution_cache import cache_stats
 
 router = APIRouter(prefix="/v1/.well-known", tags=["discovery"])
 
@@ -33,3 +34,9 @@ def list_schemas() -> dict[str, dict[str, object]]:
 @router.get("/openapi")
 def discover_openapi() -> dict[str, str]:
     return {"openapi_url": "/openapi.yml"}
+
+
+@router.get("/caches")
+def list_cache_stats() -> dict[str, dict[str, object]]:
+    """Hit/miss counters for the in-process identifier caches."""
+    return {"caches": cache_stats()}
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -16,14 +16,19 @@ class ProjectBase(BaseModel):
         default=None,
         description="Remote git repository URL for the project",
     )
+    priority_scheme: Optional[dict[str, float]] = Field(
+        default=None,
+        description="Overrides for next-action scoring weights (e.g. business_value, readiness, impact)",
+    )
 
 
 class ProjectCreate(ProjectBase):
-    pass
+    slug: Optional[str] = Field(default=None, description="Unique URL-safe handle; derived from the name when omitted")
 
 
 class ProjectRead(ProjectBase):
     id: UUID
+    slug: str
     created_at: datetime
     updated_at: datetime
 
@@ -32,10 +37,12 @@ class ProjectRead(ProjectBase):
 
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
+    slug: Optional[str] = None
     goal: Optional[str] = None
     direction: Optional[str] = None
     parent_id: Optional[UUID] = None
     repository: Optional[str] = None
+    priority_scheme: Optional[dict[str, float]] = None
 
 
 class MilestoneBase(BaseModel):
@@ -93,7 +100,8 @@ class TaskBase(BaseModel):
 
 
 class TaskCreate(TaskBase):
-    # allow milestone_id to be optional for automated flows that supply milestone_slug
+    # allow project_id / milestone_id to be optional for automated flows that supply slugs
+    project_id: Optional[UUID] = None
     milestone_id: Optional[UUID] = None
     # Extended fields for automated task creation flows
     project_slug: Optional[str] = None
@@ -156,6 +164,18 @@ class TaskStatusUpdate(BaseModel):
     lock_version: Optional[int] = None
 
 
+class TaskStartRequest(BaseModel):
+    agent: str = Field(..., min_length=1, max_length=255, description="Agent claiming the task; becomes the task owner")
+    persona: Optional[str] = None
+    # agent:work entry that offered the task; acknowledged in the persona's consumer group
+    message_id: Optional[str] = None
+    lock_version: Optional[int] = None
+
+
+class TaskClaimRequest(BaseModel):
+    agent: str = Field(..., min_length=1, max_length=255, description="Agent claiming work; becomes the task owner")
+
+
 class BatchStatusItem(BaseModel):
     id: Optional[UUID] = None
     external_id: Optional[str] = None
@@ -171,6 +191,14 @@ class BatchStatusResult(BaseModel):
     lock_version: Optional[int] = None
     error: Optional[str] = None
 
+class BatchUpsertResult(BaseModel):
+    ok: bool
+    id: Optional[UUID] = None
+    external_id: Optional[str] = None
+    slug: Optional[str] = None
+    status: int
+    error: Optional[str] = None
+
 class ProjectStatusMilestone(BaseModel):
     milestone_id: UUID
     name: str
@@ -195,10 +223,13 @@ class NextActionSuggestion(BaseModel):
     persona_required: Optional[str] = None
     priority_score: float
     reason: str
+    final_score: Optional[float] = None
+    wsjf: Optional[float] = None
 
 
 class ProjectNextActions(BaseModel):
     project_id: UUID
+    persona: Optional[str] = None
     suggestions: list[NextActionSuggestion]
 
 
@@ -287,6 +318,13 @@ class EventLogRead(EventLogBase):
     model_config = {"from_attributes": True}
 
 
+class EventBatchResult(BaseModel):
+    ok: bool
+    id: Optional[UUID] = None
+    status: int
+    error: Optional[str] = None
+
+
 class ContextSnapshotBase(BaseModel):
     repo_id: str
     branch: Optional[str] = None
@@ -303,6 +341,11 @@ class ContextSnapshotBase(BaseModel):
 class ContextSnapshotCreate(ContextSnapshotBase):
     pass
 
+class ContextScanRequest(BaseModel):
+    repo_id: str
+    branch: Optional[str] = None
+    workflow_id: Optional[str] = None
+
 class ContextSnapshotRead(ContextSnapshotBase):
     id: int
     created_at: datetime
@@ -310,11 +353,45 @@ class ContextSnapshotRead(ContextSnapshotBase):
     model_config = {"from_attributes": True}
 
 
+class ContextDiffCounts(BaseModel):
+    added: int
+    removed: int
+    modified: int
+    bytes_delta: int
+    lines_delta: int
+
+
+class ContextDiffComponent(ContextDiffCounts):
+    component: str
+
+
+class ContextDiffFile(BaseModel):
+    path: str
+    change: Literal["added", "removed", "modified"]
+    bytes_delta: int
+    lines_delta: int
+    sha1_from: Optional[str] = None
+    sha1_to: Optional[str] = None
+
+
+class ContextDiffRead(BaseModel):
+    repo_id: str
+    from_snapshot_id: int
+    to_snapshot_id: int
+    totals: ContextDiffCounts
+    components: list[ContextDiffComponent]
+    files: list[ContextDiffFile]
+    truncated: bool
+
+
 class AttachmentRead(BaseModel):
     id: UUID
     task_id: UUID
     name: str
     path: str
+    sha256: Optional[str] = None
+    size_bytes: Optional[int] = None
+    content_type: Optional[str] = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
@@ -327,6 +404,7 @@ class AttachmentCreate(BaseModel):
 
 class ContextIndexRead(BaseModel):
     repo_id: str
+    branch: str
     latest_snapshot_id: int
     updated_at: datetime
 
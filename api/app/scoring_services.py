@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Any, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from .models import Bug, Milestone, Project, Task
+from .offload import offload
+from .project_services import NextActionSuggestion
+
+# Spec §9 inputs are not stored on tasks yet, so they are derived from existing columns.
+SEVERITY_VALUE = {"nice_to_have": 2.0, "minor": 4.0, "major": 7.0, "critical": 10.0}
+RISK_REDUCTION = {"low": 1.0, "medium": 5.0, "high": 8.0}
+CANDIDATE_STATUSES = ("not_started", "in_progress")
+SEVERE_BUG_LEVELS = ("S1", "S2")
+
+
+@dataclass
+class ScoringWeights:
+    """WSJF (spec §9) and NSA (spec §10) weights; override per project via ``priority_scheme``."""
+
+    business_value: float = 1.0
+    time_criticality: float = 0.8
+    risk_reduction: float = 0.7
+    blocking: float = 0.6
+    security: float = 1.2
+    readiness: float = 0.5
+    impact: float = 0.5
+    persona_fit: float = 10.0
+    high_risk_penalty: float = 5.0
+
+    @classmethod
+    def from_scheme(cls, scheme: Optional[dict[str, Any]]) -> ScoringWeights:
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: float(value) for key, value in (scheme or {}).items() if key in known})
+
+
+@dataclass
+class TaskColumns:
+    """Open tasks of a project as parallel column arrays (one entry per task).
+
+    Categorical inputs arrive pre-mapped to numbers by ``load_task_columns`` so
+    scoring never touches per-row Python objects. Missing personas are ``""``
+    and a missing milestone due date is NaN.
+    """
+
+    ids: np.ndarray
+    titles: np.ndarray
+    status: np.ndarray
+    persona_required: np.ndarray
+    assignee_persona: np.ndarray
+    is_candidate: np.ndarray
+    in_progress: np.ndarray
+    has_owner: np.ndarray
+    has_acceptance_criteria: np.ndarray
+    priority_score: np.ndarray
+    effort_estimate: np.ndarray
+    severity_value: np.ndarray
+    risk_reduction: np.ndarray
+    high_risk: np.ndarray
+    due_in_days: np.ndarray
+    created_at: np.ndarray
+    open_children: np.ndarray
+    open_bugs: np.ndarray
+    severe_bugs: np.ndarray
+    milestone_open_tasks: np.ndarray
+    phase_open_tasks: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> TaskColumns:
+        """Build from rows laid out like the ``load_task_columns`` select list (no NULLs).
+
+        The rows are transposed once and each column tuple is read straight
+        into its typed array.
+        """
+        names = [f.name for f in fields(cls)]
+        count = len(rows)
+        columns = zip(*rows) if count else [()] * len(names)
+        return cls(
+            **{
+                name: np.fromiter(column, dtype=_COLUMN_TYPES.get(name, float), count=count)
+                for name, column in zip(names, columns)
+            }
+        )
+
+
+# dtype of each non-float column
+_COLUMN_TYPES: dict[str, type] = {
+    **dict.fromkeys(("ids", "titles", "status", "persona_required", "assignee_persona"), object),
+    **dict.fromkeys(("is_candidate", "in_progress", "has_owner", "has_acceptance_criteria", "high_risk"), bool),
+}
+
+
+@dataclass
+class TaskScores:
+    candidates: np.ndarray
+    wsjf: np.ndarray
+    readiness: np.ndarray
+    impact: np.ndarray
+    final_score: np.ndarray
+    closes: np.ndarray
+    persona_match: np.ndarray
+
+    def ranked(self, columns: TaskColumns) -> np.ndarray:
+        """Candidate indices ordered by final score, then stored priority, then age."""
+        index = np.flatnonzero(self.candidates)
+        order = np.lexsort((columns.created_at[index], -columns.priority_score[index], -self.final_score[index]))
+        return index[order]
+
+
+def score_tasks(columns: TaskColumns, weights: ScoringWeights, persona: Optional[str] = None) -> TaskScores:
+    """Score every open task of a project in one array pass."""
+    size = len(columns)
+
+    # WSJF = weighted value / job size (spec §9); NaN days means no due date.
+    days = columns.due_in_days
+    time_criticality = np.select(
+        [np.isnan(days), days < 0, days <= 7, days <= 14, days <= 30],
+        [1.0, 10.0, 8.0, 6.0, 4.0],
+        default=2.0,
+    )
+    value = (
+        weights.business_value * columns.severity_value
+        + weights.time_criticality * time_criticality
+        + weights.risk_reduction * columns.risk_reduction
+        + weights.blocking * np.minimum(columns.open_bugs, 5.0)
+        + weights.security * np.minimum(2.5 * columns.severe_bugs, 5.0)
+    )
+    wsjf = value / np.maximum(columns.effort_estimate, 0.5)
+
+    # Candidate filter and persona fit (spec §10)
+    candidates = columns.is_candidate.copy()
+    persona_match = np.zeros(size, dtype=bool)
+    if persona:
+        candidates &= (columns.persona_required == "") | (columns.persona_required == persona)
+        candidates &= (columns.assignee_persona == "") | (columns.assignee_persona == persona)
+        persona_match = (columns.persona_required == persona) | (columns.assignee_persona == persona)
+
+    readiness = 25.0 * (
+        columns.has_acceptance_criteria.astype(float)
+        + (columns.has_owner | (columns.assignee_persona != "")).astype(float)
+        + (columns.open_children == 0).astype(float)
+        + columns.in_progress.astype(float)
+    )
+
+    impact = np.zeros(size)
+    if candidates.any():
+        low, high = wsjf[candidates].min(), wsjf[candidates].max()
+        impact = 100.0 * (wsjf - low) / (high - low) if high > low else np.full(size, 100.0)
+
+    # Finishing the last open task of a phase / milestone / project earns a boost.
+    closes = np.select(
+        [np.full(size, size == 1), columns.milestone_open_tasks == 1, columns.phase_open_tasks == 1],
+        [30.0, 20.0, 10.0],
+        default=0.0,
+    )
+    impact = impact + closes
+
+    final_score = (
+        weights.readiness * readiness
+        + weights.impact * impact
+        + weights.persona_fit * persona_match
+        - weights.high_risk_penalty * columns.high_risk
+    )
+    return TaskScores(
+        candidates=candidates,
+        wsjf=wsjf,
+        readiness=readiness,
+        impact=impact,
+        final_score=final_score,
+        closes=closes,
+        persona_match=persona_match,
+    )
+
+
+def _mapped(column: Any, table: dict[str, float], default: float) -> Any:
+    return sa.case(*[(column == key, value) for key, value in table.items()], else_=default)
+
+
+def load_task_columns(session: Session, project_id: UUID) -> TaskColumns:
+    open_children = (
+        sa.select(Task.parent_task_id.label("task_id"), sa.func.count().label("open_children"))
+        .where(Task.project_id == project_id, Task.status != "done", Task.parent_task_id.isnot(None))
+        .group_by(Task.parent_task_id)
+        .subquery()
+    )
+    open_bugs = (
+        sa.select(
+            Bug.task_id.label("task_id"),
+            sa.func.count().label("open_bugs"),
+            sa.func.count().filter(Bug.severity.in_(SEVERE_BUG_LEVELS)).label("severe_bugs"),
+        )
+        .where(Bug.project_id == project_id, Bug.status != "closed", Bug.task_id.isnot(None))
+        .group_by(Bug.task_id)
+        .subquery()
+    )
+    as_float = lambda expression: sa.cast(expression, sa.Float)  # noqa: E731
+    # Column order must match TaskColumns field order.
+    rows = session.execute(
+        sa.select(
+            Task.id,
+            Task.title,
+            Task.status,
+            sa.func.coalesce(Task.persona_required, ""),
+            sa.func.coalesce(Task.assignee_persona, ""),
+            Task.status.in_(CANDIDATE_STATUSES),
+            Task.status == "in_progress",
+            sa.func.coalesce(sa.func.length(Task.owner), 0) > 0,
+            sa.func.coalesce(sa.func.length(Task.acceptance_criteria), 0) > 0,
+            as_float(sa.func.coalesce(Task.priority_score, 0)),
+            as_float(sa.func.coalesce(Task.effort_estimate, 0)),
+            _mapped(Task.severity, SEVERITY_VALUE, SEVERITY_VALUE["minor"]),
+            _mapped(Task.risk_level, RISK_REDUCTION, RISK_REDUCTION["low"]),
+            Task.risk_level == "high",
+            sa.func.coalesce(as_float(Milestone.due_date - sa.func.current_date()), float("nan")),
+            sa.func.coalesce(as_float(sa.func.extract("epoch", Task.created_at)), float("inf")),
+            sa.func.coalesce(open_children.c.open_children, 0),
+            sa.func.coalesce(open_bugs.c.open_bugs, 0),
+            sa.func.coalesce(open_bugs.c.severe_bugs, 0),
+            sa.func.count().over(partition_by=Task.milestone_id),
+            sa.case((Task.phase_id.isnot(None), sa.func.count().over(partition_by=Task.phase_id)), else_=0),
+        )
+        .join(Milestone, Task.milestone_id == Milestone.id)
+        .outerjoin(open_children, open_children.c.task_id == Task.id)
+        .outerjoin(open_bugs, open_bugs.c.task_id == Task.id)
+        .where(Task.project_id == project_id, Task.status != "done")
+    ).all()
+    return offload(TaskColumns.from_rows, rows)
+
+
+def _reason(columns: TaskColumns, scores: TaskScores, index: int, persona: Optional[str]) -> str:
+    reason_parts = [f"WSJF {scores.wsjf[index]:.1f}", f"readiness {scores.readiness[index]:.0f}"]
+    closes = scores.closes[index]
+    if closes >= 30:
+        reason_parts.append("Closes the project")
+    elif closes >= 20:
+        reason_parts.append("Closes its milestone")
+    elif closes >= 10:
+        reason_parts.append("Closes its phase")
+    if scores.persona_match[index]:
+        reason_parts.append(f"Matches persona {persona}")
+    if columns.severe_bugs[index]:
+        reason_parts.append("Resolves severe bugs")
+    if columns.in_progress[index]:
+        reason_parts.append("Already in progress")
+    else:
+        reason_parts.append("Ready to start")
+    if columns.high_risk[index]:
+        reason_parts.append("High risk")
+    return "; ".join(reason_parts)
+
+
+def rank_next_actions(
+    session: Session, project: Project, persona: Optional[str] = None, limit: int = 3
+) -> list[NextActionSuggestion]:
+    columns = load_task_columns(session, project.id)
+    return offload(_suggest, columns, ScoringWeights.from_scheme(project.priority_scheme), persona, limit)
+
+
+def _suggest(
+    columns: TaskColumns, weights: ScoringWeights, persona: Optional[str], limit: int
+) -> list[NextActionSuggestion]:
+    scores = score_tasks(columns, weights, persona=persona)
+    suggestions: list[NextActionSuggestion] = []
+    for index in scores.ranked(columns)[:limit]:
+        suggestions.append(
+            NextActionSuggestion(
+                task_id=columns.ids[index],
+                title=columns.titles[index],
+                status=columns.status[index],
+                persona_required=columns.persona_required[index] or None,
+                priority_score=float(columns.priority_score[index]),
+                reason=_reason(columns, scores, index, persona),
+                final_score=round(float(scores.final_score[index]), 2),
+                wsjf=round(float(scores.wsjf[index]), 2),
+            )
+        )
+    return suggestions
@@ -0,0 +1,163 @@
+"""Benchmark the array-based next-action scorer against a per-task loop.
+
+Both start from the same row tuples; the array timing includes building the
+columns from them.
+
+Usage: python -m app.scripts.benchmark_scoring [TASKS] [REPEATS]
+
+Runs entirely in memory on synthetic open tasks, so no database is needed.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from app.scoring_services import (
+    RISK_REDUCTION,
+    SEVERITY_VALUE,
+    ScoringWeights,
+    TaskColumns,
+    score_tasks,
+)
+
+
+def synthetic_rows(count: int, seed: int = 7) -> list[tuple]:
+    """Rows shaped like the load_task_columns select list."""
+    rnd = random.Random(seed)
+    milestone_sizes = [rnd.randint(1, 800) for _ in range(max(count // 400, 1))]
+    phase_sizes = [0, 0, 1, 2, 5, 20]
+    rows = []
+    for i in range(count):
+        status = rnd.choice(["not_started", "in_progress", "blocked", "in_review", "on_hold"])
+        risk = rnd.choice(list(RISK_REDUCTION))
+        rows.append(
+            (
+                uuid.uuid4(),
+                f"Task {i}",
+                status,
+                rnd.choice(["", "", "lead_engineer", "designer", "product_manager"]),
+                rnd.choice(["", "", "", "lead_engineer"]),
+                status in ("not_started", "in_progress"),
+                status == "in_progress",
+                rnd.random() < 0.3,
+                rnd.random() < 0.5,
+                float(rnd.randint(0, 100)),
+                float(rnd.choice([0, 1, 2, 4, 8, 16])),
+                SEVERITY_VALUE[rnd.choice(list(SEVERITY_VALUE))],
+                RISK_REDUCTION[risk],
+                risk == "high",
+                rnd.choice([float("nan"), -5.0, 3.0, 10.0, 21.0, 45.0]),
+                1_735_689_600.0 + 60 * i,
+                float(rnd.choice([0, 0, 0, 1, 3])),
+                float(rnd.choice([0, 0, 0, 1, 2])),
+                float(rnd.choice([0, 0, 0, 0, 1])),
+                float(rnd.choice(milestone_sizes)),
+                float(rnd.choice(phase_sizes)),
+            )
+        )
+    return rows
+
+
+def score_per_task(rows: list[tuple], weights: ScoringWeights, persona: str | None) -> list[float]:
+    """Straightforward one-task-at-a-time version of score_tasks, used as the baseline."""
+    scored = []
+    for row in rows:
+        (_, _, _, required, assignee, candidate, in_progress, owner, criteria, _, estimate, severity, risk,
+         high_risk, due_in_days, _, children, bugs, severe, milestone_open, phase_open) = row
+        if not candidate:
+            continue
+        if persona and (required not in ("", persona) or assignee not in ("", persona)):
+            continue
+        if math.isnan(due_in_days):
+            criticality = 1.0
+        elif due_in_days < 0:
+            criticality = 10.0
+        elif due_in_days <= 7:
+            criticality = 8.0
+        elif due_in_days <= 14:
+            criticality = 6.0
+        elif due_in_days <= 30:
+            criticality = 4.0
+        else:
+            criticality = 2.0
+        value = (
+            weights.business_value * severity
+            + weights.time_criticality * criticality
+            + weights.risk_reduction * risk
+            + weights.blocking * min(bugs, 5)
+            + weights.security * min(2.5 * severe, 5)
+        )
+        wsjf = value / max(estimate, 0.5)
+        readiness = 25.0 * (bool(criteria) + bool(owner or assignee) + (children == 0) + bool(in_progress))
+        if len(rows) == 1:
+            closes = 30.0
+        elif milestone_open == 1:
+            closes = 20.0
+        elif phase_open == 1:
+            closes = 10.0
+        else:
+            closes = 0.0
+        match = bool(persona) and persona in (required, assignee)
+        scored.append((wsjf, readiness, closes, match, high_risk))
+
+    wsjfs = [item[0] for item in scored]
+    low, high = (min(wsjfs), max(wsjfs)) if wsjfs else (0.0, 0.0)
+    results = []
+    for wsjf, readiness, closes, match, high_risk in scored:
+        impact = (100.0 * (wsjf - low) / (high - low) if high > low else 100.0) + closes
+        results.append(
+            weights.readiness * readiness
+            + weights.impact * impact
+            + weights.persona_fit * match
+            - weights.high_risk_penalty * high_risk
+        )
+    return results
+
+
+def best_of(repeats: int, func) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv: list[str]) -> None:
+    count = int(argv[0]) if argv else 50_000
+    repeats = int(argv[1]) if len(argv) > 1 else 5
+    rows = synthetic_rows(count)
+    weights = ScoringWeights()
+
+    for persona in (None, "lead_engineer"):
+        columns = TaskColumns.from_rows(rows)
+        scores = score_tasks(columns, weights, persona=persona)
+        expected = score_per_task(rows, weights, persona)
+        if not np.allclose(scores.final_score[scores.candidates], expected):
+            raise SystemExit("array scorer disagrees with per-task baseline")
+
+        # both sides start from the same row tuples, so the array side pays for its column build
+        vectorized = best_of(repeats, lambda: score_tasks(TaskColumns.from_rows(rows), weights, persona=persona))
+        convert = best_of(repeats, lambda: TaskColumns.from_rows(rows))
+        baseline = best_of(repeats, lambda: score_per_task(rows, weights, persona))
+        print(
+            f"{count} open tasks, persona={persona or '-'}: "
+            f"array scoring {vectorized * 1000:.1f} ms (of which column build {convert * 1000:.1f} ms), "
+            f"per-task loop {baseline * 1000:.1f} ms, "
+            f"{len(expected)} candidates"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,114 @@
+"""Benchmark the list_tasks read path against per-row Pydantic validation.
+
+Usage: python -m app.scripts.benchmark_serialization PROJECT_ID [PAGE_SIZE] [REPEATS]
+
+Needs a database with a populated project. The baseline is the previous
+list_tasks body (ORM rows, ``_as_task_read`` per task) followed by what
+FastAPI does with a ``response_model`` return value: re-validate, dump in
+JSON mode and ``json.dumps``. The fast path is the current list_tasks
+endpoint. Both produce the response body bytes; the bodies are checked for
+equality before timing.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+from uuid import UUID
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.db import SessionLocal
+from app.models import Task
+from app.routes.tasks import _as_task_read, list_tasks
+from app.schemas import TaskRead
+
+TASK_LIST = TypeAdapter(list[TaskRead])
+
+
+def per_row_body(session, project_id: UUID, page_size: int) -> tuple[bytes, float]:
+    start = time.perf_counter()
+    tasks = (
+        session.query(Task)
+        .filter(Task.project_id == project_id)
+        .order_by(Task.created_at.asc(), Task.id.asc())
+        .limit(page_size)
+        .all()
+    )
+    reads = [_as_task_read(task) for task in tasks]
+    loaded = time.perf_counter() - start
+    content = TASK_LIST.dump_python(TASK_LIST.validate_python(reads), mode="json")
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+    return body, loaded
+
+
+def fast_body(session, project_id: UUID, page_size: int) -> bytes:
+    request = Request({"type": "http", "method": "GET", "path": "/v1/tasks", "query_string": b"", "headers": []})
+    response = list_tasks(
+        request,
+        Response(),
+        external_id=None,
+        project_id=project_id,
+        project_slug=None,
+        milestone_id=None,
+        created_after=None,
+        cursor=None,
+        limit=page_size,
+        offset=0,
+        db=session,
+    )
+    return response.body
+
+
+def best_of(repeats: int, func) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv: list[str]) -> None:
+    if not argv:
+        raise SystemExit(__doc__)
+    project_id = UUID(argv[0])
+    page_size = int(argv[1]) if len(argv) > 1 else 1000
+    repeats = int(argv[2]) if len(argv) > 2 else 5
+
+    session = SessionLocal()
+    try:
+        baseline, _ = per_row_body(session, project_id, page_size)
+        session.expunge_all()
+        if json.loads(fast_body(session, project_id, page_size)) != json.loads(baseline):
+            raise SystemExit("fast path body differs from the per-row baseline")
+        rows = len(json.loads(baseline))
+
+        per_row, load_only = float("inf"), float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _, loaded = per_row_body(session, project_id, page_size)
+            per_row = min(per_row, time.perf_counter() - start)
+            load_only = min(load_only, loaded)
+            # drop the identity map so every repeat loads fresh objects, as a new request would
+            session.expunge_all()
+        fast = best_of(repeats, lambda: fast_body(session, project_id, page_size))
+        print(
+            f"{rows} tasks/page: per-row path {per_row * 1000:.1f} ms "
+            f"(ORM load + _as_task_read {load_only * 1000:.1f} ms, "
+            f"re-validate + encode {(per_row - load_only) * 1000:.1f} ms), "
+            f"projected + orjson {fast * 1000:.1f} ms, {per_row / fast:.1f}x"
+        )
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
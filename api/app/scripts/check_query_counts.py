@@ -0,0 +1,178 @@
+"""Check that API endpoints issue a fixed number of SQL statements.
+
+Usage: python -m app.scripts.check_query_counts
+
+Creates a throwaway project (milestones, tasks with subtasks and attachments,
+bugs and events) in the configured database, then calls each endpoint in
+BUDGETS through the ASGI app at a small and a large page/batch size. It
+fails if any call issues a different number of statements than its budget.
+A lazy load inside a per-row loop shows up as a count that grows with the
+page size. The project is deleted afterwards. Needs httpx for TestClient,
+which is a dev dependency.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+from uuid import UUID, uuid4
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import sqlalchemy as sa
+from fastapi.testclient import TestClient
+
+from app import resolution_cache
+from app.db import SessionLocal, engine
+from app.main import app
+from app.models import Attachment, Bug, EventLog, Milestone, Project, Task
+from app.rollup_services import rebuild_rollups
+
+SIZES = (5, 50)
+TASKS = 120
+
+
+@dataclass
+class Fixture:
+    project_id: UUID
+    project_slug: str
+    milestone_id: UUID
+    task_ids: list[UUID]
+
+
+@dataclass
+class Budget:
+    name: str
+    method: str
+    # (fixture, size) -> path
+    path: Callable[[Fixture, int], str]
+    statements: int
+    body: Optional[Callable[[Fixture, int], Any]] = None
+
+
+BUDGETS = [
+    Budget("list tasks", "GET", lambda f, n: f"/v1/tasks?project_id={f.project_id}&limit={n}", 2),
+    Budget("list tasks by slug", "GET", lambda f, n: f"/v1/tasks?project_slug={f.project_slug}&limit={n}", 3),
+    Budget("list events", "GET", lambda f, n: f"/v1/events?project_id={f.project_id}&limit={n}", 1),
+    Budget("list bugs", "GET", lambda f, n: f"/v1/bugs?project_id={f.project_id}&limit={n}", 1),
+    Budget("list milestones", "GET", lambda f, n: f"/v1/milestones?project_id={f.project_id}", 1),
+    Budget("get task", "GET", lambda f, n: f"/v1/tasks/{f.task_ids[n]}", 2),
+    Budget("project status", "GET", lambda f, n: f"/v1/projects/{f.project_id}/status", 4),
+    # includes the statement lifting the pool's timeouts for the export's transaction
+    Budget("export tasks", "GET", lambda f, n: f"/v1/projects/{f.project_id}/export/tasks", 3),
+    Budget(
+        "patch task status",
+        "PATCH",
+        lambda f, n: f"/v1/tasks/{f.task_ids[n]}/status",
+        6,
+        body=lambda f, n: {"status": "in_progress"},
+    ),
+    Budget(
+        "batch status",
+        "POST",
+        lambda f, n: "/v1/tasks/status:batch",
+        6,
+        body=lambda f, n: [{"id": str(task_id), "status": "blocked"} for task_id in f.task_ids[:n]],
+    ),
+    Budget(
+        "batch upsert",
+        "POST",
+        lambda f, n: "/v1/tasks:batchUpsert",
+        5,
+        body=lambda f, n: [
+            {"milestone_id": str(f.milestone_id), "external_id": f"qc-{i}", "title": f"Query count {i}"}
+            for i in range(n)
+        ],
+    ),
+    Budget(
+        "batch events",
+        "POST",
+        lambda f, n: "/v1/events:batch",
+        3,
+        body=lambda f, n: [
+            {"project_id": str(f.project_id), "task_id": str(task_id), "summary": "Query count"}
+            for task_id in f.task_ids[:n]
+        ],
+    ),
+    # task n + 2 has one subtask (see create_fixture)
+    Budget("delete task", "DELETE", lambda f, n: f"/v1/tasks/{f.task_ids[n + 2]}", 6),
+]
+
+
+def create_fixture() -> Fixture:
+    session = SessionLocal()
+    try:
+        project = Project(name="Query count check", slug=f"query-count-{uuid4().hex[:12]}")
+        session.add(project)
+        session.flush()
+        milestones = [Milestone(project_id=project.id, name=f"M{i}", slug=f"m{i}") for i in range(3)]
+        session.add_all(milestones)
+        session.flush()
+        tasks: list[Task] = []
+        for i in range(TASKS):
+            task = Task(
+                project_id=project.id,
+                milestone_id=milestones[i % 3].id,
+                title=f"Task {i}",
+                effort_estimate=i % 5,
+                # every third task is a subtask of the one before it
+                parent_task_id=tasks[-1].id if i % 3 == 2 else None,
+            )
+            session.add(task)
+            session.flush()
+            tasks.append(task)
+            session.add(Attachment(task_id=task.id, name=f"{i}.txt", path=f"/dev/null/{i}.txt"))
+            session.add(Bug(project_id=project.id, task_id=task.id, title=f"Bug {i}"))
+            session.add(EventLog(project_id=project.id, task_id=task.id, summary=f"Event {i}"))
+        rebuild_rollups(session, [project.id])
+        session.commit()
+        return Fixture(project.id, project.slug, milestones[0].id, [task.id for task in tasks])
+    finally:
+        session.close()
+
+
+def drop_fixture(fixture: Fixture) -> None:
+    with engine.begin() as connection:
+        connection.execute(sa.delete(Project).where(Project.id == fixture.project_id))
+
+
+def main(argv: list[str]) -> None:
+    counter = {"statements": 0}
+
+    def count(*_args: Any) -> None:
+        counter["statements"] += 1
+
+    fixture = create_fixture()
+    client = TestClient(app)
+    failures = 0
+    sa.event.listen(engine, "before_cursor_execute", count)
+    try:
+        for budget in BUDGETS:
+            counts = []
+            for size in SIZES:
+                # identifier caches would otherwise make the first call of each kind differ
+                for cache in resolution_cache.CACHES:
+                    cache.clear()
+                counter["statements"] = 0
+                body = budget.body(fixture, size) if budget.body else None
+                response = client.request(budget.method, budget.path(fixture, size), json=body)
+                if response.status_code >= 400:
+                    raise SystemExit(f"{budget.name}: HTTP {response.status_code} {response.text}")
+                counts.append(counter["statements"])
+            ok = all(observed == budget.statements for observed in counts)
+            failures += not ok
+            observed = ", ".join(f"{n}: {c}" for n, c in zip(SIZES, counts))
+            print(f"{'ok  ' if ok else 'FAIL'} {budget.name:<20} budget {budget.statements:>2}  observed ({observed})")
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", count)
+        drop_fixture(fixture)
+    if failures:
+        raise SystemExit(f"{failures} endpoint(s) over or under their statement budget")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session
 
 from app.db import SessionLocal
 from app.models import Bug, Milestone, Phase, Project, ProjectPersona, Persona, Task
+from app.project_services import unique_project_slug
+from app.rollup_services import rebuild_rollups
 
 PLAN = {
     "bugs": [
@@ -123,7 +125,12 @@ def _get_or_create_project(session: Session) -> Project:
         project.direction = payload["direction"]
         return project
 
-    project = Project(name=payload["name"], goal=payload["goal"], direction=payload["direction"])
+    project = Project(
+        name=payload["name"],
+        slug=unique_project_slug(session, payload["name"]),
+        goal=payload["goal"],
+        direction=payload["direction"],
+    )
     session.add(project)
     session.flush()
     return project
@@ -273,6 +280,8 @@ def import_execution_plan() -> None:
                         title=task_payload["title"],
                         status=task_payload.get("status", "not_started"),
                     )
+        session.flush()
+        rebuild_rollups(session, [project.id])
         session.commit()
         print("Execution plan imported successfully.")
     except Exception:
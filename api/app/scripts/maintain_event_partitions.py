@@ -0,0 +1,38 @@
+"""Create upcoming event_logs partitions and detach the ones past retention.
+
+Usage: python -m app.scripts.maintain_event_partitions [--drop]
+
+Creates partitions through EVENT_PARTITIONS_AHEAD months from now. With
+EVENT_RETENTION_MONTHS set, months that ended before the retention window are
+detached and left as plain tables for archiving, or dropped with --drop. The
+API runs the same maintenance (without dropping) at startup; schedule this
+script (e.g. daily) for long-running deployments.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.db import settings
+from app.event_partitions import maintain
+
+
+def main(argv: list[str]) -> None:
+    unknown = [arg for arg in argv if arg != "--drop"]
+    if unknown:
+        raise SystemExit(f"Unknown arguments: {' '.join(unknown)}\n{__doc__}")
+    drop = "--drop" in argv
+    created, expired = maintain(drop=drop)
+    print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+    if settings.event_retention_months > 0:
+        action = "Dropped" if drop else "Detached"
+        print(f"{action} {len(expired)} partition(s) older than {settings.event_retention_months} months: {', '.join(expired) or '-'}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,30 @@
+"""Recompute the materialized project/milestone roll-ups from the tasks table.
+
+Usage: python -m app.scripts.rebuild_rollups [PROJECT_ID ...]
+"""
+
+from __future__ import annotations
+
+import sys
+from uuid import UUID
+
+from app.db import SessionLocal
+from app.rollup_services import rebuild_rollups
+
+
+def main(argv: list[str]) -> None:
+    project_ids = [UUID(value) for value in argv] or None
+    session = SessionLocal()
+    try:
+        rebuilt = rebuild_rollups(session, project_ids)
+        session.commit()
+        print(f"Rebuilt roll-ups for {rebuilt} project(s).")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,53 @@
+"""Scan a repository and record it as a new context snapshot.
+
+Usage: python -m app.scripts.scan_context REPO_ID [--branch BRANCH] [--workflow WORKFLOW_ID]
+
+The repository is looked up under REPO_BASE_PATH. Files whose size and mtime
+match the latest snapshot's manifest keep their recorded sha1, so only new and
+changed files are read. CONTEXT_SCAN_WORKERS sets the hashing processes
+(default: one per CPU).
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.db import SessionLocal
+from app.services.context_repo import ContextRepoService
+
+
+def main(argv: list[str]) -> None:
+    options = {"--branch": None, "--workflow": None}
+    positional: list[str] = []
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = next(args, None)
+            if options[arg] is None:
+                raise SystemExit(f"{arg} needs a value\n{__doc__}")
+        elif arg.startswith("-"):
+            raise SystemExit(f"Unknown option: {arg}\n{__doc__}")
+        else:
+            positional.append(arg)
+    if len(positional) != 1:
+        raise SystemExit(__doc__)
+
+    with SessionLocal() as db:
+        snapshot = ContextRepoService.scan_repo(db, positional[0], options["--branch"], options["--workflow"])
+    print(
+        f"Snapshot {snapshot.id}: {snapshot.totals_files} files, {snapshot.totals_bytes} bytes, "
+        f"{snapshot.totals_lines} lines"
+    )
+    scan = json.loads(Path(snapshot.snapshot_path).read_text(encoding="utf-8"))["scan"]
+    print(f"Hashed {scan['hashed']} file(s), reused {scan['reused']} from the previous manifest")
+    print(f"Manifest {snapshot.files_ndjson_path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
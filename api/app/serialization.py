@@ -0,0 +1,61 @@
+"""Fast read path for list routes.
+
+The default path loads ORM objects, validates each one into a ``*Read`` model,
+lets FastAPI re-validate the list against ``response_model`` and finally runs
+``jsonable_encoder`` + ``json.dumps``. For large pages that costs more than the
+query. Here the query selects exactly the fields of the ``*Read`` schema (in
+schema order, with NUMERIC cast to float8 so values match the schema's
+``float``), the rows go straight to dicts, and ``ORJSONResponse`` encodes them
+in one call. Routes keep ``response_model`` for the OpenAPI document; returning
+a response object skips the runtime re-validation.
+
+See ``app.scripts.benchmark_serialization`` for the comparison.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Iterable, Optional
+
+import orjson
+import sqlalchemy as sa
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with orjson; output matches Pydantic's JSON mode (UTC as ``Z``)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def read_columns(schema: type[BaseModel], table: sa.Table, **overrides: Optional[ColumnElement]) -> list[ColumnElement]:
+    """Select list producing one labelled column per field of ``schema``.
+
+    Fields come from ``overrides`` first, then from same-named columns of
+    ``table``; anything else (e.g. nested relationships filled in separately)
+    is selected as NULL so every key is present, as in ``model_dump``.
+    """
+    columns = []
+    for name in schema.model_fields:
+        if name in overrides:
+            column = overrides[name] if overrides[name] is not None else sa.null()
+        elif name in table.c:
+            column = table.c[name]
+            if isinstance(column.type, sa.Numeric) and not isinstance(column.type, sa.Float):
+                column = sa.cast(column, sa.Float)
+        else:
+            column = sa.null()
+        columns.append(column.label(name))
+    return columns
+
+
+def rows_as_dicts(rows: Iterable[Any]) -> list[dict[str, Any]]:
+    return [row._asdict() for row in rows]
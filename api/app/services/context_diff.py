@@ -0,0 +1,106 @@
+"""Compare two context snapshots by their per-file manifests.
+
+Both ``files_ndjson`` manifests are read as streams and merged by path. The
+scanner (``app.services.context_scanner``) writes them sorted, so memory
+stays at the per-component totals plus the ``limit`` file changes returned,
+however large the repo. A manifest that is not sorted by path cannot be
+merged and is rejected rather than compared wrongly.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Iterator, Optional
+
+import orjson
+
+from app.services.context_scanner import component_of, read_manifest
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+
+class DiffRejected(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _in_path_order(entries: Iterator[dict[str, Any]], label: str) -> Iterator[dict[str, Any]]:
+    previous: Optional[str] = None
+    try:
+        for entry in entries:
+            path = entry.get("path") if isinstance(entry, dict) else None
+            if not isinstance(path, str):
+                raise DiffRejected(422, f"The {label} snapshot's manifest has an entry without a path")
+            if previous is not None and path <= previous:
+                raise DiffRejected(409, f"The {label} snapshot's manifest is not sorted by path; rescan it with /context/scan")
+            previous = path
+            yield entry
+    except orjson.JSONDecodeError as exc:
+        raise DiffRejected(422, f"The {label} snapshot's manifest is not valid NDJSON: {exc}") from exc
+
+
+def _open(path: Optional[str], label: str) -> Iterator[dict[str, Any]]:
+    if not path:
+        raise DiffRejected(409, f"The {label} snapshot has no files manifest")
+    if not os.path.isfile(path):
+        raise DiffRejected(404, f"The {label} snapshot's manifest is missing")
+    return _in_path_order(read_manifest(path), label)
+
+
+def _empty_counts() -> dict[str, int]:
+    return {ADDED: 0, REMOVED: 0, MODIFIED: 0, "bytes_delta": 0, "lines_delta": 0}
+
+
+def diff_manifests(from_path: Optional[str], to_path: Optional[str], limit: int) -> dict[str, Any]:
+    """Added, removed and modified files between two manifests, with byte/line deltas per component.
+
+    Files are compared by sha1; ``files`` lists the first ``limit`` changes in
+    path order and ``truncated`` says whether there were more.
+    """
+    earlier, later = _open(from_path, "from"), _open(to_path, "to")
+    totals = _empty_counts()
+    components: dict[str, dict[str, int]] = {}
+    files: list[dict[str, Any]] = []
+
+    def record(change: str, path: str, old: Optional[dict[str, Any]], new: Optional[dict[str, Any]]) -> None:
+        bytes_delta = (new or {}).get("bytes", 0) - (old or {}).get("bytes", 0)
+        lines_delta = (new or {}).get("lines", 0) - (old or {}).get("lines", 0)
+        for counts in (totals, components.setdefault(component_of(path), _empty_counts())):
+            counts[change] += 1
+            counts["bytes_delta"] += bytes_delta
+            counts["lines_delta"] += lines_delta
+        if len(files) < limit:
+            files.append(
+                {
+                    "path": path,
+                    "change": change,
+                    "bytes_delta": bytes_delta,
+                    "lines_delta": lines_delta,
+                    "sha1_from": old.get("sha1") if old else None,
+                    "sha1_to": new.get("sha1") if new else None,
+                }
+            )
+
+    old, new = next(earlier, None), next(later, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old["path"] < new["path"]):
+            record(REMOVED, old["path"], old, None)
+            old = next(earlier, None)
+        elif old is None or new["path"] < old["path"]:
+            record(ADDED, new["path"], None, new)
+            new = next(later, None)
+        else:
+            if old.get("sha1") != new.get("sha1"):
+                record(MODIFIED, new["path"], old, new)
+            old, new = next(earlier, None), next(later, None)
+
+    changed = totals[ADDED] + totals[REMOVED] + totals[MODIFIED]
+    return {
+        "totals": totals,
+        "components": [{"component": name, **components[name]} for name in sorted(components)],
+        "files": files,
+        "truncated": changed > len(files),
+    }
@@ -1,10 +1,21 @@
+import json
+import logging
 import os
 from pathlib import Path
-from typing import Optional, Any
+from typing import Iterable, Optional, Any
 from datetime import datetime
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from app.db import settings
 from app.models import ContextSnapshot, ContextIndex
 from app.schemas import ContextSnapshotCreate
+from app.services import context_scanner
+
+logger = logging.getLogger(__name__)
+
+# ContextIndex branch key for a repo's latest snapshot on any branch
+ALL_BRANCHES = ""
 
 class ContextRepoService:
     @staticmethod
@@ -12,22 +23,31 @@ class ContextRepoService:
         # This should resolve the repo root based on repo_id
         # For now, assume a base path from env or config
         base_path = os.environ.get("REPO_BASE_PATH", "/mnt/e/code")
-        repo_root = Path(base_path) / repo_id
-        return repo_root.resolve()
+        repo_root = (Path(base_path) / repo_id).resolve()
+        if not repo_root.is_relative_to(Path(base_path).resolve()):
+            raise ValueError(f"repo_id {repo_id!r} resolves outside REPO_BASE_PATH")
+        return repo_root
 
     @staticmethod
-    def write_artifacts(repo_root: Path, snapshot: dict, summary: str, files_ndjson: Optional[str] = None) -> dict:
+    def write_artifacts(
+        repo_root: Path, snapshot: dict, summary: str, files_ndjson: Optional[str | Iterable[str]] = None
+    ) -> dict:
+        # files_ndjson may be the whole text or an iterable of lines, written as they come
         context_dir = repo_root / ".ma" / "context"
         context_dir.mkdir(parents=True, exist_ok=True)
-        now = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        # microseconds, so a quick rescan cannot overwrite the manifest an older snapshot points at
+        now = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
         snapshot_path = context_dir / f"snapshot_{now}.json"
         summary_path = context_dir / f"summary_{now}.md"
         files_ndjson_path = context_dir / f"files_{now}.ndjson" if files_ndjson else None
         # Write files
         snapshot_path.write_text(json.dumps(snapshot), encoding="utf-8")
         summary_path.write_text(summary, encoding="utf-8")
-        if files_ndjson and files_ndjson_path:
+        if isinstance(files_ndjson, str) and files_ndjson_path:
             files_ndjson_path.write_text(files_ndjson, encoding="utf-8")
+        elif files_ndjson is not None and files_ndjson_path:
+            with files_ndjson_path.open("w", encoding="utf-8") as manifest:
+                manifest.writelines(files_ndjson)
         return {
             "snapshot_path": str(snapshot_path),
             "summary_path": str(summary_path),
@@ -36,24 +56,74 @@ class ContextRepoService:
 
     @staticmethod
     def record_snapshot(db: Session, data: ContextSnapshotCreate) -> int:
-        snapshot = ContextSnapshot(**data.dict())
+        snapshot = ContextSnapshot(**data.model_dump())
         db.add(snapshot)
-        db.commit()
-        db.refresh(snapshot)
-        # Optionally update ContextIndex
-        index = db.query(ContextIndex).filter_by(repo_id=snapshot.repo_id).first()
-        if not index:
-            index = ContextIndex(repo_id=snapshot.repo_id, latest_snapshot_id=snapshot.id, updated_at=datetime.utcnow())
-            db.add(index)
-        else:
-            index.latest_snapshot_id = snapshot.id
-            index.updated_at = datetime.utcnow()
+        db.flush()
+        # Point the repo-wide and the branch entry at the new snapshot in the same
+        # transaction. The WHERE keeps a slower concurrent upsert of an older
+        # snapshot from winning, and sorted keys make concurrent upserts lock
+        # the rows in the same order.
+        now = datetime.utcnow()
+        branches = sorted({ALL_BRANCHES, snapshot.branch or ALL_BRANCHES})
+        stmt = pg_insert(ContextIndex).values(
+            [
+                {"repo_id": snapshot.repo_id, "branch": branch, "latest_snapshot_id": snapshot.id, "updated_at": now}
+                for branch in branches
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ContextIndex.repo_id, ContextIndex.branch],
+            set_={"latest_snapshot_id": stmt.excluded.latest_snapshot_id, "updated_at": stmt.excluded.updated_at},
+            where=ContextIndex.latest_snapshot_id < stmt.excluded.latest_snapshot_id,
+        )
+        db.execute(stmt)
         db.commit()
         return snapshot.id
 
     @staticmethod
     def load_latest(db: Session, repo_id: str, branch: Optional[str] = None) -> Optional[ContextSnapshot]:
-        query = db.query(ContextSnapshot).filter_by(repo_id=repo_id)
-        if branch:
-            query = query.filter_by(branch=branch)
-        return query.order_by(ContextSnapshot.created_at.desc()).first()
+        # primary-key lookup in context_index joined to the snapshot's primary key
+        query = (
+            sa.select(ContextSnapshot)
+            .join(ContextIndex, ContextIndex.latest_snapshot_id == ContextSnapshot.id)
+            .where(ContextIndex.repo_id == repo_id, ContextIndex.branch == (branch or ALL_BRANCHES))
+        )
+        return db.execute(query).scalar_one_or_none()
+
+    @staticmethod
+    def scan_repo(
+        db: Session, repo_id: str, branch: Optional[str] = None, workflow_id: Optional[str] = None
+    ) -> ContextSnapshot:
+        """Scan the repo's working tree and record the result as its newest snapshot.
+
+        Files whose size and mtime match the latest snapshot's manifest (for
+        ``branch``, or for any branch) are not read again.
+        """
+        repo_root = ContextRepoService.resolve_repo_root(repo_id)
+        if not repo_root.is_dir():
+            raise FileNotFoundError(f"No repository at {repo_root}")
+        previous = ContextRepoService.load_latest(db, repo_id, branch)
+        if previous is None and branch:
+            previous = ContextRepoService.load_latest(db, repo_id)
+        previous_manifest = Path(previous.files_ndjson_path) if previous and previous.files_ndjson_path else None
+        # don't hold a pooled connection for the length of the scan
+        db.rollback()
+
+        result = context_scanner.scan(repo_root, previous_manifest, settings.context_scan_workers or os.cpu_count() or 1)
+        summary = context_scanner.render_summary(repo_id, result.snapshot)
+        paths = ContextRepoService.write_artifacts(repo_root, result.snapshot, summary, result.manifest_lines())
+        totals = result.snapshot["totals"]
+        data = ContextSnapshotCreate(
+            repo_id=repo_id,
+            branch=branch,
+            workflow_id=workflow_id,
+            **paths,
+            totals_files=totals["files"],
+            totals_bytes=totals["bytes"],
+            totals_lines=totals["lines"],
+            components_json=result.snapshot["components"],
+            hotspots_json=result.snapshot["hotspots"],
+        )
+        snapshot_id = ContextRepoService.record_snapshot(db, data)
+        logger.info("scanned %s: %d files, %d hashed, %d reused", repo_id, len(result.files), result.hashed, result.reused)
+        return db.get(ContextSnapshot, snapshot_id)
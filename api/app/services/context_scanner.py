@@ -0,0 +1,240 @@
+"""Incremental repository scanner for context snapshots.
+
+``scan`` walks a working tree and describes every file the way the
+machine-client's ``.ma/context/snapshot.json`` does: ``path`` (relative, with
+``/``), ``bytes``, ``mtime`` (milliseconds), ``lines`` and ``sha1``. Hashing is
+the expensive part, so a file whose (path, size, mtime) matches the previous
+scan's manifest keeps that entry's sha1 and line count, and only new or
+changed files are read. When there are enough of them they are hashed in a
+process pool.
+
+The manifest (``files_ndjson``) has one JSON object per file, sorted by path
+(code point order). The previous manifest is merged against the sorted walk
+rather than loaded into a dict, and ``GET /context/diff`` compares two
+manifests the same way.
+
+This module imports nothing from the app's database layer, which keeps the
+pool's worker processes cheap to start.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+import orjson
+
+IGNORED_DIRS = frozenset(
+    {".git", ".hg", ".svn", ".ma", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache", ".tox"}
+)
+# component of files at the top level of the repo
+ROOT_COMPONENT = "."
+HOTSPOTS = 20
+COMPONENT_HOTSPOTS = 10
+READ_CHUNK = 1024 * 1024
+# below this much to hash, starting worker processes costs more than it saves
+POOL_MIN_FILES = 64
+POOL_MIN_BYTES = 64 * 1024 * 1024
+POOL_CHUNK = 32
+
+
+class FileEntry(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    lines: int = 0
+    sha1: str = ""
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"path": self.path, "bytes": self.size, "mtime": self.mtime, "lines": self.lines, "sha1": self.sha1}
+
+
+@dataclass
+class ScanResult:
+    snapshot: dict[str, Any]
+    files: list[FileEntry]
+    hashed: int
+    reused: int
+
+    def manifest_lines(self) -> Iterator[str]:
+        for entry in self.files:
+            yield orjson.dumps(entry.as_dict()).decode() + "\n"
+
+
+def component_of(path: str) -> str:
+    head, sep, _rest = path.partition("/")
+    return head if sep else ROOT_COMPONENT
+
+
+def read_manifest(path: str | os.PathLike[str]) -> Iterator[dict[str, Any]]:
+    """Stream the entries of a ``files_ndjson`` manifest."""
+    with open(path, "rb") as manifest:
+        for line in manifest:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+def hash_file(path: str) -> Optional[tuple[str, int]]:
+    """(sha1, line count) of a file, or None if it vanished or cannot be read."""
+    digest = hashlib.sha1(usedforsecurity=False)
+    lines = 0
+    last = b""
+    try:
+        with open(path, "rb") as stream:
+            while chunk := stream.read(READ_CHUNK):
+                digest.update(chunk)
+                lines += chunk.count(b"\n")
+                last = chunk[-1:]
+    except OSError:
+        return None
+    if last and last != b"\n":
+        lines += 1
+    return digest.hexdigest(), lines
+
+
+def _walk(root: Path) -> Iterator[FileEntry]:
+    stack = [("", str(root))]
+    while stack:
+        prefix, directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRS:
+                            stack.append((f"{prefix}{entry.name}/", entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        stat_result = entry.stat(follow_symlinks=False)
+                        yield FileEntry(f"{prefix}{entry.name}", stat_result.st_size, stat_result.st_mtime_ns / 1_000_000)
+                except OSError:
+                    # removed while we were walking
+                    continue
+
+
+def _previous(manifest: Optional[Path]) -> Iterator[dict[str, Any]]:
+    if manifest is None:
+        return
+    try:
+        yield from read_manifest(manifest)
+    except (OSError, orjson.JSONDecodeError):
+        # a missing or damaged manifest only costs a full rehash
+        return
+
+
+def _reuse(files: list[FileEntry], previous: Iterable[dict[str, Any]]) -> tuple[list[FileEntry], list[int]]:
+    """Fill in sha1/lines from ``previous`` where (path, size, mtime) match; returns the indexes left to hash."""
+    pending: list[int] = []
+    earlier = iter(previous)
+    candidate = next(earlier, None)
+    for index, entry in enumerate(files):
+        while candidate is not None and candidate.get("path", "") < entry.path:
+            candidate = next(earlier, None)
+        if (
+            candidate is not None
+            and candidate.get("path") == entry.path
+            and candidate.get("bytes") == entry.size
+            and candidate.get("mtime") == entry.mtime
+            and candidate.get("sha1")
+        ):
+            files[index] = entry._replace(lines=candidate.get("lines", 0), sha1=candidate["sha1"])
+        else:
+            pending.append(index)
+    return files, pending
+
+
+def _hash_all(paths: list[str], size: int, workers: int) -> Iterator[Optional[tuple[str, int]]]:
+    if workers <= 1 or len(paths) < POOL_MIN_FILES or size < POOL_MIN_BYTES:
+        yield from map(hash_file, paths)
+        return
+    # spawn, not fork: the API process has threads (server pool, Redis sender) a fork would copy mid-flight
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(paths) // POOL_CHUNK + 1), mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        yield from pool.map(hash_file, paths, chunksize=POOL_CHUNK)
+
+
+def _totals(files: Iterable[FileEntry]) -> dict[str, int]:
+    totals = {"files": 0, "bytes": 0, "lines": 0}
+    for entry in files:
+        totals["files"] += 1
+        totals["bytes"] += entry.size
+        totals["lines"] += entry.lines
+    return totals
+
+
+def _hotspots(files: list[FileEntry], count: int) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    largest = heapq.nlargest(count, files, key=lambda entry: entry.size)
+    longest = heapq.nlargest(count, files, key=lambda entry: entry.lines)
+    return [entry.as_dict() for entry in largest], [entry.as_dict() for entry in longest]
+
+
+def build_snapshot(root: Path, files: list[FileEntry]) -> dict[str, Any]:
+    """The ``snapshot.json`` document: totals, per-component roll-up and hotspots."""
+    by_component: dict[str, list[FileEntry]] = {}
+    for entry in files:
+        by_component.setdefault(component_of(entry.path), []).append(entry)
+    components = []
+    for name in sorted(by_component):
+        largest, longest = _hotspots(by_component[name], COMPONENT_HOTSPOTS)
+        components.append(
+            {"component": name, "totals": _totals(by_component[name]), "largest": largest, "longest": longest}
+        )
+    largest, longest = _hotspots(files, HOTSPOTS)
+    return {
+        "repo": str(root),
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "totals": _totals(files),
+        "components": components,
+        "hotspots": {"largest_files": largest, "longest_files": longest},
+    }
+
+
+def scan(root: Path, previous_manifest: Optional[Path] = None, workers: int = 1) -> ScanResult:
+    """Describe every file under ``root``, rehashing only what changed since ``previous_manifest``."""
+    files = sorted(_walk(root), key=lambda entry: entry.path)
+    files, pending = _reuse(files, _previous(previous_manifest))
+    vanished: set[int] = set()
+    digests = _hash_all(
+        [str(root / files[index].path) for index in pending], sum(files[index].size for index in pending), workers
+    )
+    for index, digest in zip(pending, digests):
+        if digest is None:
+            vanished.add(index)
+        else:
+            files[index] = files[index]._replace(sha1=digest[0], lines=digest[1])
+    if vanished:
+        files = [entry for index, entry in enumerate(files) if index not in vanished]
+    snapshot = build_snapshot(root, files)
+    hashed = len(pending) - len(vanished)
+    snapshot["scan"] = {"hashed": hashed, "reused": len(files) - hashed}
+    return ScanResult(snapshot, files, hashed, len(files) - hashed)
+
+
+def render_summary(repo_id: str, snapshot: dict[str, Any]) -> str:
+    totals = snapshot["totals"]
+    lines = [
+        f"# {repo_id}",
+        "",
+        f"Scanned `{snapshot['repo']}` at {snapshot['generated_at']}: "
+        f"{totals['files']} files, {totals['bytes']} bytes, {totals['lines']} lines.",
+        "",
+        "| Component | Files | Bytes | Lines |",
+        "| --- | ---: | ---: | ---: |",
+    ]
+    for component in snapshot["components"]:
+        part = component["totals"]
+        lines.append(f"| `{component['component']}` | {part['files']} | {part['bytes']} | {part['lines']} |")
+    lines += ["", "## Largest files", ""]
+    lines += [f"- `{entry['path']}` ({entry['bytes']} bytes)" for entry in snapshot["hotspots"]["largest_files"]]
+    lines += ["", "## Longest files", ""]
+    lines += [f"- `{entry['path']}` ({entry['lines']} lines)" for entry in snapshot["hotspots"]["longest_files"]]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID, uuid4
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from . import resolution_cache, work_bus
+from .change_feed import record_change
+from .models import Milestone, Project, Task
+from .offload import offload
+from .project_services import slugify
+from .rollup_services import TaskContribution, apply_rollup_deltas, task_contribution
+from .schemas import BatchUpsertResult, TaskUpsertPayload
+
+# Keeps each INSERT well below the 65535 bind parameter limit.
+UPSERT_CHUNK_SIZE = 1000
+# Fields a payload may leave unset; on update only the provided ones are written (as in tasks:upsert).
+OPTIONAL_FIELDS = ("description", "assignee_persona", "effort_estimate", "priority_score", "slug", "parent_task_id")
+
+_tasks = Task.__table__
+_RETURNING = (
+    _tasks.c.id,
+    _tasks.c.external_id,
+    _tasks.c.slug,
+    _tasks.c.project_id,
+    _tasks.c.milestone_id,
+    _tasks.c.effort_estimate,
+    _tasks.c.effort_spent,
+    _tasks.c.risk_level,
+    _tasks.c.status,
+    _tasks.c.lock_version,
+    _tasks.c.assignee_persona,
+    _tasks.c.persona_required,
+    # xmax is 0 only for rows this statement inserted
+    sa.literal_column("xmax = 0").label("inserted"),
+)
+
+
+@dataclass
+class _Write:
+    index: int
+    values: dict[str, Any]
+    provided: frozenset[str]
+    # Existing row this write is expected to update, if any
+    existing: Optional[Any] = None
+
+
+@dataclass
+class _Plan:
+    # keyed by (external_id, project_id): INSERT ... ON CONFLICT (external_id, project_id)
+    by_external_id: dict[tuple[str, UUID], _Write] = field(default_factory=dict)
+    # keyed by (milestone_id, slug) or the new id: INSERT ... ON CONFLICT (milestone_id, slug) WHERE slug IS NOT NULL
+    by_slug: dict[tuple[Any, ...], _Write] = field(default_factory=dict)
+
+
+def _error(payload: TaskUpsertPayload, status: int, error: str) -> BatchUpsertResult:
+    return BatchUpsertResult(ok=False, external_id=payload.external_id, slug=payload.slug, status=status, error=error)
+
+
+def _resolve_projects(session: Session, payloads: list[TaskUpsertPayload]) -> dict[str, UUID]:
+    slugs = {p.project_slug for p in payloads if p.project_slug and not p.project_id}
+    if not slugs:
+        return {}
+    candidates = {slug: {slug.lower(), slugify(slug)} for slug in slugs}
+    rows = session.execute(
+        sa.select(Project.slug, Project.id).where(Project.slug.in_(set().union(*candidates.values())))
+    ).all()
+    by_slug = dict(rows)
+    resolved = {}
+    for slug, options in candidates.items():
+        project_id = next((by_slug[option] for option in sorted(options) if option in by_slug), None)
+        if project_id is not None:
+            resolved[slug] = project_id
+    return resolved
+
+
+def _resolve_milestones(
+    session: Session, payloads: list[TaskUpsertPayload], project_ids: dict[int, UUID]
+) -> tuple[dict[UUID, UUID], dict[tuple[UUID, str], UUID]]:
+    """Return {milestone_id: project_id} and {(project_id, requested slug): milestone_id}."""
+    ids = {p.milestone_id for p in payloads if p.milestone_id}
+    by_id: dict[UUID, UUID] = {}
+    if ids:
+        by_id = dict(session.execute(sa.select(Milestone.id, Milestone.project_id).where(Milestone.id.in_(ids))).all())
+
+    wanted = {
+        (project_ids[index], p.milestone_slug)
+        for index, p in enumerate(payloads)
+        if not p.milestone_id and p.milestone_slug and index in project_ids
+    }
+    by_slug: dict[tuple[UUID, str], UUID] = {}
+    if wanted:
+        rows = session.execute(
+            sa.select(Milestone.id, Milestone.project_id, Milestone.slug)
+            .where(
+                sa.tuple_(Milestone.project_id, sa.func.lower(Milestone.slug)).in_(
+                    {(project_id, slug.lower()) for project_id, slug in wanted}
+                )
+            )
+            .order_by(Milestone.created_at.asc())
+        ).all()
+        # same precedence as routes.tasks._resolve_milestone_by_slug: exact case first, then oldest
+        for project_id, slug in wanted:
+            matches = [row for row in rows if row.project_id == project_id and row.slug.lower() == slug.lower()]
+            exact = [row for row in matches if row.slug == slug]
+            if matches:
+                by_slug[(project_id, slug)] = (exact or matches)[0].id
+    return by_id, by_slug
+
+
+def _load_existing(session: Session, plan_keys: set[tuple[str, UUID]], slug_keys: set[tuple[UUID, str]]) -> list[Any]:
+    conditions = []
+    if plan_keys:
+        conditions.append(sa.tuple_(_tasks.c.external_id, _tasks.c.project_id).in_(plan_keys))
+    if slug_keys:
+        conditions.append(sa.tuple_(_tasks.c.milestone_id, _tasks.c.slug).in_(slug_keys))
+    if not conditions:
+        return []
+    # Lock the rows so the roll-up "before" snapshots stay accurate until commit
+    return session.execute(
+        sa.select(*_RETURNING[:-1]).where(sa.or_(*conditions)).order_by(_tasks.c.id).with_for_update()
+    ).all()
+
+
+def _execute(session: Session, writes: list[_Write], conflict_columns: list[str], slug_target: bool) -> list[Any]:
+    """Run one INSERT ... ON CONFLICT DO UPDATE per provided-field shape.
+
+    The rows go as executemany parameters, which SQLAlchemy sends as multi-row
+    VALUES pages of ``UPSERT_CHUNK_SIZE`` from one cached compiled statement;
+    compiling a statement with the rows inlined took longer than running it.
+    """
+    shapes: dict[frozenset[str], list[_Write]] = {}
+    for write in writes:
+        shapes.setdefault(write.provided, []).append(write)
+
+    returned: list[Any] = []
+    for provided, group in shapes.items():
+        stmt = pg_insert(_tasks)
+        updates = {
+            "title": stmt.excluded.title,
+            "lock_version": _tasks.c.lock_version + 1,
+            "updated_at": stmt.excluded.updated_at,
+        }
+        for name in sorted(provided):
+            if slug_target and name == "slug":
+                continue
+            updates[name] = stmt.excluded[name]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            index_where=_tasks.c.slug.isnot(None) if slug_target else None,
+            set_=updates,
+        ).returning(*_RETURNING)
+        returned.extend(
+            session.execute(
+                stmt,
+                [write.values for write in group],
+                execution_options={"insertmanyvalues_page_size": UPSERT_CHUNK_SIZE},
+            ).all()
+        )
+    return returned
+
+
+def _resolve_payloads(
+    payloads: list[TaskUpsertPayload],
+    results: list[Any],
+    project_ids: dict[int, UUID],
+    milestones_by_id: dict[UUID, UUID],
+    milestones_by_slug: dict[tuple[UUID, str], UUID],
+    known_parents: set[UUID],
+) -> dict[int, tuple[UUID, UUID, Optional[str]]]:
+    """Validate and resolve each payload to (project, milestone, initial status); failures go to ``results``."""
+    resolved: dict[int, tuple[UUID, UUID, Optional[str]]] = {}
+    for index, payload in enumerate(payloads):
+        if payload.milestone_id:
+            project_id = milestones_by_id.get(payload.milestone_id)
+            if project_id is None:
+                results[index] = _error(payload, 422, "Unknown milestone_id")
+                continue
+            milestone_id = payload.milestone_id
+        elif payload.milestone_slug and (payload.project_id or payload.project_slug):
+            if index not in project_ids:
+                results[index] = _error(payload, 404, "Project not found by slug")
+                continue
+            project_id = project_ids[index]
+            milestone_id = milestones_by_slug.get((project_id, payload.milestone_slug))
+            if milestone_id is None:
+                results[index] = _error(payload, 422, "Unknown milestone_slug")
+                continue
+        else:
+            results[index] = _error(payload, 422, "Must provide milestone_id or (project_id and milestone_slug)")
+            continue
+        if payload.parent_task_id and payload.parent_task_id not in known_parents:
+            results[index] = _error(payload, 400, "Parent task not found")
+            continue
+        initial_status = (payload.options or {}).get("initial_status") if isinstance(payload.options, dict) else None
+        if initial_status is not None and initial_status not in _tasks.c.status.type.enums:
+            results[index] = _error(payload, 422, f"invalid initial_status {initial_status!r}")
+            continue
+        resolved[index] = (project_id, milestone_id, initial_status)
+    return resolved
+
+
+def _plan_writes(
+    payloads: list[TaskUpsertPayload],
+    results: list[Any],
+    resolved: dict[int, tuple[UUID, UUID, Optional[str]]],
+    existing_rows: list[Any],
+) -> _Plan:
+    """One write per resolved payload, keyed by the natural key it upserts on; failures go to ``results``."""
+    existing_by_external = {(row.external_id, row.project_id): row for row in existing_rows if row.external_id}
+    existing_by_slug = {(row.milestone_id, row.slug): row for row in existing_rows if row.slug}
+
+    now = datetime.utcnow()
+    plan = _Plan()
+    claimed_slugs: set[tuple[UUID, str]] = set()
+    claimed_rows: set[UUID] = set()
+    for index, (project_id, milestone_id, initial_status) in resolved.items():
+        payload = payloads[index]
+        existing = existing_by_external.get((payload.external_id, project_id)) if payload.external_id else None
+        if existing is not None and existing.milestone_id != milestone_id:
+            results[index] = _error(payload, 409, "Conflicting external_id assignment")
+            continue
+        if existing is None and payload.slug:
+            existing = existing_by_slug.get((milestone_id, payload.slug))
+
+        slug_key = (milestone_id, payload.slug) if payload.slug else None
+        # a new row's slug, or a slug update, must not collide with another write in this batch
+        if slug_key and (existing is None or existing.slug != payload.slug):
+            if slug_key in claimed_slugs:
+                results[index] = _error(payload, 422, "Duplicate (milestone, slug) in batch")
+                continue
+        provided = frozenset(name for name in OPTIONAL_FIELDS if getattr(payload, name) is not None)
+        write = _Write(
+            index=index,
+            provided=provided,
+            existing=existing,
+            values={
+                "id": uuid4(),
+                "project_id": project_id,
+                "milestone_id": milestone_id,
+                "title": payload.title,
+                "description": payload.description,
+                "assignee_persona": payload.assignee_persona,
+                "effort_estimate": payload.effort_estimate or 0,
+                "priority_score": payload.priority_score or 0,
+                "external_id": payload.external_id,
+                "slug": payload.slug,
+                "parent_task_id": payload.parent_task_id,
+                "status": initial_status or "not_started",
+                "lock_version": 0,
+                "created_at": now,
+                "updated_at": now,
+            },
+        )
+        if payload.external_id and (existing is None or existing.external_id == payload.external_id):
+            key: tuple[Any, ...] = (payload.external_id, project_id)
+            target = plan.by_external_id
+        else:
+            # matched by slug (or no natural key at all), as tasks:upsert does
+            key = slug_key or (write.values["id"],)
+            target = plan.by_slug
+        if key in target or (existing is not None and existing.id in claimed_rows):
+            results[index] = _error(payload, 422, "Duplicate task in batch")
+            continue
+        target[key] = write
+        if existing is not None:
+            claimed_rows.add(existing.id)
+        if slug_key:
+            claimed_slugs.add(slug_key)
+    return plan
+
+
+def batch_upsert_tasks(session: Session, payloads: list[TaskUpsertPayload]) -> list[BatchUpsertResult]:
+    """Create or update many tasks in the caller's transaction with one result per payload.
+
+    Mirrors ``POST /v1/tasks:upsert``: tasks are matched by (external_id,
+    project) first and by (milestone, slug) second; unset optional fields are
+    left alone on update, and a task whose external_id already lives in another
+    milestone is a 409. Lookups are batched and writes are
+    INSERT ... ON CONFLICT DO UPDATE statements over the natural-key indexes.
+    """
+    results: list[Any] = [None] * len(payloads)
+    project_slugs = _resolve_projects(session, payloads)
+
+    project_ids: dict[int, UUID] = {}
+    for index, payload in enumerate(payloads):
+        if payload.project_id:
+            project_ids[index] = payload.project_id
+        elif payload.project_slug and payload.project_slug in project_slugs:
+            project_ids[index] = project_slugs[payload.project_slug]
+    milestones_by_id, milestones_by_slug = _resolve_milestones(session, payloads, project_ids)
+
+    parent_ids = {p.parent_task_id for p in payloads if p.parent_task_id}
+    known_parents = set()
+    if parent_ids:
+        known_parents = set(session.execute(sa.select(_tasks.c.id).where(_tasks.c.id.in_(parent_ids))).scalars())
+
+    resolved = offload(
+        _resolve_payloads, payloads, results, project_ids, milestones_by_id, milestones_by_slug, known_parents
+    )
+    existing_rows = _load_existing(
+        session,
+        {(payloads[i].external_id, project_id) for i, (project_id, _, _) in resolved.items() if payloads[i].external_id},
+        {(milestone_id, payloads[i].slug) for i, (_, milestone_id, _) in resolved.items() if payloads[i].slug},
+    )
+    plan = offload(_plan_writes, payloads, results, resolved, existing_rows)
+
+    writes_by_key: dict[Any, _Write] = {}
+    returned = _execute(session, list(plan.by_external_id.values()), ["external_id", "project_id"], slug_target=False)
+    for key, write in plan.by_external_id.items():
+        writes_by_key[("external", key)] = write
+    for key, write in plan.by_slug.items():
+        writes_by_key[("slug", key)] = write
+    returned_by_key = {("external", (row.external_id, row.project_id)): row for row in returned}
+    for row in _execute(session, list(plan.by_slug.values()), ["milestone_id", "slug"], slug_target=True):
+        key = (row.milestone_id, row.slug) if row.slug and ("slug", (row.milestone_id, row.slug)) in writes_by_key else (row.id,)
+        returned_by_key[("slug", key)] = row
+
+    rollup_changes: list[tuple[Optional[TaskContribution], Optional[TaskContribution]]] = []
+    for key, write in writes_by_key.items():
+        row = returned_by_key[key]
+        before = task_contribution(write.existing) if write.existing is not None and not row.inserted else None
+        rollup_changes.append((before, task_contribution(row)))
+        if row.external_id:
+            resolution_cache.task_external_ids.set((row.project_id, row.external_id), row.id)
+        record_change(
+            session,
+            "task",
+            "created" if row.inserted else "updated",
+            row.project_id,
+            row.id,
+            status=row.status,
+            lock_version=row.lock_version,
+            milestone_id=str(row.milestone_id),
+        )
+        if row.inserted and row.status == "not_started":
+            work_bus.record_assigned(session, row.project_id, row.id, row.assignee_persona or row.persona_required)
+        results[write.index] = BatchUpsertResult(
+            ok=True, id=row.id, external_id=row.external_id, slug=row.slug, status=201 if row.inserted else 200
+        )
+    apply_rollup_deltas(session, rollup_changes)
+    return results
@@ -0,0 +1,188 @@
+"""Agent work bus on Redis Streams (spec §14).
+
+Each project has two streams:
+
+- ``agent:work:<project_id>``: one ``work.assigned`` entry whenever a task
+  becomes startable, i.e. it is created ``not_started`` or re-assigned to a
+  persona while still ``not_started``.
+- ``agent:events:<project_id>``: ``task.status_changed`` for every status
+  change and ``work.started`` for every claim made through ``:start``.
+
+Agents consume the work stream through consumer groups, one per persona
+(``agents`` for agents without one). Every group sees every entry. Within a
+group each entry is delivered to one consumer and stays pending until it is
+acknowledged. The claim/ack protocol:
+
+1. ``read_work`` (XREADGROUP) hands an entry to one agent of the group.
+2. The agent calls ``POST /v1/tasks/{task_id}:start`` with its name, group and
+   the entry id. Under a row lock the server moves the task to ``in_progress``,
+   logs an event, appends ``work.started`` and XACKs the entry. If another agent
+   got there first the answer is 409, and the entry is acknowledged anyway
+   because nothing is left to do for it.
+3. An entry delivered to an agent that died before step 2 stays pending.
+   ``read_work`` first takes over entries idle for ``RECLAIM_IDLE_MS`` or more
+   (XAUTOCLAIM), so another agent of the group picks them up.
+
+Entries are appended only once the transaction that caused them commits (see
+``app.redis_outbox``), and XADD trims each stream to about ``STREAM_MAXLEN``
+entries. The ``read_work``/``ensure_group`` helpers take any redis-py client, so
+agents and tests can use a local Redis or fakeredis.
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import redis
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import redis_outbox
+from .models import Task
+
+STREAM_MAXLEN = 10000
+DEFAULT_GROUP = "agents"
+# pending entries idle this long are handed to the next agent that reads
+RECLAIM_IDLE_MS = 5 * 60 * 1000
+
+
+def work_stream(project_id: Any) -> str:
+    return f"agent:work:{project_id}"
+
+
+def events_stream(project_id: Any) -> str:
+    return f"agent:events:{project_id}"
+
+
+def group_for(persona: Optional[str]) -> str:
+    return persona or DEFAULT_GROUP
+
+
+# --- producing -------------------------------------------------------------
+
+
+def _stage(session: Session, *operation: Any) -> None:
+    if redis_outbox.enabled():
+        redis_outbox.bucket(session, "work", list).append(operation)
+
+
+def _entry(message_type: str, **fields: Any) -> dict[str, str]:
+    # stream field values are flat strings; absent values are left out
+    return {"type": message_type, **{key: str(value) for key, value in fields.items() if value is not None}}
+
+
+def record_assigned(session: Session, project_id: Any, task_id: Any, persona: Optional[str]) -> None:
+    entry = _entry("work.assigned", task_id=task_id, persona=persona, url=f"/v1/tasks/{task_id}")
+    _stage(session, "xadd", work_stream(project_id), entry)
+
+
+def record_status_change(
+    session: Session, project_id: Any, task_id: Any, old: Optional[str], new: str, lock_version: int
+) -> None:
+    entry = _entry("task.status_changed", task_id=task_id, **{"from": old}, to=new, lock_version=lock_version)
+    _stage(session, "xadd", events_stream(project_id), entry)
+
+
+def record_started(session: Session, task: Task, agent: str, persona: Optional[str]) -> None:
+    entry = _entry("work.started", task_id=task.id, agent=agent, persona=persona, lock_version=task.lock_version)
+    _stage(session, "xadd", events_stream(task.project_id), entry)
+
+
+def acknowledge(session: Optional[Session], project_id: Any, group: str, message_id: str) -> None:
+    """XACK a work entry once ``session`` commits, or right away when ``session`` is None."""
+    operation = ("xack", work_stream(project_id), group, message_id)
+    if session is not None:
+        _stage(session, *operation)
+    elif redis_outbox.enabled():
+        redis_outbox.submit("work", [operation])
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, _flush_context: Any) -> None:
+    if not redis_outbox.enabled():
+        return
+    for task in session.new:
+        if isinstance(task, Task) and task.status == "not_started":
+            record_assigned(session, task.project_id, task.id, task.assignee_persona or task.persona_required)
+    for task in session.dirty:
+        if not isinstance(task, Task):
+            continue
+        # history only lists "added" values that differ from the loaded one
+        attrs = sa.inspect(task).attrs
+        status = attrs.status.history
+        if status.added:
+            old = status.deleted[0] if status.deleted else None
+            record_status_change(session, task.project_id, task.id, old, task.status, task.lock_version)
+        if attrs.assignee_persona.history.added and task.assignee_persona and task.status == "not_started":
+            record_assigned(session, task.project_id, task.id, task.assignee_persona)
+
+
+def _send(pipe: Any, operations: list[tuple[Any, ...]]) -> None:
+    for operation in operations:
+        if operation[0] == "xadd":
+            _, stream, entry = operation
+            pipe.xadd(stream, entry, maxlen=STREAM_MAXLEN, approximate=True)
+        else:
+            _, stream, group, message_id = operation
+            pipe.xack(stream, group, message_id)
+
+
+redis_outbox.register("work", _send)
+
+
+# --- consuming -------------------------------------------------------------
+
+
+def ensure_group(client: redis.Redis, project_id: Any, group: str) -> None:
+    """Create ``group`` on the project's work stream (from its first entry) if it does not exist."""
+    try:
+        client.xgroup_create(work_stream(project_id), group, id="0", mkstream=True)
+    except redis.ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _decode_entries(entries: list[Any]) -> list[tuple[str, dict[str, str]]]:
+    # XAUTOCLAIM reports trimmed entries with no fields
+    return [
+        (_decode(entry_id), {_decode(key): _decode(value) for key, value in fields.items()})
+        for entry_id, fields in entries
+        if fields
+    ]
+
+
+def read_work(
+    client: redis.Redis,
+    project_id: Any,
+    consumer: str,
+    group: str = DEFAULT_GROUP,
+    count: int = 10,
+    block_ms: Optional[int] = 5000,
+    reclaim_idle_ms: int = RECLAIM_IDLE_MS,
+) -> list[tuple[str, dict[str, str]]]:
+    """Next work entries for ``consumer``: stale pending entries first, then new ones.
+
+    Blocks up to ``block_ms`` (``None`` returns at once) when nothing is
+    available. Returns ``(entry_id, fields)`` pairs; pass the id to ``:start``.
+    """
+    stream = work_stream(project_id)
+    try:
+        _next, claimed, *_ = client.xautoclaim(stream, group, consumer, reclaim_idle_ms, start_id="0-0", count=count)
+    except redis.ResponseError as exc:
+        # first read by this group: nothing can be pending yet
+        if "NOGROUP" not in str(exc):
+            raise
+        ensure_group(client, project_id, group)
+        claimed = []
+    entries = _decode_entries(claimed)
+    if entries:
+        return entries
+    response = client.xreadgroup(group, consumer, {stream: ">"}, count=count, block=block_ms) or []
+    if isinstance(response, dict):
+        # RESP3 replies come back as {stream: [entries]}
+        return [entry for batches in response.values() for batch in batches for entry in _decode_entries(batch)]
+    return [entry for _stream, batch in response for entry in _decode_entries(batch)]
@@ -1,6 +1,9 @@
 export const API_URL = import.meta.env.VITE_API_URL ?? "http://localhost:8080";
 
-export async function api<T>(path: string, options: RequestInit = {}): Promise<T> {
+// Largest page the list endpoints serve (app.pagination.MAX_PAGE_SIZE)
+const MAX_PAGE_SIZE = 1000;
+
+async function request(path: string, options: RequestInit = {}): Promise<Response> {
   const response = await fetch(`${API_URL}${path}`, {
     headers: {
       "Content-Type": "application/json",
@@ -14,6 +17,12 @@ export async function api<T>(path: string, options: RequestInit = {}): Promise<T
     throw new Error(message || response.statusText);
   }
 
+  return response;
+}
+
+export async function api<T>(path: string, options: RequestInit = {}): Promise<T> {
+  const response = await request(path, options);
+
   if (response.status === 204) {
     return undefined as T;
   }
@@ -21,6 +30,20 @@ export async function api<T>(path: string, options: RequestInit = {}): Promise<T
   return (await response.json()) as T;
 }
 
+// Every item of a cursor-paginated list, following X-Next-Cursor until the last page.
+export async function apiAll<T>(path: string): Promise<T[]> {
+  const separator = path.includes("?") ? "&" : "?";
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const page = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+    const response = await request(`${path}${separator}limit=${MAX_PAGE_SIZE}${page}`);
+    items.push(...((await response.json()) as T[]));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
+}
+
 export async function apiPost<T>(path: string, body: unknown): Promise<T> {
   return api<T>(path, {
     method: "POST",
@@ -1,6 +1,6 @@
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
 
-import { api, apiDelete, apiPatch, apiPost } from "../api/client";
+import { apiAll, apiDelete, apiPatch, apiPost } from "../api/client";
 
 export type Bug = {
   id: string;
@@ -35,7 +35,7 @@ export function useBugs(projectId?: string) {
   return useQuery({
     enabled: Boolean(projectId),
     queryKey: ["bugs", projectId],
-    queryFn: () => api<Bug[]>(`/v1/bugs?project_id=${projectId}`),
+    queryFn: () => apiAll<Bug>(`/v1/bugs?project_id=${projectId}`),
   });
 }
 
@@ -1,6 +1,6 @@
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
 
-import { api, apiPatch, apiPost } from "../api/client";
+import { apiAll, apiPatch, apiPost } from "../api/client";
 
 export type Task = {
   id: string;
@@ -33,7 +33,7 @@ export function useTasks(milestoneId?: string) {
   return useQuery({
     enabled: Boolean(milestoneId),
     queryKey: ["tasks", milestoneId],
-    queryFn: () => api<Task[]>(`/v1/tasks?milestone_id=${milestoneId}`),
+    queryFn: () => apiAll<Task>(`/v1/tasks?milestone_id=${milestoneId}`),
   });
 }
 
@@ -41,7 +41,7 @@ export function useProjectTasks(projectId?: string) {
   return useQuery({
     enabled: Boolean(projectId),
     queryKey: ["tasks", "project", projectId],
-    queryFn: () => api<Task[]>(`/v1/tasks?project_id=${projectId}`),
+    queryFn: () => apiAll<Task>(`/v1/tasks?project_id=${projectId}`),
   });
 }
 